@@ -0,0 +1,68 @@
+"""
+Compare JSON codecs, for loading task arguments and writing task outputs.
+
+Usage:
+    python benchmarks/bench_json_codecs.py [NUM_ZARR_URLS ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+from fractal_task_tools._json_codec import JSONCodec
+from fractal_task_tools._task_input import load_task_args
+from fractal_task_tools._task_output import write_task_output
+
+NUM_REPETITIONS = 3
+
+
+def _min_duration(function, *args) -> float:
+    durations = []
+    for _ in range(NUM_REPETITIONS):
+        t_start = time.perf_counter()
+        function(*args)
+        durations.append(time.perf_counter() - t_start)
+    return min(durations)
+
+
+def run_benchmark(num_zarr_urls: int, tmp_dir: str) -> None:
+    zarr_urls = [
+        f"/data/project/plate.zarr/B/{ind // 100:02d}/{ind % 100}"
+        for ind in range(num_zarr_urls)
+    ]
+    args_json = os.path.join(tmp_dir, "args.json")
+    with open(args_json, "wb") as f:
+        f.write(
+            JSONCodec().dumps(
+                dict(zarr_urls=zarr_urls, zarr_dir="/data/project"),
+                compact=False,
+            )
+        )
+    task_output = dict(
+        image_list_updates=[
+            dict(zarr_url=zarr_url, attributes=dict(well="B03"))
+            for zarr_url in zarr_urls
+        ]
+    )
+    out_json = os.path.join(tmp_dir, "out.json")
+
+    for codec_name in ("json", "orjson"):
+        os.environ["FRACTAL_TASK_JSON_CODEC"] = codec_name
+        try:
+            load_time = _min_duration(load_task_args, args_json)
+            dump_time = _min_duration(write_task_output, task_output, out_json)
+        except ImportError:
+            print(f"{num_zarr_urls:>9} zarr_urls | {codec_name:>6} | not installed")
+            continue
+        print(
+            f"{num_zarr_urls:>9} zarr_urls | {codec_name:>6} | "
+            f"load {load_time * 1e3:8.1f} ms | write {dump_time * 1e3:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_zarr_urls in sizes:
+            run_benchmark(num_zarr_urls, tmp_dir)
@@ -0,0 +1,74 @@
+"""
+Compare the per-record cost of the default log format, of the JSON-lines
+formatter (`FRACTAL_TASK_LOG_FORMAT=json`), and of a naive JSON formatter that
+builds and serializes a dictionary for each record.
+
+Usage:
+    python benchmarks/bench_json_logs.py [NUM_RECORDS ...]
+"""
+
+import json
+import logging
+import sys
+import time
+
+from fractal_task_tools._json_log import JsonLinesFormatter
+from fractal_task_tools._json_log import unit_log_context
+from fractal_task_tools._json_log import update_unit_log_context
+from fractal_task_tools.logging_config import DEFAULT_LOG_FORMAT
+
+NUM_REPETITIONS = 3
+
+
+class NaiveJsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(
+            dict(
+                timestamp=self.formatTime(record),
+                logger=record.name,
+                level=record.levelname,
+                message=record.getMessage(),
+                task="my_task",
+                zarr_url="/data/project/plate.zarr/B/03/0",
+                unit_index=12,
+                elapsed=time.time() - record.created,
+            )
+        )
+
+
+def _min_duration(formatter: logging.Formatter, records: list) -> float:
+    durations = []
+    for _ in range(NUM_REPETITIONS):
+        t_start = time.perf_counter()
+        for record in records:
+            formatter.format(record)
+        durations.append(time.perf_counter() - t_start)
+    return min(durations)
+
+
+def run_benchmark(num_records: int) -> None:
+    records = [
+        logging.LogRecord(
+            "my_task", logging.INFO, __file__, 1, "Processed chunk %d", (ind,), None
+        )
+        for ind in range(num_records)
+    ]
+    formatters = dict(
+        default=logging.Formatter(DEFAULT_LOG_FORMAT),
+        json=JsonLinesFormatter(),
+        naive_json=NaiveJsonFormatter(),
+    )
+    with unit_log_context(task_name="my_task", unit_index=12):
+        update_unit_log_context(zarr_url="/data/project/plate.zarr/B/03/0")
+        for name, formatter in formatters.items():
+            duration = _min_duration(formatter, records)
+            print(
+                f"{num_records:>9} records | {name:>10} | "
+                f"{duration / num_records * 1e6:6.2f} us/record"
+            )
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000]
+    for num_records in sizes:
+        run_benchmark(num_records)
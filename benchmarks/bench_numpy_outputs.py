@@ -0,0 +1,88 @@
+"""
+Compare writing task outputs with `numpy` values through the built-in
+encoders, against converting them by hand (with `.tolist()`/`.item()` on a
+deep copy of the output) before writing.
+
+Usage:
+    python benchmarks/bench_numpy_outputs.py [NUM_IMAGES ...]
+"""
+
+import copy
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from fractal_task_tools._task_output import write_task_output
+
+NUM_REPETITIONS = 3
+
+
+def _min_duration(function, *args) -> float:
+    durations = []
+    for _ in range(NUM_REPETITIONS):
+        t_start = time.perf_counter()
+        function(*args)
+        durations.append(time.perf_counter() - t_start)
+    return min(durations)
+
+
+def _to_builtin(obj):
+    """
+    Convert `numpy` values by hand, as task packages do without encoders.
+    """
+    if isinstance(obj, dict):
+        return {key: _to_builtin(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_to_builtin(value) for value in obj]
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def _write_manual(task_output, out_json):
+    write_task_output(_to_builtin(copy.deepcopy(task_output)), out_json)
+
+
+def run_benchmark(num_images: int, tmp_dir: str) -> None:
+    rng = np.random.default_rng(0)
+    task_output = dict(
+        image_list_updates=[
+            dict(
+                zarr_url=f"/data/project/plate.zarr/B/{ind // 100:02d}/{ind % 100}",
+                attributes=dict(
+                    num_objects=np.int64(ind),
+                    mean_intensity=np.float32(rng.random()),
+                    centroid=rng.random(3),
+                    bbox=np.arange(6, dtype=np.uint16),
+                ),
+            )
+            for ind in range(num_images)
+        ]
+    )
+    out_json = os.path.join(tmp_dir, "out.json")
+
+    for codec_name in ("json", "orjson"):
+        os.environ["FRACTAL_TASK_JSON_CODEC"] = codec_name
+        try:
+            encoder_time = _min_duration(write_task_output, task_output, out_json)
+            manual_time = _min_duration(_write_manual, task_output, out_json)
+        except ImportError:
+            print(f"{num_images:>9} images | {codec_name:>6} | not installed")
+            continue
+        print(
+            f"{num_images:>9} images | {codec_name:>6} | "
+            f"encoders {encoder_time * 1e3:8.1f} ms | "
+            f"manual {manual_time * 1e3:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_images in sizes:
+            run_benchmark(num_images, tmp_dir)
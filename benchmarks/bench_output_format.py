@@ -0,0 +1,67 @@
+"""
+Compare size and write time of task outputs, for different output formats.
+
+Usage:
+    python benchmarks/bench_output_format.py [NUM_IMAGES ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fractal_task_tools._task_output import write_task_output
+
+OUTPUT_FORMATS = ("indent", "compact")
+NUM_REPETITIONS = 3
+
+
+def make_task_output(num_images: int) -> dict:
+    """
+    Build a synthetic task output with `num_images` image-list updates.
+    """
+    return dict(
+        image_list_updates=[
+            dict(
+                zarr_url=f"/data/project/plate.zarr/B/{ind // 100:02d}/{ind % 100}",
+                origin=Path(f"/data/project/raw/plate.zarr/B/{ind // 100:02d}/0"),
+                attributes=dict(
+                    plate="plate.zarr",
+                    well=f"B{ind // 100:02d}",
+                    acquisition=ind % 4,
+                ),
+                types=dict(is_3D=False, illumination_corrected=True),
+            )
+            for ind in range(num_images)
+        ]
+    )
+
+
+def run_benchmark(num_images: int, tmp_dir: str) -> None:
+    task_output = make_task_output(num_images)
+    out_json = os.path.join(tmp_dir, "out.json")
+    results = {}
+    for output_format in OUTPUT_FORMATS:
+        os.environ["FRACTAL_TASK_OUTPUT_FORMAT"] = output_format
+        durations = []
+        for _ in range(NUM_REPETITIONS):
+            t_start = time.perf_counter()
+            write_task_output(task_output, out_json)
+            durations.append(time.perf_counter() - t_start)
+        results[output_format] = (os.path.getsize(out_json), min(durations))
+
+    indent_size, indent_time = results["indent"]
+    for output_format, (size, duration) in results.items():
+        print(
+            f"{num_images:>9} images | {output_format:>7} | "
+            f"{size / 1e6:9.2f} MB ({size / indent_size:5.1%}) | "
+            f"{duration * 1e3:9.1f} ms ({duration / indent_time:5.1%})"
+        )
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_images in sizes:
+            run_benchmark(num_images, tmp_dir)
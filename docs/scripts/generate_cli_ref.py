@@ -1,7 +1,7 @@
 import subprocess  # nosec
 from pathlib import Path
 
-CMD0 = "fractal-manifest"
+CMDS0 = ["fractal-manifest", "fractal-task-outputs"]
 
 
 def log_help(cmd: list[str]) -> str:
@@ -25,29 +25,32 @@ output_dir.mkdir(exist_ok=True, parents=True)
 with (output_dir / "index.md").open("w") as f:
     f.write("# CLI Reference\n\n")
     f.write(
-        f"This page shows the help screens for the `{CMD0}` command "
-        "and its subcommands.\n\n"
+        "This page shows the help screens for the "
+        + " and ".join(f"`{CMD0}`" for CMD0 in CMDS0)
+        + " commands and their subcommands.\n\n"
     )
 
-    f.write(f"## `{CMD0}`\n\n")
-    main_help = log_help([CMD0])
-    f.write("```\n")
-    f.write(main_help)
-    f.write("\n```\n\n")
-
-for cmd1 in get_subcommands_from_help_message(main_help):
-    with (output_dir / f"{cmd1}.md").open("w") as f:
-        print(cmd1)
-
-        f.write(f"# `{CMD0} {cmd1}`\n\n")
-        help_text = log_help([CMD0, cmd1])
+for CMD0 in CMDS0:
+    with (output_dir / "index.md").open("a") as f:
+        f.write(f"## `{CMD0}`\n\n")
+        main_help = log_help([CMD0])
         f.write("```\n")
-        f.write(help_text)
+        f.write(main_help)
         f.write("\n```\n\n")
 
-        for cmd2 in get_subcommands_from_help_message(help_text):
-            f.write(f"## `{CMD0} {cmd1} {cmd2}`\n\n")
-            help_text = log_help([CMD0, cmd1, cmd2])
+    for cmd1 in get_subcommands_from_help_message(main_help):
+        with (output_dir / f"{cmd1}.md").open("w") as f:
+            print(cmd1)
+
+            f.write(f"# `{CMD0} {cmd1}`\n\n")
+            help_text = log_help([CMD0, cmd1])
             f.write("```\n")
             f.write(help_text)
             f.write("\n```\n\n")
+
+            for cmd2 in get_subcommands_from_help_message(help_text):
+                f.write(f"## `{CMD0} {cmd1} {cmd2}`\n\n")
+                help_text = log_help([CMD0, cmd1, cmd2])
+                f.write("```\n")
+                f.write(help_text)
+                f.write("\n```\n\n")
@@ -1,5 +1 @@
-import logging
-
-logging.basicConfig(level=logging.INFO)
-
 __VERSION__ = "0.5.0"
@@ -0,0 +1,169 @@
+"""
+Support for async task functions.
+
+Coroutine functions (`async def`) and async generator functions are run on
+a new event loop, which is created by `asyncio` or by `uvloop` based on the
+`FRACTAL_TASK_ASYNC_LOOP` environment variable. `asyncio` is only imported
+when the task function is async.
+"""
+
+import os
+import types
+import typing
+from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import TypeVar
+
+ValidAsyncLoop = typing.Literal["asyncio", "uvloop"]
+ALLOWED_ASYNC_LOOPS: tuple[ValidAsyncLoop, ...] = typing.get_args(ValidAsyncLoop)
+DEFAULT_ASYNC_LOOP: ValidAsyncLoop = "asyncio"
+
+T = TypeVar("T")
+
+
+def get_async_loop() -> ValidAsyncLoop:
+    """
+    Get valid event-loop implementation from environment variable or default
+    value.
+    """
+    # Use default value if the env variable is unset or set to an empty string
+    async_loop = os.getenv("FRACTAL_TASK_ASYNC_LOOP") or DEFAULT_ASYNC_LOOP
+    # Validate `async_loop`
+    if async_loop not in ALLOWED_ASYNC_LOOPS:
+        raise ValueError(
+            f"Invalid FRACTAL_TASK_ASYNC_LOOP={async_loop} environment "
+            f"variable. Allowed values: {ALLOWED_ASYNC_LOOPS}."
+        )
+    return async_loop
+
+
+def _get_loop_factory() -> Callable[[], Any] | None:
+    """
+    Get the factory of new event loops (`None` for the `asyncio` default).
+    """
+    if get_async_loop() == "asyncio":
+        return None
+    try:
+        import uvloop
+    except ImportError:
+        raise ModuleNotFoundError(
+            "FRACTAL_TASK_ASYNC_LOOP=uvloop requires the `uvloop` package."
+        )
+    return uvloop.new_event_loop
+
+
+def is_async_output(output: Any) -> bool:
+    """
+    Check whether the output of a task function is a coroutine or an async
+    generator, which must be run on an event loop.
+    """
+    return isinstance(output, (types.CoroutineType, types.AsyncGeneratorType))
+
+
+def run_coroutine(coroutine: Awaitable[T]) -> T:
+    """
+    Run a coroutine on a new event loop, and return its result.
+    """
+    try:
+        loop_factory = _get_loop_factory()
+    except BaseException:
+        # Avoid a "coroutine was never awaited" warning
+        coroutine.close()
+        raise
+    import asyncio
+
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        return runner.run(coroutine)
+
+
+def iterate_async_generator(async_generator: AsyncIterator[T]) -> Iterator[T]:
+    """
+    Iterate over an async generator, on a new event loop which is kept open
+    until the iteration ends.
+    """
+    try:
+        loop_factory = _get_loop_factory()
+    except BaseException:
+        async_generator.aclose().close()
+        raise
+    import asyncio
+
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        try:
+            while True:
+                try:
+                    item = runner.run(anext(async_generator))
+                except StopAsyncIteration:
+                    return
+                yield item
+        finally:
+            runner.run(async_generator.aclose())
+
+
+async def gather_bounded(
+    awaitables: Iterable[Awaitable[T]],
+    *,
+    max_concurrency: int,
+    return_exceptions: bool = False,
+) -> list[T]:
+    """
+    Await many awaitables, with at most `max_concurrency` of them at a time.
+
+    Awaitables are consumed lazily from `awaitables`, so that passing a
+    generator, e.g.
+    ```python
+    chunks = await gather_bounded(
+        (read_chunk(zarr_url, index) for index in indices),
+        max_concurrency=64,
+    )
+    ```
+    only creates the coroutines which are running, also for a very large
+    number of operations.
+
+    Args:
+        awaitables: Awaitables (e.g. coroutines) to await.
+        max_concurrency: Maximum number of awaitables awaited at a time.
+        return_exceptions:
+            If `True`, the exceptions raised by awaitables are returned in
+            place of their results. If `False`, the first exception is
+            raised, and all other awaitables are cancelled.
+
+    Returns:
+        Results of the awaitables, in the same order.
+    """
+    import asyncio
+
+    if max_concurrency < 1:
+        raise ValueError(f"Invalid {max_concurrency=}, it must be at least 1.")
+
+    iterator = enumerate(awaitables)
+    results: dict[int, Any] = {}
+
+    async def _consume() -> None:
+        # NOTE: all consumers share the same iterator, which is safe since
+        # they run on a single thread
+        for ind, awaitable in iterator:
+            try:
+                results[ind] = await awaitable
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results[ind] = e
+
+    tasks = [asyncio.ensure_future(_consume()) for _ in range(max_concurrency)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Close the coroutines which were never awaited
+        for _, awaitable in iterator:
+            if isinstance(awaitable, types.CoroutineType):
+                awaitable.close()
+        raise
+    return [results[ind] for ind in range(len(results))]
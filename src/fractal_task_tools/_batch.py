@@ -0,0 +1,229 @@
+"""
+Batch mode, running many task units in forked child processes.
+
+Each unit runs in its own child, forked from the process that imported the
+task module, so that a unit whose process dies (e.g. because of a crash or an
+out-of-memory kill) does not affect the other units.
+
+The batch file is a JSON list of job descriptors, that is, objects with the
+`args_json` and `out_json` keys (and an optional `log_file` key).
+"""
+
+import gc
+import json
+import logging
+import os
+import sys
+from contextlib import contextmanager
+from typing import Iterator
+
+from ._result_cache import ResultCacheInputs
+from ._task_output import get_sidecar_path
+from .logging_config import WRAPPER_LOGGER_NAME
+from .logging_config import get_log_formatter
+from .logging_config import get_log_volume_filter
+from .logging_config import get_logging_format
+
+logger = logging.getLogger(WRAPPER_LOGGER_NAME)
+
+
+def get_available_cpus() -> int:
+    """
+    Get the number of CPUs available to the current process.
+    """
+    slurm_cpus = os.getenv("SLURM_CPUS_PER_TASK")
+    if slurm_cpus:
+        return int(slurm_cpus)
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _get_default_log_file(out_json: str) -> str:
+    """
+    Get the default per-unit log file, next to `out_json`.
+    """
+    return get_sidecar_path(out_json, ".log")
+
+
+@contextmanager
+def _redirect_unit_output(
+    *,
+    log_file: str,
+    log_level: int,
+    log_format: str,
+) -> Iterator[None]:
+    """
+    Redirect standard output/error and logs of the current process to a file.
+    """
+    root_logger = logging.getLogger()
+    old_handlers = root_logger.handlers[:]
+    old_level = root_logger.level
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = (os.dup(1), os.dup(2))
+    with open(log_file, "a") as f:
+        os.dup2(f.fileno(), 1)
+        os.dup2(f.fileno(), 2)
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(get_log_formatter(log_format))
+        log_volume_filter = get_log_volume_filter()
+        if log_volume_filter is not None:
+            handler.addFilter(log_volume_filter)
+        root_logger.handlers = [handler]
+        root_logger.setLevel(log_level)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            root_logger.handlers = old_handlers
+            root_logger.setLevel(old_level)
+            for fd, saved_fd in zip((1, 2), saved_fds):
+                os.dup2(saved_fd, fd)
+                os.close(saved_fd)
+
+
+def _run_batch_child(
+    *,
+    task_function: callable,
+    args_json: str,
+    out_json: str,
+    error_fd: int,
+    log_file: str,
+    log_level: int,
+    log_format: str,
+    lazy_zarr_urls: bool,
+    result_cache_inputs: ResultCacheInputs | None,
+    unit_index: int,
+) -> None:
+    """
+    Run a single task unit in a forked child, with its output redirected to
+    its log file, and terminate the child.
+    """
+    from ._fork_server import MAX_ERROR_BYTES
+    from ._fork_server import _run_child
+
+    try:
+        with _redirect_unit_output(
+            log_file=log_file,
+            log_level=log_level,
+            log_format=log_format,
+        ):
+            _run_child(
+                task_function=task_function,
+                args_json=args_json,
+                out_json=out_json,
+                error_fd=error_fd,
+                lazy_zarr_urls=lazy_zarr_urls,
+                result_cache_inputs=result_cache_inputs,
+                unit_index=unit_index,
+            )
+    except BaseException as e:
+        # E.g. if the log file cannot be opened
+        os.write(error_fd, f"{type(e).__name__}: {e}".encode()[:MAX_ERROR_BYTES])
+    finally:
+        os._exit(1)
+
+
+def run_batch(
+    *,
+    task_function: callable,
+    batch_json: str,
+    summary_json: str | None = None,
+    max_workers: int | None = None,
+    lazy_zarr_urls: bool = False,
+    result_cache_inputs: ResultCacheInputs | None = None,
+) -> None:
+    """
+    Run all task units of a batch file, each one in a forked child process.
+
+    Each unit writes its own output file and log file, and a failing unit
+    (including one whose process dies) does not stop the other ones. If any
+    unit failed, the process exits with an error once all units are over.
+
+    Args:
+        task_function: Callable function that runs the task.
+        batch_json: Path to the JSON file with the list of job descriptors.
+        summary_json:
+            If set, write the list of status records for all units to this
+            file.
+        max_workers:
+            Maximum number of concurrent children (by default, the number of
+            available CPUs).
+        lazy_zarr_urls: Whether to pass `zarr_urls` as a lazy sequence.
+        result_cache_inputs: Function that returns the input paths of a unit.
+    """
+    with open(batch_json, "r") as f:
+        jobs = json.load(f)
+    if max_workers is None:
+        max_workers = get_available_cpus()
+
+    root_logger = logging.getLogger()
+    log_level = root_logger.getEffectiveLevel()
+    log_format = get_logging_format()
+
+    from ._fork_server import _Children
+
+    num_jobs = len(jobs)
+    logger.info(f"Batch START ({num_jobs} units, {max_workers=}).")
+    statuses: list[dict | None] = [None] * num_jobs
+    log_files = [
+        job.get("log_file") or _get_default_log_file(job["out_json"]) for job in jobs
+    ]
+    num_done = 0
+
+    def on_finish(ind: int, status: dict) -> None:
+        nonlocal num_done
+        num_done += 1
+        status["log_file"] = log_files[ind]
+        statuses[ind] = status
+        logger.info(
+            f"[{num_done}/{num_jobs}] {status['args_json']} -> "
+            f"exit status {status['exit_status']}"
+        )
+
+    # Move all objects created so far (e.g. by imports) to a permanent
+    # generation, so that the garbage collector of the children does not
+    # touch (and copy) their memory pages
+    gc.freeze()
+    children = _Children(on_finish=on_finish)
+    for ind, job in enumerate(jobs):
+        while len(children) >= max_workers:
+            children.wait()
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            _run_batch_child(
+                task_function=task_function,
+                args_json=job["args_json"],
+                out_json=job["out_json"],
+                error_fd=write_fd,
+                log_file=log_files[ind],
+                log_level=log_level,
+                log_format=log_format,
+                lazy_zarr_urls=lazy_zarr_urls,
+                result_cache_inputs=result_cache_inputs,
+                unit_index=ind,
+            )
+        os.close(write_fd)
+        children.add(
+            pid=pid,
+            args_json=job["args_json"],
+            out_json=job["out_json"],
+            unit_index=ind,
+            error_fd=read_fd,
+        )
+    while len(children) > 0:
+        children.wait()
+
+    if summary_json is not None:
+        with open(summary_json, "w") as f:
+            json.dump(statuses, f, indent=2)
+
+    num_failed = sum(status["exit_status"] != 0 for status in statuses)
+    logger.info(f"Batch END ({num_failed}/{num_jobs} failed units).")
+    if num_failed > 0:
+        sys.exit(f"{num_failed}/{num_jobs} task units failed.")
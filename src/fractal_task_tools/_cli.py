@@ -3,6 +3,7 @@
 """
 
 import argparse as ap
+import logging
 import sys
 from pathlib import Path
 
@@ -97,6 +98,7 @@ def main():
     """
     Main CLI entrypoint.
     """
+    logging.basicConfig(level=logging.INFO)
     args = _parse_arguments()
     if args.cmd == "create":
         manifest = create_manifest(
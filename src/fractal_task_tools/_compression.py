@@ -0,0 +1,72 @@
+"""
+Transparent compression of task-argument and task-output files.
+
+Files with a `.gz` or `.zst` extension (e.g. `args.json.gz`) are compressed
+with gzip or Zstandard, respectively. Zstandard requires either Python 3.14
+(`compression.zstd`) or the `zstandard` package.
+"""
+
+from typing import BinaryIO
+from typing import Literal
+
+GZIP_SUFFIX = ".gz"
+ZSTD_SUFFIX = ".zst"
+COMPRESSED_SUFFIXES = (GZIP_SUFFIX, ZSTD_SUFFIX)
+
+# Compression level of gzip files (the same as the default of `gzip` CLI)
+GZIP_COMPRESSLEVEL = 6
+
+
+def is_compressed(path: str) -> bool:
+    """
+    Check whether the extension of `path` corresponds to a compressed file.
+    """
+    return path.endswith(COMPRESSED_SUFFIXES)
+
+
+def remove_compressed_suffix(path: str) -> str:
+    """
+    Remove the compression extension of a path, if any.
+    """
+    for suffix in COMPRESSED_SUFFIXES:
+        if path.endswith(suffix):
+            return path[: -len(suffix)]
+    return path
+
+
+def _open_zstd(path: str, mode: Literal["rb", "wb"]) -> BinaryIO:
+    try:
+        from compression import zstd
+
+        return zstd.open(path, mode)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ModuleNotFoundError(
+            f"Cannot open {path}: Zstandard compression requires Python 3.14 "
+            "or the `zstandard` package."
+        )
+    return zstandard.open(path, mode)
+
+
+def open_file(path: str, mode: Literal["rb", "wb"]) -> BinaryIO:
+    """
+    Open a binary file, which is (de)compressed based on its extension.
+
+    Writes to compressed files are compressed chunk by chunk, as they are
+    written; the uncompressed content is only held in memory as a whole if
+    the caller writes it at once (as `write_task_output` does).
+
+    Args:
+        path: Path of the file.
+        mode: Either `rb` or `wb`.
+    """
+    if path.endswith(GZIP_SUFFIX):
+        import gzip
+
+        return gzip.open(path, mode, compresslevel=GZIP_COMPRESSLEVEL)
+    if path.endswith(ZSTD_SUFFIX):
+        return _open_zstd(path, mode)
+    return open(path, mode)
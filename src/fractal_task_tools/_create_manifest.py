@@ -9,6 +9,7 @@ from pathlib import Path
 import fractal_task_tools
 
 from ._args_schemas import create_schema_for_single_task
+from ._installed_manifest import MANIFEST_FILENAME  # noqa: F401
 from ._json_types import JSONdictType
 from ._package_name_tools import normalize_package_name
 from ._parse_pyproject import get_author_names_from_pyproject
@@ -20,7 +21,6 @@ from .task_models import _AnyTask
 from .task_models import _TaskList
 
 ARGS_SCHEMA_VERSION = "fractal_schema_v1"
-MANIFEST_FILENAME = "__FRACTAL_MANIFEST__.json"
 MANIFEST_VERSION = "2"
 
 
@@ -0,0 +1,39 @@
+"""
+Parsing of numeric environment variables.
+"""
+
+import math
+import os
+
+
+def get_positive_number(
+    variable: str,
+    *,
+    number_type: type = float,
+    unit: str = "seconds",
+) -> float | int | None:
+    """
+    Get a positive (and finite) number from an environment variable, if set.
+
+    Args:
+        variable: Name of the environment variable.
+        number_type: Type of the number, either `float` or `int`.
+        unit: Unit of the number, for error messages.
+    """
+    # The feature is disabled if the env variable is unset or set to an empty
+    # string
+    value = os.getenv(variable)
+    if not value:
+        return None
+    # Validate `value`
+    try:
+        number = number_type(value)
+    except ValueError:
+        number = 0
+    if not 0 < number < math.inf:
+        kind = "integer" if number_type is int else "number"
+        raise ValueError(
+            f"Invalid {variable}={value} environment variable. It must be a "
+            f"positive {kind} of {unit}."
+        )
+    return number
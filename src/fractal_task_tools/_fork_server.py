@@ -0,0 +1,304 @@
+"""
+Fork-server launcher, that forks a child process for each task unit.
+
+The task module is imported once by the server process, and all children
+share its memory pages copy-on-write. Job descriptors and replies are the
+same as for the persistent worker (see `_worker.py`).
+"""
+
+import gc
+import logging
+import os
+import select
+import sys
+from functools import partial
+from typing import Callable
+from typing import Iterable
+
+from ._batch import get_available_cpus
+from ._result_cache import ResultCacheInputs
+from ._worker import WriteReply
+from ._worker import get_invalid_job_status
+from ._worker import parse_job_descriptor
+from ._worker import run_job
+from ._worker import serve_socket
+from ._worker import serve_stdin
+from .logging_config import WRAPPER_LOGGER_NAME
+from .logging_config import flush_logging
+
+logger = logging.getLogger(WRAPPER_LOGGER_NAME)
+
+# Keep error messages sent through a pipe below the size of atomic writes
+MAX_ERROR_BYTES = select.PIPE_BUF
+# Maximum size of each read from the input
+READ_SIZE = 65536
+# Interval (in seconds) of the fallback check for terminated children
+REAP_INTERVAL = 1.0
+
+FinishChild = Callable[[int, dict], None]
+
+
+def _run_child(
+    *,
+    task_function: callable,
+    args_json: str,
+    out_json: str,
+    error_fd: int,
+    lazy_zarr_urls: bool,
+    result_cache_inputs: ResultCacheInputs | None,
+    unit_index: int,
+) -> None:
+    """
+    Run a task unit in a forked child, and terminate the child.
+    """
+    exit_status = 1
+    try:
+        status = run_job(
+            task_function=task_function,
+            args_json=args_json,
+            out_json=out_json,
+            lazy_zarr_urls=lazy_zarr_urls,
+            result_cache_inputs=result_cache_inputs,
+            unit_index=unit_index,
+        )
+        exit_status = status["exit_status"]
+        if status["error"] is not None:
+            os.write(error_fd, status["error"].encode()[:MAX_ERROR_BYTES])
+    finally:
+        # NOTE: `os._exit` skips `atexit` hooks, so queued log records are
+        # written here
+        flush_logging()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(exit_status)
+
+
+class _Children:
+    """
+    Running children, each one running a task unit.
+
+    Attributes:
+        on_finish:
+            Function called with the unit index and the status record of
+            each terminated child.
+        running:
+            Map from child PIDs to their job, unit index and error-pipe
+            descriptor.
+        errors: Map from child PIDs to the error messages read so far.
+    """
+
+    def __init__(self, on_finish: FinishChild):
+        self.on_finish = on_finish
+        self.running: dict[int, tuple[str, str, int, int]] = {}
+        self.errors: dict[int, bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self.running)
+
+    def add(
+        self,
+        *,
+        pid: int,
+        args_json: str,
+        out_json: str,
+        unit_index: int,
+        error_fd: int,
+    ):
+        # NOTE: reads must not block if the write end is still open in a
+        # grandchild (e.g. a `multiprocessing` worker of the task)
+        os.set_blocking(error_fd, False)
+        self.running[pid] = (args_json, out_json, unit_index, error_fd)
+        self.errors[pid] = b""
+
+    def get_error_fds(self) -> dict[int, int]:
+        """
+        Get the map from error-pipe descriptors to child PIDs.
+        """
+        return {error_fd: pid for pid, (*_, error_fd) in self.running.items()}
+
+    def _read_error(self, pid: int) -> bool:
+        """
+        Read the available error message of a child, and return whether its
+        error pipe is closed (that is, the child exited).
+        """
+        error_fd = self.running[pid][3]
+        while True:
+            try:
+                data = os.read(error_fd, MAX_ERROR_BYTES)
+            except BlockingIOError:
+                return False
+            if not data:
+                return True
+            self.errors[pid] = (self.errors[pid] + data)[:MAX_ERROR_BYTES]
+
+    def _finish(self, pid: int, wait_status: int) -> None:
+        self._read_error(pid)
+        args_json, out_json, unit_index, error_fd = self.running.pop(pid)
+        error = self.errors.pop(pid).decode(errors="replace")
+        os.close(error_fd)
+        exit_status = os.waitstatus_to_exitcode(wait_status)
+        if exit_status != 0 and not error:
+            error = f"Child process exited with status {exit_status}."
+        self.on_finish(
+            unit_index,
+            dict(
+                args_json=args_json,
+                out_json=out_json,
+                exit_status=exit_status,
+                error=error or None,
+            ),
+        )
+
+    def handle_readable(self, pid: int) -> None:
+        """
+        Read from the error pipe of a child, and reap the child (and send its
+        reply) once the pipe is closed.
+        """
+        if self._read_error(pid):
+            _, wait_status = os.waitpid(pid, 0)
+            self._finish(pid, wait_status)
+
+    def reap(self) -> None:
+        """
+        Reap terminated children (e.g. whose error pipe is still open in a
+        grandchild) and send their replies, without blocking.
+        """
+        while self.running:
+            pid, wait_status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            if pid in self.running:
+                self._finish(pid, wait_status)
+
+    def wait(self) -> None:
+        """
+        Wait until a child terminates (or for up to `REAP_INTERVAL` seconds),
+        and handle all terminated children.
+        """
+        error_fds = self.get_error_fds()
+        readable, _, _ = select.select(list(error_fds), [], [], REAP_INTERVAL)
+        for fd in readable:
+            self.handle_readable(error_fds[fd])
+        if not readable:
+            self.reap()
+
+
+def _serve_lines_forking(
+    *,
+    lines: Iterable[str],
+    write_reply: WriteReply,
+    task_function: callable,
+    max_children: int,
+    lazy_zarr_urls: bool,
+    result_cache_inputs: ResultCacheInputs | None,
+) -> bool:
+    """
+    Fork a child for each line, and wait for all children at end of input.
+
+    Input lines and terminated children are waited for at the same time, so
+    that the reply of each job is sent as soon as its child exits. Input is
+    read from the file descriptor of `lines`, rather than through its buffer.
+    """
+    input_fd = lines.fileno()
+    children = _Children(on_finish=lambda _, status: write_reply(status))
+    unit_index = 0
+    buffer = b""
+    end_of_input = False
+    while True:
+        # Fork a child for each complete line, up to `max_children`
+        while len(children) < max_children and (
+            b"\n" in buffer or (end_of_input and buffer)
+        ):
+            raw_line, _, buffer = buffer.partition(b"\n")
+            line = raw_line.decode(errors="replace")
+            if not line.strip():
+                continue
+            try:
+                args_json, out_json = parse_job_descriptor(line)
+            except (ValueError, KeyError, TypeError) as e:
+                write_reply(get_invalid_job_status(line, e))
+                continue
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                _run_child(
+                    task_function=task_function,
+                    args_json=args_json,
+                    out_json=out_json,
+                    error_fd=write_fd,
+                    lazy_zarr_urls=lazy_zarr_urls,
+                    result_cache_inputs=result_cache_inputs,
+                    unit_index=unit_index,
+                )
+            os.close(write_fd)
+            children.add(
+                pid=pid,
+                args_json=args_json,
+                out_json=out_json,
+                unit_index=unit_index,
+                error_fd=read_fd,
+            )
+            unit_index += 1
+        if end_of_input and not buffer and len(children) == 0:
+            break
+
+        # Wait for more input (if children can be forked) or for children
+        error_fds = children.get_error_fds()
+        wait_fds = list(error_fds)
+        if not end_of_input and len(children) < max_children:
+            wait_fds.append(input_fd)
+        readable, _, _ = select.select(wait_fds, [], [], REAP_INTERVAL)
+        for fd in readable:
+            if fd == input_fd:
+                data = os.read(input_fd, READ_SIZE)
+                buffer += data
+                end_of_input = not data
+            else:
+                children.handle_readable(error_fds[fd])
+        if not readable:
+            children.reap()
+    return False
+
+
+def run_fork_server(
+    *,
+    task_function: callable,
+    socket_path: str | None = None,
+    max_children: int | None = None,
+    lazy_zarr_urls: bool = False,
+    result_cache_inputs: ResultCacheInputs | None = None,
+) -> None:
+    """
+    Serve task units by forking a child process for each one of them.
+
+    Args:
+        task_function: Callable function that runs the task.
+        socket_path:
+            If set, read jobs from a Unix-domain socket at this path, rather
+            than from standard input.
+        max_children:
+            Maximum number of concurrent children (by default, the number of
+            available CPUs).
+        lazy_zarr_urls: Whether to pass `zarr_urls` as a lazy sequence.
+        result_cache_inputs: Function that returns the input paths of a unit.
+    """
+    if max_children is None:
+        max_children = get_available_cpus()
+    # Move all objects created so far (e.g. by imports) to a permanent
+    # generation, so that the garbage collector of the children does not
+    # touch (and copy) their memory pages
+    gc.freeze()
+    serve_lines = partial(
+        _serve_lines_forking,
+        task_function=task_function,
+        max_children=max_children,
+        lazy_zarr_urls=lazy_zarr_urls,
+        result_cache_inputs=result_cache_inputs,
+    )
+    logger.info(f"Fork server START ({max_children=}).")
+    if socket_path is None:
+        serve_stdin(serve_lines)
+    else:
+        serve_socket(socket_path=socket_path, serve_lines=serve_lines)
+    logger.info("Fork server END.")
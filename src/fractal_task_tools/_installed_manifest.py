@@ -0,0 +1,87 @@
+"""
+Lookup of a task in the manifest of its installed package.
+
+Task executables are listed in the manifest with paths relative to the
+package root, which is also where the manifest file is located.
+"""
+
+import json
+import sys
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+MANIFEST_FILENAME = "__FRACTAL_MANIFEST__.json"
+
+
+def get_task_executable(task_function: callable) -> str | None:
+    """
+    Get the path of the module that defines `task_function`.
+    """
+    module = sys.modules.get(getattr(task_function, "__module__", None))
+    module_file = getattr(module, "__file__", None)
+    if module_file is None:
+        return None
+    return Path(module_file).resolve().as_posix()
+
+
+@cache
+def _load_manifest(manifest_path: str) -> dict[str, Any]:
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def get_package_root(executable: str) -> Path | None:
+    """
+    Get the first parent folder of `executable` with a manifest file, if any.
+
+    Args:
+        executable: Absolute path of the task module.
+    """
+    for package_root in Path(executable).parents:
+        if (package_root / MANIFEST_FILENAME).is_file():
+            return package_root
+    return None
+
+
+def get_manifest_task(executable: str) -> tuple[dict[str, Any], str] | None:
+    """
+    Find the manifest task that has `executable` among its executables.
+
+    The manifest is the first `__FRACTAL_MANIFEST__.json` file found in the
+    parent folders of `executable`.
+
+    Args:
+        executable: Absolute path of the task module.
+
+    Returns:
+        The task item of the manifest task list, and the kind of executable
+        (`parallel` or `non_parallel`), or `None` if the task is not found.
+    """
+    package_root = get_package_root(executable)
+    if package_root is None:
+        return None
+    try:
+        manifest = _load_manifest((package_root / MANIFEST_FILENAME).as_posix())
+    except (OSError, ValueError):
+        return None
+    relative_executable = Path(executable).relative_to(package_root).as_posix()
+    for task in manifest.get("task_list", []):
+        for kind in ("parallel", "non_parallel"):
+            if task.get(f"executable_{kind}") == relative_executable:
+                return task, kind
+    return None
+
+
+def get_task_meta(task_function: callable) -> dict[str, Any] | None:
+    """
+    Get the `meta` of `task_function` from the manifest of its package.
+    """
+    executable = get_task_executable(task_function)
+    if executable is None:
+        return None
+    manifest_task = get_manifest_task(executable)
+    if manifest_task is None:
+        return None
+    task, kind = manifest_task
+    return task.get(f"meta_{kind}")
@@ -0,0 +1,262 @@
+"""
+JSON codecs for task arguments and outputs.
+
+The standard-library codec is always available. The `orjson` codec is used
+when `orjson` is installed (or when explicitly requested), and it falls back
+to the standard-library codec for any input that it cannot handle or that it
+would write as different values (e.g. `NaN`, written as `null` by `orjson`),
+so that both codecs accept the same objects and raise the same errors, and
+their outputs decode to the same values. Note that the outputs themselves may
+differ, e.g. in the escaping of non-ASCII characters or in the formatting of
+floats (`1e16` versus `1e+16`).
+"""
+
+import json
+import math
+import os
+import sys
+import typing
+from enum import Enum
+from functools import cache
+from json import JSONEncoder
+from pathlib import PurePath
+from typing import Any
+from typing import Callable
+
+ValidJSONCodec = typing.Literal["auto", "json", "orjson"]
+ALLOWED_JSON_CODECS: tuple[ValidJSONCodec, ...] = typing.get_args(ValidJSONCodec)
+
+DEFAULT_JSON_CODEC: ValidJSONCodec = "auto"
+COMPACT_SEPARATORS = (",", ":")
+
+
+# Encoders of non-JSON types registered through `register_json_encoder`
+_REGISTERED_ENCODERS: dict[type, Callable[[Any], Any]] = {}
+# Encoders of the types found so far, by exact type
+_ENCODERS_BY_TYPE: dict[type, Callable[[Any], Any]] = {}
+
+
+def register_json_encoder(cls: type, encoder: Callable[[Any], Any]) -> None:
+    """
+    Register the function that converts objects of type `cls` (and of its
+    subclasses) in task outputs into JSON-serializable objects.
+
+    Registered encoders take precedence over the built-in ones.
+
+    Args:
+        cls: Type to encode.
+        encoder:
+            Function that converts an object of type `cls` into a
+            JSON-serializable object (possibly including other types with
+            an encoder).
+    """
+    _REGISTERED_ENCODERS[cls] = encoder
+    _ENCODERS_BY_TYPE.clear()
+
+
+def _encode_path(o: PurePath) -> str:
+    return o.as_posix()
+
+
+def _encode_enum(o: Enum) -> Any:
+    return o.value
+
+
+def _encode_isoformat(o: Any) -> str:
+    return o.isoformat()
+
+
+def _encode_numpy_scalar(o: Any) -> Any:
+    return o.item()
+
+
+def _encode_numpy_array(o: Any) -> list:
+    return o.tolist()
+
+
+def _get_builtin_encoders() -> list[tuple[type | tuple[type, ...], Callable]]:
+    """
+    Get the built-in encoders, including those of `datetime` and `numpy`
+    types only if these modules are already imported.
+    """
+    encoders = [(PurePath, _encode_path), (Enum, _encode_enum)]
+    datetime = sys.modules.get("datetime")
+    if datetime is not None:
+        encoders.append(((datetime.date, datetime.time), _encode_isoformat))
+    numpy = sys.modules.get("numpy")
+    if numpy is not None:
+        encoders.append((numpy.generic, _encode_numpy_scalar))
+        encoders.append((numpy.ndarray, _encode_numpy_array))
+    return encoders
+
+
+def _find_encoder(cls: type) -> Callable[[Any], Any] | None:
+    """
+    Find the encoder of a type, first among the registered ones (following
+    the method resolution order of `cls`) and then among the built-in ones.
+    """
+    for base in cls.__mro__:
+        if base in _REGISTERED_ENCODERS:
+            return _REGISTERED_ENCODERS[base]
+    for classes, encoder in _get_builtin_encoders():
+        if issubclass(cls, classes):
+            return encoder
+    return None
+
+
+def encode_default(o: Any) -> Any:
+    """
+    Convert an object that is not natively JSON-serializable, through the
+    encoder of its type.
+
+    Raises:
+        TypeError: If there is no encoder for the type of `o`.
+    """
+    cls = type(o)
+    encoder = _ENCODERS_BY_TYPE.get(cls)
+    if encoder is None:
+        encoder = _find_encoder(cls)
+        if encoder is None:
+            raise TypeError(f"Object of type {cls.__name__} is not JSON serializable")
+        _ENCODERS_BY_TYPE[cls] = encoder
+    return encoder(o)
+
+
+class TaskParameterEncoder(JSONEncoder):
+    """
+    Custom JSONEncoder that transforms `Path` objects to strings, and other
+    objects through the encoders of their types (see `encode_default`).
+
+    Ref https://docs.python.org/3/library/json.html
+    """
+
+    def default(self, o):
+        return encode_default(o)
+
+
+class JSONCodec:
+    """
+    Standard-library JSON codec.
+    """
+
+    name = "json"
+
+    def loads(self, data: bytes) -> Any:
+        """
+        Parse a JSON document.
+        """
+        return json.loads(data)
+
+    def dumps(self, obj: Any, *, compact: bool) -> bytes:
+        """
+        Encode an object as a (compact or indented) JSON document.
+        """
+        if compact:
+            encoder = TaskParameterEncoder(separators=COMPACT_SEPARATORS)
+        else:
+            encoder = TaskParameterEncoder(indent=2)
+        return encoder.encode(obj).encode()
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    JSON codec based on `orjson`.
+
+    Types that `orjson` supports natively but the standard library does not
+    (e.g. `datetime` and dataclasses) are passed through to the same
+    `default` function as `TaskParameterEncoder`, and so are `numpy` arrays
+    and scalars (so that e.g. `float32` values are written with the same
+    digits). Non-string dictionary keys and non-finite floats are handled by
+    the standard-library codec.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self._default = encode_default
+        self._options = (
+            orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        )
+
+    def loads(self, data: bytes) -> Any:
+        try:
+            return self._orjson.loads(data)
+        except self._orjson.JSONDecodeError:
+            # E.g. for `NaN` values, or to raise the standard error
+            return super().loads(data)
+
+    def dumps(self, obj: Any, *, compact: bool) -> bytes:
+        options = self._options
+        if not compact:
+            options |= self._orjson.OPT_INDENT_2
+        try:
+            data = self._orjson.dumps(obj, default=self._default, option=options)
+        except self._orjson.JSONEncodeError:
+            # E.g. for integers larger than 64 bits, for non-string keys, or to
+            # raise the standard error
+            return super().dumps(obj, compact=compact)
+        # NOTE: `orjson` writes `NaN` and infinite floats as `null`, while the
+        # standard library writes `NaN` and `Infinity`
+        if b"null" in data and _may_contain_non_finite_float(obj):
+            return super().dumps(obj, compact=compact)
+        return data
+
+
+def _may_contain_non_finite_float(obj: Any) -> bool:
+    """
+    Check whether an object may contain `NaN` or infinite floats.
+
+    Objects of other types than the JSON ones (e.g. those converted through
+    `encode_default`) are assumed to contain them.
+    """
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        cls = type(item)
+        if cls is str or cls is int or cls is bool or item is None:
+            continue
+        if cls is dict:
+            stack.extend(item.values())
+        elif cls is list or cls is tuple:
+            stack.extend(item)
+        elif cls is not float or not math.isfinite(item):
+            return True
+    return False
+
+
+def get_json_codec_name() -> ValidJSONCodec:
+    """
+    Get valid JSON-codec name from environment variable or default value.
+    """
+    # Use default value if the env variable is unset or set to an empty string
+    codec_name = os.getenv("FRACTAL_TASK_JSON_CODEC") or DEFAULT_JSON_CODEC
+    # Validate `codec_name`
+    if codec_name not in ALLOWED_JSON_CODECS:
+        raise ValueError(
+            f"Invalid FRACTAL_TASK_JSON_CODEC={codec_name} environment "
+            f"variable. Allowed values: {ALLOWED_JSON_CODECS}."
+        )
+    return codec_name
+
+
+@cache
+def _create_json_codec(codec_name: ValidJSONCodec) -> JSONCodec:
+    if codec_name == "json":
+        return JSONCodec()
+    if codec_name == "orjson":
+        return OrjsonCodec()
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return JSONCodec()
+
+
+def get_json_codec() -> JSONCodec:
+    """
+    Get the JSON codec selected through the `FRACTAL_TASK_JSON_CODEC`
+    environment variable.
+    """
+    return _create_json_codec(get_json_codec_name())
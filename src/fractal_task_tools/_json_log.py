@@ -0,0 +1,118 @@
+"""
+JSON-lines log records, selected through `FRACTAL_TASK_LOG_FORMAT=json`.
+
+Each record is written as a single JSON object with the `timestamp`,
+`logger`, `level` and `message` keys, and (within a task unit) the `task`,
+`zarr_url`, `unit_index` and `elapsed` keys. The unit context is encoded once
+per unit, and logger names, levels and timestamps (at one-second resolution)
+are cached, so that formatting a record only encodes its message.
+"""
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+from json.encoder import encode_basestring
+from typing import Any
+from typing import Iterator
+
+# Encoded unit context (as a sequence of `,"key":value` items) and start time
+# of the running task unit, if any
+_unit_context: tuple[str, float] | None = None
+_unit_fields: dict[str, Any] = {}
+
+
+def _set_unit_context(start_time: float) -> None:
+    global _unit_context
+    encoded_fields = "".join(
+        f",{encode_basestring(key)}:{json.dumps(value, default=str)}"
+        for key, value in _unit_fields.items()
+        if value is not None
+    )
+    _unit_context = (encoded_fields, start_time)
+
+
+@contextmanager
+def unit_log_context(*, task_name: str, unit_index: int | None) -> Iterator[None]:
+    """
+    Add the task name, the unit index and the elapsed time to JSON log
+    records, within the enclosed block.
+
+    Args:
+        task_name: Name of the task function.
+        unit_index: Index of the unit within a worker or a batch (if any).
+    """
+    global _unit_context, _unit_fields
+    previous_context, previous_fields = _unit_context, _unit_fields
+    _unit_fields = dict(task=task_name, unit_index=unit_index)
+    _set_unit_context(time.time())
+    try:
+        yield
+    finally:
+        _unit_context, _unit_fields = previous_context, previous_fields
+
+
+def update_unit_log_context(**fields: Any) -> None:
+    """
+    Add fields (e.g. `zarr_url`) to the JSON log records of the running task
+    unit. Calls outside of `unit_log_context` have no effect.
+    """
+    if _unit_context is not None:
+        _unit_fields.update(fields)
+        _set_unit_context(_unit_context[1])
+
+
+class UnitContextFilter(logging.Filter):
+    """
+    Attach the current unit context to records, for handlers that format
+    them later (e.g. after a queue).
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.unit_context = _unit_context
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formatter that writes each record as a JSON line.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._encoded_names: dict[str, str] = {}
+        self._encoded_levels: dict[str, str] = {}
+        self._second: tuple[int, str] = (-1, "")
+
+    def _get_timestamp(self, record: logging.LogRecord) -> str:
+        second = int(record.created)
+        cached_second, text = self._second
+        if second != cached_second:
+            text = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._second = (second, text)
+        return f"{text}.{int(record.msecs):03d}Z"
+
+    def format(self, record: logging.LogRecord) -> str:
+        name = self._encoded_names.get(record.name)
+        if name is None:
+            name = self._encoded_names[record.name] = encode_basestring(record.name)
+        level = self._encoded_levels.get(record.levelname)
+        if level is None:
+            level = self._encoded_levels[record.levelname] = encode_basestring(
+                record.levelname
+            )
+        line = (
+            f'{{"timestamp":"{self._get_timestamp(record)}","logger":{name},'
+            f'"level":{level},"message":{encode_basestring(record.getMessage())}'
+        )
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line += f',"exc_info":{encode_basestring(record.exc_text)}'
+        if record.stack_info:
+            line += f',"stack_info":{encode_basestring(record.stack_info)}'
+        unit_context = getattr(record, "unit_context", _unit_context)
+        if unit_context is not None:
+            encoded_fields, start_time = unit_context
+            line += f'{encoded_fields},"elapsed":{record.created - start_time:.3f}'
+        return line + "}"
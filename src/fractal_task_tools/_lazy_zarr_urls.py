@@ -0,0 +1,216 @@
+"""
+Lazy access to the `zarr_urls` argument of large arguments files.
+"""
+
+import json
+import mmap
+import re
+from array import array
+from collections.abc import Sequence
+from typing import Any
+from typing import Iterator
+
+from ._compression import is_compressed
+from ._compression import open_file
+from ._json_codec import get_json_codec
+
+# JSON string (with escapes), optionally followed by a colon (for keys), or a
+# bracket
+_STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+_TOKEN = re.compile(rb"(?P<string>" + _STRING + rb")(?P<colon>\s*:)?|[\[\]{}]")
+_STRING_OR_ARRAY_END = re.compile(_STRING + rb"|\]")
+_ARRAY_START = re.compile(rb"\s*\[")
+
+# Size of the chunks used to count characters in memory-mapped files
+_CHUNK_SIZE = 16 * 1024**2
+
+
+def _count(buffer: bytes | mmap.mmap, sub: bytes, start: int, end: int) -> int:
+    """
+    Count the occurrences of a single byte, also for memory-mapped files.
+    """
+    return sum(
+        buffer[chunk_start : min(chunk_start + _CHUNK_SIZE, end)].count(sub)
+        for chunk_start in range(start, end, _CHUNK_SIZE)
+    )
+
+
+class LazyZarrUrls(Sequence):
+    """
+    Read-only sequence of `zarr_url`s, decoded on access from a JSON array.
+
+    Only the positions of the array items are stored, and each item is only
+    decoded when it is accessed. When the array does not include any escaped
+    character, the positions are computed on the first random access, so
+    that `len()` and iteration need no index at all.
+    """
+
+    def __init__(
+        self,
+        *,
+        buffer: bytes | mmap.mmap,
+        start: int,
+        end: int,
+    ):
+        """
+        Args:
+            buffer: Content of the arguments file.
+            start: Position of the `[` character that opens the array.
+            end: Position after the `]` character that closes the array.
+        """
+        self._buffer = buffer
+        self._start = start
+        self._end = end
+        self._has_escapes = buffer.find(b"\\", start, end) != -1
+        if self._has_escapes:
+            self._starts = array("q")
+            self._ends = array("q")
+            for match in _STRING_OR_ARRAY_END.finditer(buffer, start + 1, end):
+                if match.end() - match.start() > 1:
+                    self._starts.append(match.start())
+                    self._ends.append(match.end())
+            self._length = len(self._starts)
+        else:
+            self._starts = None
+            self._ends = None
+            self._length = _count(buffer, b'"', start, end) // 2
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(<{self._length} zarr_urls>)"
+
+    def _build_index(self) -> None:
+        starts = array("q")
+        pos = self._start
+        for _ in range(self._length):
+            pos = self._buffer.find(b'"', pos)
+            starts.append(pos)
+            pos = self._buffer.find(b'"', pos + 1) + 1
+        self._starts = starts
+
+    def _decode(self, start: int, end: int) -> str:
+        raw = self._buffer[start:end]
+        if self._has_escapes and b"\\" in raw:
+            return json.loads(raw)
+        return raw[1:-1].decode()
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self[ind] for ind in range(*index.indices(self._length))]
+        if self._starts is None:
+            self._build_index()
+        start = self._starts[index]
+        if self._has_escapes:
+            return self._decode(start, self._ends[index])
+        return self._decode(start, self._buffer.find(b'"', start + 1) + 1)
+
+    def get_sha256(self) -> str:
+        """
+        Hash the raw JSON array, without decoding any of its items.
+        """
+        import hashlib
+
+        sha256 = hashlib.sha256()
+        for chunk_start in range(self._start, self._end, _CHUNK_SIZE):
+            chunk_end = min(chunk_start + _CHUNK_SIZE, self._end)
+            sha256.update(self._buffer[chunk_start:chunk_end])
+        return sha256.hexdigest()
+
+    def to_list(self) -> list[Any]:
+        """
+        Decode the whole JSON array, exactly as a non-lazy load would.
+        """
+        return get_json_codec().loads(self._buffer[self._start : self._end])
+
+    def __iter__(self) -> Iterator[str]:
+        if self._has_escapes:
+            for start, end in zip(self._starts, self._ends):
+                yield self._decode(start, end)
+            return
+        buffer = self._buffer
+        pos = self._start
+        for _ in range(self._length):
+            start = buffer.find(b'"', pos)
+            pos = buffer.find(b'"', start + 1) + 1
+            yield self._decode(start, pos)
+
+
+def _find_array_end(buffer: bytes | mmap.mmap, start: int) -> int:
+    """
+    Find the position after the `]` that closes an array of strings.
+
+    Args:
+        buffer: Content of the arguments file.
+        start: Position of the `[` character that opens the array.
+    """
+    # Without escaped characters, a `]` is outside of strings if and only if
+    # it is preceded by an even number of `"` characters
+    pos = start
+    while (end := buffer.find(b"]", pos)) != -1:
+        if _count(buffer, b'"', start, end) % 2 == 0:
+            if buffer.find(b"\\", start, end) == -1:
+                return end + 1
+            break
+        pos = end + 1
+    # Slower path, for arrays with escaped characters
+    for match in _STRING_OR_ARRAY_END.finditer(buffer, start + 1):
+        if match.group() == b"]":
+            return match.end()
+    raise ValueError("Could not find the end of the `zarr_urls` array.")
+
+
+def _find_zarr_urls_array(buffer: bytes | mmap.mmap) -> tuple[int, int] | None:
+    """
+    Find the `zarr_urls` array of the top-level JSON object.
+
+    Returns:
+        The start and end positions of the array, or `None` if the object has
+        no `zarr_urls` key or if its value is not an array.
+    """
+    depth = 0
+    pos = 0
+    while (match := _TOKEN.search(buffer, pos)) is not None:
+        pos = match.end()
+        if match["string"] is None:
+            depth += 1 if buffer[match.start()] in b"[{" else -1
+        elif depth == 1 and match["colon"] and match["string"] == b'"zarr_urls"':
+            array_match = _ARRAY_START.match(buffer, pos)
+            if array_match is None:
+                return None
+            start = array_match.end() - 1
+            return start, _find_array_end(buffer, start)
+    return None
+
+
+def load_task_args_with_lazy_zarr_urls(args_json: str) -> dict[str, Any]:
+    """
+    Read the task-arguments dictionary, with a lazy `zarr_urls` sequence.
+
+    The arguments file is memory-mapped (when possible, and if it is not
+    compressed), and the `zarr_urls` list is replaced by a `LazyZarrUrls`
+    object. All other arguments are parsed as usual.
+
+    Args:
+        args_json: Path of the arguments file.
+    """
+    if is_compressed(args_json):
+        # Compressed files cannot be memory-mapped
+        with open_file(args_json, "rb") as f:
+            buffer = f.read()
+    else:
+        with open(args_json, "rb") as f:
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # E.g. for empty files or for files that do not support `mmap`
+                buffer = f.read()
+    codec = get_json_codec()
+    array_span = _find_zarr_urls_array(buffer)
+    if array_span is None:
+        return codec.loads(buffer[:])
+    start, end = array_span
+    pars = codec.loads(buffer[:start] + b"[]" + buffer[end:])
+    pars["zarr_urls"] = LazyZarrUrls(buffer=buffer, start=start, end=end)
+    return pars
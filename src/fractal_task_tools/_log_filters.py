@@ -0,0 +1,165 @@
+"""
+Deduplication and rate limiting of log records, for tasks that log within
+hot loops (e.g. for each chunk or field of view).
+
+The filter is set on the root-logger handler by `setup_logging_config`, so
+that suppressed records are neither formatted nor written. Suppressed records
+are summarized by a single record, emitted when the deduplication window (or
+the one-second rate-limit window) is over, or when the task unit ends.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+# Levels of records that are never dropped by the rate limit
+RATE_LIMIT_EXEMPT_LEVEL = logging.ERROR
+
+
+class _Repeated:
+    """
+    Identical records of the same call site, within the current window.
+    """
+
+    __slots__ = ("start_time", "count", "last_record")
+
+    def __init__(self, start_time: float):
+        self.start_time = start_time
+        self.count = 0
+        self.last_record: logging.LogRecord | None = None
+
+
+class _LoggerRate:
+    """
+    Records of a logger, within the current one-second window.
+    """
+
+    __slots__ = ("start_time", "count", "dropped")
+
+    def __init__(self, start_time: float):
+        self.start_time = start_time
+        self.count = 0
+        self.dropped = 0
+
+
+class LogVolumeFilter(logging.Filter):
+    """
+    Handler filter that collapses repeated records and caps the rate of
+    records of each logger.
+
+    Attributes:
+        dedup_window:
+            Interval (in seconds) during which identical records from the
+            same call site are collapsed, if set.
+        rate_limit: Maximum number of records per second per logger, if set.
+    """
+
+    def __init__(self, *, dedup_window: float | None, rate_limit: int | None):
+        super().__init__()
+        self.dedup_window = dedup_window
+        self.rate_limit = rate_limit
+        # NOTE: windows are stored in order of start time, so that expired
+        # ones are found at the beginning
+        self._repeated: OrderedDict[tuple, _Repeated] = OrderedDict()
+        self._rates: dict[str, _LoggerRate] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "log_volume_summary", False):
+            return True
+        summaries = []
+        with self._lock:
+            keep = True
+            if self.dedup_window is not None:
+                keep = self._check_repeated(record, summaries)
+            if keep and self.rate_limit is not None:
+                keep = self._check_rate(record, summaries)
+        for summary in summaries:
+            _emit(summary)
+        return keep
+
+    def _check_repeated(self, record: logging.LogRecord, summaries: list) -> bool:
+        now = record.created
+        # Close expired windows
+        while self._repeated:
+            key, repeated = next(iter(self._repeated.items()))
+            if now - repeated.start_time < self.dedup_window:
+                break
+            del self._repeated[key]
+            if repeated.count > 0:
+                summaries.append(self._summarize_repeated(repeated))
+        key = (record.pathname, record.lineno, record.levelno, record.getMessage())
+        repeated = self._repeated.get(key)
+        if repeated is None:
+            self._repeated[key] = _Repeated(now)
+            return True
+        repeated.count += 1
+        repeated.last_record = record
+        return False
+
+    def _check_rate(self, record: logging.LogRecord, summaries: list) -> bool:
+        now = record.created
+        rate = self._rates.get(record.name)
+        if rate is None or now - rate.start_time >= 1.0:
+            if rate is not None and rate.dropped > 0:
+                summaries.append(self._summarize_rate(record.name, rate))
+            rate = self._rates[record.name] = _LoggerRate(now)
+        if rate.count < self.rate_limit or record.levelno >= RATE_LIMIT_EXEMPT_LEVEL:
+            rate.count += 1
+            return True
+        rate.dropped += 1
+        return False
+
+    def _summarize_repeated(self, repeated: _Repeated) -> logging.LogRecord:
+        record = repeated.last_record
+        duration = record.created - repeated.start_time
+        # NOTE: the summary keeps the logger, level and call site of the
+        # repeated records
+        summary = logging.makeLogRecord(record.__dict__)
+        summary.msg = (
+            f"{record.getMessage()} [repeated {repeated.count} more times in "
+            f"{duration:.1f}s]"
+        )
+        summary.args = None
+        summary.exc_info = None
+        summary.exc_text = None
+        summary.stack_info = None
+        summary.log_volume_summary = True
+        return summary
+
+    def _summarize_rate(self, name: str, rate: _LoggerRate) -> logging.LogRecord:
+        summary = logging.LogRecord(
+            name,
+            logging.WARNING,
+            "",
+            0,
+            (
+                f"Dropped {rate.dropped} records of the {name} logger (rate "
+                f"limit: {self.rate_limit} records per second)."
+            ),
+            None,
+            None,
+        )
+        summary.log_volume_summary = True
+        return summary
+
+    def flush(self) -> None:
+        """
+        Emit the summaries of all open windows.
+        """
+        summaries = []
+        with self._lock:
+            for repeated in self._repeated.values():
+                if repeated.count > 0:
+                    summaries.append(self._summarize_repeated(repeated))
+            for name, rate in self._rates.items():
+                if rate.dropped > 0:
+                    summaries.append(self._summarize_rate(name, rate))
+            self._repeated.clear()
+            self._rates.clear()
+        for summary in summaries:
+            _emit(summary)
+
+
+def _emit(summary: logging.LogRecord) -> None:
+    logging.getLogger(summary.name).handle(summary)
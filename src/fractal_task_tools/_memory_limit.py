@@ -0,0 +1,98 @@
+"""
+Memory limits of task units, from the task `meta` in the package manifest.
+
+When `FRACTAL_TASK_MEMORY_LIMIT` is `data` or `as`, the `RLIMIT_DATA` or
+`RLIMIT_AS` soft limit of the process is set to the `mem` value of the task
+`meta` while the task function runs, so that allocations beyond it raise a
+`MemoryError` (rather than making the node swap, or triggering the OOM
+killer).
+"""
+
+import logging
+import os
+import resource
+import typing
+from contextlib import contextmanager
+from typing import Iterator
+
+from ._installed_manifest import get_task_meta
+from ._resource_usage import parse_mem
+from .logging_config import WRAPPER_LOGGER_NAME
+
+logger = logging.getLogger(WRAPPER_LOGGER_NAME)
+
+ValidMemoryLimit = typing.Literal["none", "data", "as"]
+ALLOWED_MEMORY_LIMITS: tuple[ValidMemoryLimit, ...] = typing.get_args(ValidMemoryLimit)
+DEFAULT_MEMORY_LIMIT: ValidMemoryLimit = "none"
+
+_RLIMITS = {"data": resource.RLIMIT_DATA, "as": resource.RLIMIT_AS}
+
+
+def get_memory_limit() -> ValidMemoryLimit:
+    """
+    Get valid memory-limit mode from environment variable or default value.
+    """
+    # Use default value if the env variable is unset or set to an empty string
+    memory_limit = os.getenv("FRACTAL_TASK_MEMORY_LIMIT") or DEFAULT_MEMORY_LIMIT
+    # Validate `memory_limit`
+    if memory_limit not in ALLOWED_MEMORY_LIMITS:
+        raise ValueError(
+            f"Invalid FRACTAL_TASK_MEMORY_LIMIT={memory_limit} environment "
+            f"variable. Allowed values: {ALLOWED_MEMORY_LIMITS}."
+        )
+    return memory_limit
+
+
+@contextmanager
+def limit_memory(*, task_function: callable) -> Iterator[None]:
+    """
+    Apply the memory limit from the task `meta` within the enclosed block,
+    based on the `FRACTAL_TASK_MEMORY_LIMIT` environment variable.
+
+    Only the soft limit is changed, and it is restored at the end of the
+    block (e.g. for the following units of a worker).
+
+    Args:
+        task_function: Callable function that runs the task.
+    """
+    memory_limit = get_memory_limit()
+    if memory_limit == "none":
+        yield
+        return
+    meta = get_task_meta(task_function) or {}
+    mem = parse_mem(meta.get("mem"))
+    if mem is None or mem <= 0:
+        logger.warning(
+            f"FRACTAL_TASK_MEMORY_LIMIT={memory_limit} is set, but the "
+            f"{task_function.__name__} task has no `mem` in its manifest "
+            "`meta`. No memory limit is applied."
+        )
+        yield
+        return
+
+    rlimit = _RLIMITS[memory_limit]
+    rlimit_name = f"RLIMIT_{memory_limit.upper()}"
+    soft, hard = resource.getrlimit(rlimit)
+    limit = int(mem * 1024**2)
+    # Never raise a stricter existing limit
+    for current in (soft, hard):
+        if current != resource.RLIM_INFINITY:
+            limit = min(limit, current)
+    resource.setrlimit(rlimit, (limit, hard))
+    logger.info(
+        f"Set {rlimit_name} soft limit to {limit / 1024**2:.0f} MB, from task "
+        f"meta (mem={meta['mem']})."
+    )
+    try:
+        yield
+    except MemoryError:
+        # Restore the limit first, to free some headroom for logging
+        resource.setrlimit(rlimit, (soft, hard))
+        logger.error(
+            f"The {task_function.__name__} task exceeded its memory limit "
+            f"({rlimit_name}={limit / 1024**2:.0f} MB, from task meta "
+            f"mem={meta['mem']})."
+        )
+        raise
+    finally:
+        resource.setrlimit(rlimit, (soft, hard))
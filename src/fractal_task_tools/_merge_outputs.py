@@ -0,0 +1,156 @@
+"""
+Merge of many task-output files into a single one.
+
+Output files are read and parsed by a pool of threads, with a bounded number
+of files in flight, and they are merged one at a time in the order of the
+input paths. Memory usage is therefore bounded by the size of the merged
+output, rather than by the total size of the input files.
+"""
+
+import logging
+from collections import deque
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+
+from ._compression import open_file
+from ._json_codec import get_json_codec
+from ._task_output import IMAGE_LIST_REMOVALS
+from ._task_output import IMAGE_LIST_UPDATES
+from ._task_output import write_streaming_task_output
+
+logger = logging.getLogger(__name__)
+
+# Image keys which are merged (rather than replaced) for repeated `zarr_url`s
+MERGED_IMAGE_KEYS = ("attributes", "types")
+
+
+def read_task_output(path: str) -> dict[str, list]:
+    """
+    Read and validate a task-output file.
+
+    Args:
+        path:
+            Path of the output file, which is decompressed if its extension
+            is `.gz` or `.zst`.
+
+    Returns:
+        Task output, where a `null` output is replaced by an empty one.
+    """
+    with open_file(path, "rb") as f:
+        task_output = get_json_codec().loads(f.read())
+    if task_output is None:
+        return {}
+    if not isinstance(task_output, dict):
+        raise ValueError(f"Invalid task output in {path}: it is not an object.")
+    invalid_keys = set(task_output) - {IMAGE_LIST_UPDATES, IMAGE_LIST_REMOVALS}
+    if invalid_keys:
+        raise ValueError(f"Invalid keys in task output {path}: {sorted(invalid_keys)}.")
+    for image in task_output.get(IMAGE_LIST_UPDATES, []):
+        if not isinstance(image, dict) or not isinstance(image.get("zarr_url"), str):
+            raise ValueError(f"Invalid item of {IMAGE_LIST_UPDATES} in {path}.")
+    for zarr_url in task_output.get(IMAGE_LIST_REMOVALS, []):
+        if not isinstance(zarr_url, str):
+            raise ValueError(f"Invalid item of {IMAGE_LIST_REMOVALS} in {path}.")
+    return task_output
+
+
+def _read_task_outputs(
+    paths: Iterable[str],
+    *,
+    max_workers: int,
+) -> Iterator[tuple[str, dict[str, list]]]:
+    """
+    Read task-output files in parallel, and yield them in the input order.
+
+    At most `2 * max_workers` files are read (or waiting to be consumed) at
+    any time.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    max_in_flight = 2 * max_workers
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        try:
+            for path in paths:
+                in_flight.append((path, executor.submit(read_task_output, path)))
+                if len(in_flight) >= max_in_flight:
+                    path, future = in_flight.popleft()
+                    yield path, future.result()
+            while in_flight:
+                path, future = in_flight.popleft()
+                yield path, future.result()
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+
+
+def _merge_image(merged_image: dict[str, Any], image: dict[str, Any]) -> None:
+    """
+    Merge an update of a `zarr_url` into the previous updates.
+    """
+    for key, value in image.items():
+        if key in MERGED_IMAGE_KEYS and isinstance(merged_image.get(key), dict):
+            merged_image[key] = {**merged_image[key], **value}
+        else:
+            merged_image[key] = value
+
+
+def merge_task_outputs(
+    paths: Iterable[str],
+    out_json: str,
+    *,
+    max_workers: int | None = None,
+) -> None:
+    """
+    Merge many task-output files into a single one.
+
+    The `image_list_updates` of all files are merged by `zarr_url`: for a
+    `zarr_url` that appears more than once, the `attributes` and `types` of
+    later updates are merged into the previous ones, and other keys (e.g.
+    `origin`) are replaced. All `image_list_removals` are then applied, that
+    is, removed `zarr_url`s are dropped from the merged updates. Updates and
+    removals keep the order in which each `zarr_url` first appears.
+
+    Args:
+        paths:
+            Paths of the output files (possibly a lazy iterable), merged in
+            this order.
+        out_json: Path of the merged output file.
+        max_workers:
+            Number of reader threads (by default, the number of available
+            CPUs).
+    """
+    from ._batch import get_available_cpus
+
+    if max_workers is None:
+        max_workers = get_available_cpus()
+
+    updates: dict[str, dict[str, Any]] = {}
+    removals: dict[str, None] = {}
+    num_files = 0
+    for path, task_output in _read_task_outputs(paths, max_workers=max_workers):
+        num_files += 1
+        for image in task_output.get(IMAGE_LIST_UPDATES, []):
+            zarr_url = image["zarr_url"]
+            if zarr_url in updates:
+                _merge_image(updates[zarr_url], image)
+            else:
+                updates[zarr_url] = image
+        for zarr_url in task_output.get(IMAGE_LIST_REMOVALS, []):
+            removals[zarr_url] = None
+        logger.debug(f"[{num_files}] Merged {path}.")
+
+    num_updates = sum(zarr_url not in removals for zarr_url in updates)
+    logger.info(
+        f"Merged {num_files} task outputs into {out_json} "
+        f"({num_updates} updates, {len(removals)} removals)."
+    )
+
+    def _iter_items() -> Iterator[dict[str, Any] | str]:
+        for zarr_url, image in updates.items():
+            if zarr_url not in removals:
+                yield image
+        yield from removals
+
+    write_streaming_task_output(_iter_items(), out_json)
@@ -0,0 +1,115 @@
+"""
+`fractal-task-outputs` command-line interface.
+"""
+
+import argparse as ap
+import logging
+import sys
+from pathlib import Path
+from typing import Iterator
+
+from fractal_task_tools._merge_outputs import merge_task_outputs
+
+main_parser = ap.ArgumentParser(
+    description="`fractal-task-outputs` command-line interface",
+    allow_abbrev=False,
+)
+
+
+subparsers = main_parser.add_subparsers(
+    title="Available commands",
+    dest="cmd",
+)
+
+
+merge_parser = subparsers.add_parser(
+    "merge",
+    description=(
+        "Merge many task-output files into a single one, merging "
+        "`image_list_updates` by `zarr_url` and applying "
+        "`image_list_removals`"
+    ),
+    allow_abbrev=False,
+)
+merge_parser.add_argument(
+    "paths",
+    type=str,
+    nargs="*",
+    help="Paths of the task-output files, merged in this order.",
+)
+merge_parser.add_argument(
+    "--files-from",
+    type=str,
+    help=(
+        "File with the paths of the task-output files, one per line "
+        "(use '-' for standard input). These paths are merged after the "
+        "positional ones."
+    ),
+    required=False,
+)
+merge_parser.add_argument(
+    "--out-json",
+    type=str,
+    help="Path of the merged output file (which must not exist).",
+    required=True,
+)
+merge_parser.add_argument(
+    "--max-workers",
+    type=int,
+    help="Number of reader threads (default: number of available CPUs).",
+    required=False,
+)
+
+
+def _parse_arguments(sys_argv: list[str] | None = None) -> ap.Namespace:
+    """
+    Parse `sys.argv` or custom CLI arguments.
+
+    Arguments:
+        sys_argv: If set, overrides `sys.argv` (useful for testing).
+    """
+    if sys_argv is None:
+        sys_argv = sys.argv[:]
+    args = main_parser.parse_args(sys_argv[1:])
+    if args.cmd is None:
+        sys.exit("Error: No command specified (valid options: 'merge').")
+    if not args.paths and args.files_from is None:
+        sys.exit("Error: No task-output files specified.")
+    return args
+
+
+def _iter_paths(paths: list[str], files_from: str | None) -> Iterator[str]:
+    """
+    Iterate over positional paths, and then over the paths in `files_from`.
+    """
+    yield from paths
+    if files_from is None:
+        return
+    if files_from == "-":
+        lines = sys.stdin
+    else:
+        lines = open(files_from, "r")
+    try:
+        for line in lines:
+            path = line.strip()
+            if path:
+                yield path
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+
+
+def main():
+    """
+    Main CLI entrypoint.
+    """
+    logging.basicConfig(level=logging.INFO)
+    args = _parse_arguments()
+    if args.cmd == "merge":
+        if Path(args.out_json).exists():
+            sys.exit(f"Error: Output file {args.out_json} already exists.")
+        merge_task_outputs(
+            _iter_paths(args.paths, args.files_from),
+            args.out_json,
+            max_workers=args.max_workers,
+        )
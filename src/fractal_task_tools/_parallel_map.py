@@ -0,0 +1,240 @@
+"""
+Parallel map of a per-image function over the `zarr_urls` of a non-parallel
+task.
+"""
+
+import logging
+import typing
+from collections import deque
+from typing import Any
+from typing import Callable
+from typing import Iterator
+from typing import Sequence
+
+from ._task_output import IMAGE_LIST_REMOVALS
+from ._task_output import IMAGE_LIST_UPDATES
+from .logging_config import WRAPPER_LOGGER_NAME
+
+if typing.TYPE_CHECKING:
+    from concurrent.futures import Future
+
+logger = logging.getLogger(WRAPPER_LOGGER_NAME)
+
+ValidMapExecutor = typing.Literal["thread", "process"]
+ALLOWED_MAP_EXECUTORS: tuple[ValidMapExecutor, ...] = typing.get_args(ValidMapExecutor)
+
+# Maximum number of per-image errors included in the exception message
+MAX_REPORTED_FAILURES = 10
+
+PerImageFunction = Callable[[str], dict[str, Any] | None]
+
+
+def _merge_image_output(
+    output: dict[str, Any],
+    image_output: Any,
+) -> None:
+    """
+    Append the output of a single image to the merged task output.
+    """
+    if image_output is None:
+        return
+    if not isinstance(image_output, dict):
+        raise TypeError(
+            "Per-image output must be a dictionary or None, "
+            f"not {type(image_output).__name__}."
+        )
+    invalid_keys = set(image_output) - {IMAGE_LIST_UPDATES, IMAGE_LIST_REMOVALS}
+    if invalid_keys:
+        raise ValueError(f"Invalid keys in per-image output: {sorted(invalid_keys)}.")
+    for key, value in image_output.items():
+        if not isinstance(value, list):
+            raise TypeError(
+                f"Per-image `{key}` must be a list, not {type(value).__name__}."
+            )
+    output[IMAGE_LIST_UPDATES].extend(image_output.get(IMAGE_LIST_UPDATES, []))
+    output[IMAGE_LIST_REMOVALS].extend(image_output.get(IMAGE_LIST_REMOVALS, []))
+
+
+def _run_in_separate_processes(
+    function: PerImageFunction,
+    zarr_urls: Sequence[str],
+    indices: list[int],
+    *,
+    max_workers: int,
+) -> Iterator[tuple[int, "Future"]]:
+    """
+    Run `function` for some images, each one in its own single-process pool
+    (with up to `max_workers` pools at a time), so that a process that dies
+    only fails its own image.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures import wait
+
+    for start in range(0, len(indices), max_workers):
+        pools = []
+        future_to_index = {}
+        try:
+            for ind in indices[start : start + max_workers]:
+                pool = ProcessPoolExecutor(max_workers=1)
+                pools.append(pool)
+                future_to_index[pool.submit(function, zarr_urls[ind])] = ind
+            wait(future_to_index)
+        finally:
+            for pool in pools:
+                pool.shutdown()
+        for future, ind in future_to_index.items():
+            yield ind, future
+
+
+def map_zarr_urls(
+    function: PerImageFunction,
+    zarr_urls: Sequence[str],
+    *,
+    executor: ValidMapExecutor = "thread",
+    max_workers: int | None = None,
+    allow_failures: bool = False,
+) -> dict[str, list]:
+    """
+    Run a per-image function over `zarr_urls` in parallel, and merge outputs.
+
+    Each call of `function` receives a single `zarr_url`, and it returns
+    either `None` or the output of a parallel task (that is, a dictionary
+    with `image_list_updates` and/or `image_list_removals`). For instance:
+    ```python
+    from functools import partial
+    from fractal_task_tools.task_wrapper import map_zarr_urls
+
+
+    def process_image(zarr_url: str, threshold: float) -> dict:
+        ...
+        return {"image_list_updates": [{"zarr_url": zarr_url}]}
+
+
+    @validate_call
+    def my_task(zarr_urls: list[str], zarr_dir: str, threshold: float):
+        return map_zarr_urls(
+            partial(process_image, threshold=threshold),
+            zarr_urls,
+            executor="process",
+        )
+    ```
+    With the `process` executor, `function` must be picklable (e.g. a
+    module-level function, or a `functools.partial` of one). If a worker
+    process dies (e.g. because of a crash or an out-of-memory kill), the
+    images that were running in the pool are re-run each in its own process,
+    so that only the image whose process dies again fails.
+
+    At most `2 * max_workers` images are submitted to the pool (or waiting to
+    be consumed) at any time.
+
+    Args:
+        function: Function to call for each `zarr_url`.
+        zarr_urls: Input images.
+        executor:
+            Either `thread` (for I/O-bound functions, or functions that
+            release the GIL) or `process`.
+        max_workers:
+            Size of the thread or process pool (by default, the number of
+            available CPUs, or `SLURM_CPUS_PER_TASK` when set).
+        allow_failures:
+            If `True`, failed images are logged and skipped. If `False`, a
+            `RuntimeError` listing the failed images is raised, after all
+            images are processed.
+
+    Returns:
+        Task output with the `image_list_updates` and `image_list_removals`
+        of all images, in the order of `zarr_urls`.
+    """
+    # Imported here, since they are not needed by standard task units
+    from concurrent.futures import FIRST_COMPLETED
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures import ThreadPoolExecutor
+    from concurrent.futures import wait
+    from concurrent.futures.process import BrokenProcessPool
+
+    from ._batch import get_available_cpus
+
+    if executor not in ALLOWED_MAP_EXECUTORS:
+        raise ValueError(
+            f"Invalid {executor=}. Allowed values: {ALLOWED_MAP_EXECUTORS}."
+        )
+    if max_workers is None:
+        max_workers = get_available_cpus()
+    executor_class = ThreadPoolExecutor if executor == "thread" else ProcessPoolExecutor
+
+    num_images = len(zarr_urls)
+    logger.info(f"Map START ({num_images} images, {executor=}, {max_workers=}).")
+    image_outputs: list[Any] = [None] * num_images
+    failures: dict[int, str] = {}
+    num_done = 0
+
+    def record_result(ind: int, future: "Future") -> None:
+        nonlocal num_done
+        num_done += 1
+        try:
+            image_outputs[ind] = future.result()
+        except Exception as e:
+            failures[ind] = f"{type(e).__name__}: {e}"
+            logger.error(
+                f"[{num_done}/{num_images}] {zarr_urls[ind]} failed.",
+                exc_info=e,
+            )
+        else:
+            logger.debug(f"[{num_done}/{num_images}] {zarr_urls[ind]} done.")
+
+    max_in_flight = 2 * max_workers
+    pending = deque(range(num_images))
+    while pending:
+        # Images that were running or queued when a worker process died
+        suspects = []
+        with executor_class(max_workers=max_workers) as pool:
+            future_to_index = {}
+            while (pending or future_to_index) and not suspects:
+                while pending and len(future_to_index) < max_in_flight:
+                    ind = pending.popleft()
+                    future = pool.submit(function, zarr_urls[ind])
+                    future_to_index[future] = ind
+                done, _ = wait(future_to_index, return_when=FIRST_COMPLETED)
+                if any(
+                    isinstance(future.exception(), BrokenProcessPool) for future in done
+                ):
+                    done = future_to_index
+                for future in list(done):
+                    ind = future_to_index.pop(future)
+                    if future.done() and not isinstance(
+                        future.exception(), BrokenProcessPool
+                    ):
+                        record_result(ind, future)
+                    else:
+                        suspects.append(ind)
+        if suspects:
+            logger.warning(
+                f"A worker process died, running {len(suspects)} images again "
+                "in separate processes."
+            )
+            for ind, future in _run_in_separate_processes(
+                function, zarr_urls, sorted(suspects), max_workers=max_workers
+            ):
+                record_result(ind, future)
+
+    output = {IMAGE_LIST_UPDATES: [], IMAGE_LIST_REMOVALS: []}
+    for ind, image_output in enumerate(image_outputs):
+        if ind in failures:
+            continue
+        try:
+            _merge_image_output(output, image_output)
+        except (TypeError, ValueError) as e:
+            failures[ind] = f"{type(e).__name__}: {e}"
+            logger.error(f"{zarr_urls[ind]} has an invalid output: {e}")
+
+    logger.info(f"Map END ({len(failures)}/{num_images} failed images).")
+    if failures and not allow_failures:
+        details = "\n".join(
+            f"  {zarr_urls[ind]}: {error}"
+            for ind, error in sorted(failures.items())[:MAX_REPORTED_FAILURES]
+        )
+        num_failures = len(failures)
+        if num_failures > MAX_REPORTED_FAILURES:
+            details += f"\n  ... ({num_failures - MAX_REPORTED_FAILURES} more failures)"
+        raise RuntimeError(f"{num_failures}/{num_images} images failed:\n{details}")
+    return output
@@ -0,0 +1,86 @@
+"""
+Timing of the phases of a task unit (e.g. loading arguments or running the
+task function).
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+import typing
+from contextlib import contextmanager
+from typing import Iterator
+
+from .logging_config import WRAPPER_LOGGER_NAME
+
+logger = logging.getLogger(WRAPPER_LOGGER_NAME)
+
+ValidPhaseTimings = typing.Literal["log", "json"]
+ALLOWED_PHASE_TIMINGS: tuple[ValidPhaseTimings, ...] = typing.get_args(
+    ValidPhaseTimings
+)
+DEFAULT_PHASE_TIMINGS: ValidPhaseTimings = "log"
+
+
+def get_phase_timings() -> ValidPhaseTimings:
+    """
+    Get valid phase-timings output from environment variable or default value.
+    """
+    # Use default value if the env variable is unset or set to an empty string
+    phase_timings = os.getenv("FRACTAL_TASK_PHASE_TIMINGS") or DEFAULT_PHASE_TIMINGS
+    # Validate `phase_timings`
+    if phase_timings not in ALLOWED_PHASE_TIMINGS:
+        raise ValueError(
+            f"Invalid FRACTAL_TASK_PHASE_TIMINGS={phase_timings} environment "
+            f"variable. Allowed values: {ALLOWED_PHASE_TIMINGS}."
+        )
+    return phase_timings
+
+
+class PhaseTimer:
+    """
+    Durations of named phases, measured with a monotonic clock.
+
+    Attributes:
+        durations: Map from phase names to their durations (in seconds), in
+            the order in which the phases started.
+    """
+
+    def __init__(self):
+        self.durations: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Measure the duration of the enclosed block, also if it fails.
+        """
+        self.durations.setdefault(name, 0.0)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.durations[name] += time.monotonic() - start
+
+    def report(self, task_name: str) -> None:
+        """
+        Log the phase durations, and also write them to standard error as a
+        JSON line if `FRACTAL_TASK_PHASE_TIMINGS=json`.
+        """
+        if not self.durations:
+            return
+        logger.info(
+            f"Phase timings for {task_name} task: "
+            + ", ".join(
+                f"{name}={duration:.4f}s" for name, duration in self.durations.items()
+            )
+        )
+        if get_phase_timings() == "json":
+            line = dict(
+                event="phase_timings",
+                task=task_name,
+                pid=os.getpid(),
+                durations=self.durations,
+            )
+            sys.stderr.write(json.dumps(line) + "\n")
+            sys.stderr.flush()
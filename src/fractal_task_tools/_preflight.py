@@ -0,0 +1,88 @@
+"""
+Preflight validation of task arguments, before importing the task module.
+"""
+
+import logging
+import sys
+from pathlib import Path
+
+from .logging_config import WRAPPER_LOGGER_NAME
+
+logger = logging.getLogger(WRAPPER_LOGGER_NAME)
+
+# Maximum number of validation errors included in the exit message
+MAX_REPORTED_ERRORS = 10
+
+
+def _get_args_json() -> str | None:
+    """
+    Get the `--args-json` CLI argument, if any.
+    """
+    from .task_wrapper import _get_argument_parser
+
+    parsed_args, _ = _get_argument_parser().parse_known_args()
+    return parsed_args.args_json
+
+
+def check_task_arguments() -> None:
+    """
+    Validate the task arguments against the schema in the package manifest.
+
+    This function is meant to be called by the task module before any of its
+    heavy imports, e.g.
+    ```python
+    if __name__ == "__main__":
+        from fractal_task_tools.task_wrapper import check_task_arguments
+
+        check_task_arguments()
+
+    import numpy as np  # noqa: E402
+    ```
+    so that invalid arguments are reported without waiting for these
+    imports (which then need a `# noqa: E402` comment, since they follow
+    other code). The arguments file is only read once, since the parsed
+    arguments are reused by `run_fractal_task`. The arguments schema
+    (`args_schema_parallel` or `args_schema_non_parallel`) is read from the
+    `__FRACTAL_MANIFEST__.json` file of the package of the `__main__` module,
+    and the check is skipped if the schema is not available (or in worker,
+    fork-server and batch modes). Invalid arguments make the process exit with an error.
+    """
+    from ._installed_manifest import get_manifest_task
+    from ._lazy_zarr_urls import LazyZarrUrls
+    from ._schema_validator import get_validator
+    from ._task_input import preload_task_args
+
+    args_json = _get_args_json()
+    if args_json is None:
+        return
+    main_file = getattr(sys.modules.get("__main__"), "__file__", None)
+    if main_file is None:
+        return
+    manifest_task = get_manifest_task(Path(main_file).resolve().as_posix())
+    if manifest_task is None:
+        logger.debug(f"Skip preflight check, since {main_file} is not in manifest.")
+        return
+    task, kind = manifest_task
+    schema = task.get(f"args_schema_{kind}")
+    if schema is None:
+        logger.debug(f"Skip preflight check, since {main_file} has no schema.")
+        return
+
+    # NOTE: the arguments are read only once, and then reused by the task
+    # wrapper. Only the first item of a lazy `zarr_urls` sequence is
+    # validated, so that large arrays are not decoded here (the other items
+    # are only validated by the task function, unless it uses lazy
+    # `zarr_urls`).
+    pars = preload_task_args(args_json)
+    zarr_urls = pars.get("zarr_urls")
+    if isinstance(zarr_urls, LazyZarrUrls):
+        pars = dict(pars, zarr_urls=zarr_urls[:1])
+    validate = get_validator(schema)
+    errors = validate(pars)
+    if errors:
+        details = "\n".join(f"  {error}" for error in errors[:MAX_REPORTED_ERRORS])
+        if len(errors) > MAX_REPORTED_ERRORS:
+            details += f"\n  ... ({len(errors) - MAX_REPORTED_ERRORS} more errors)"
+        # NOTE: logging is not configured yet, so the message is only written
+        # to standard error through `sys.exit`
+        sys.exit(f"Invalid task arguments in {args_json}:\n{details}")
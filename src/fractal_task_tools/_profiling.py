@@ -0,0 +1,179 @@
+"""
+Profiling of task functions, configured through environment variables.
+
+The profile of each task unit is written next to its output file, e.g.
+`out.prof` for `out.json`.
+"""
+
+import logging
+import os
+import sys
+import typing
+from contextlib import contextmanager
+from typing import Iterator
+
+from ._task_output import get_sidecar_path
+from .logging_config import WRAPPER_LOGGER_NAME
+
+logger = logging.getLogger(WRAPPER_LOGGER_NAME)
+
+ValidProfileMode = typing.Literal["none", "cprofile", "tracemalloc", "sample"]
+ALLOWED_PROFILE_MODES: tuple[ValidProfileMode, ...] = typing.get_args(ValidProfileMode)
+DEFAULT_PROFILE_MODE: ValidProfileMode = "none"
+
+PROFILE_SUFFIXES: dict[ValidProfileMode, str] = dict(
+    cprofile=".prof",
+    tracemalloc=".tracemalloc.txt",
+    sample=".sample.txt",
+)
+
+# Number of allocation sites in `tracemalloc` profiles
+TRACEMALLOC_TOP_N = 50
+# Interval between stack samples, in seconds
+SAMPLE_INTERVAL = 0.005
+
+
+def get_profile_mode() -> ValidProfileMode:
+    """
+    Get valid profile mode from environment variable or default value.
+    """
+    # Use default value if the env variable is unset or set to an empty string
+    profile_mode = os.getenv("FRACTAL_TASK_PROFILE") or DEFAULT_PROFILE_MODE
+    # Validate `profile_mode`
+    if profile_mode not in ALLOWED_PROFILE_MODES:
+        raise ValueError(
+            f"Invalid FRACTAL_TASK_PROFILE={profile_mode} environment "
+            f"variable. Allowed values: {ALLOWED_PROFILE_MODES}."
+        )
+    return profile_mode
+
+
+@contextmanager
+def _profile_cprofile(profile_path: str) -> Iterator[None]:
+    """
+    Write the `cProfile` statistics of the enclosed block, in `pstats` format.
+    """
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+
+
+@contextmanager
+def _profile_tracemalloc(profile_path: str) -> Iterator[None]:
+    """
+    Write the peak traced memory and the top allocation sites of the memory
+    that is still allocated at the end of the enclosed block.
+    """
+    import tracemalloc
+
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if not was_tracing:
+            tracemalloc.stop()
+        with open(profile_path, "w") as f:
+            f.write(f"Current traced memory: {current / 1024**2:.1f} MB\n")
+            f.write(f"Peak traced memory: {peak / 1024**2:.1f} MB\n")
+            f.write(f"Top {TRACEMALLOC_TOP_N} allocation sites:\n")
+            for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP_N]:
+                f.write(f"{stat}\n")
+
+
+class _StackSampler:
+    """
+    Thread that periodically samples the Python stack of another thread.
+
+    Attributes:
+        thread_id: Identifier of the sampled thread.
+        counts: Number of samples for each stack.
+    """
+
+    def __init__(self, thread_id: int):
+        import threading
+
+        self.thread_id = thread_id
+        self.counts: dict[tuple[str, ...], int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                key = tuple(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+@contextmanager
+def _profile_sample(profile_path: str) -> Iterator[None]:
+    """
+    Write a histogram of the sampled stacks of the enclosed block, in the
+    "collapsed stacks" format of flame-graph tools.
+    """
+    import threading
+
+    sampler = _StackSampler(threading.get_ident())
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.stop()
+        with open(profile_path, "w") as f:
+            for stack, count in sorted(
+                sampler.counts.items(), key=lambda item: item[1], reverse=True
+            ):
+                f.write(f"{';'.join(stack)} {count}\n")
+
+
+_PROFILERS = dict(
+    cprofile=_profile_cprofile,
+    tracemalloc=_profile_tracemalloc,
+    sample=_profile_sample,
+)
+
+
+@contextmanager
+def profile_task_call(*, out_json: str) -> Iterator[None]:
+    """
+    Profile the enclosed block, based on the `FRACTAL_TASK_PROFILE`
+    environment variable.
+
+    Args:
+        out_json: Path of the output file of the task unit.
+    """
+    profile_mode = get_profile_mode()
+    if profile_mode == "none":
+        yield
+        return
+    profile_path = get_sidecar_path(out_json, PROFILE_SUFFIXES[profile_mode])
+    try:
+        with _PROFILERS[profile_mode](profile_path):
+            yield
+    finally:
+        logger.info(f"Profile ({profile_mode}) written to {profile_path}.")
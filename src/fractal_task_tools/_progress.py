@@ -0,0 +1,165 @@
+"""
+Progress reports of task units, written to a heartbeat file.
+
+While a task function runs, each call of `report_progress` updates a small
+JSON file next to the output file (e.g. `out.heartbeat.json` for
+`out.json`). Writes are rate-limited, so that `report_progress` can be
+called from hot loops, and the heartbeat file is replaced atomically, so
+that readers never see a partial file.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any
+from typing import Iterator
+
+from ._env import get_positive_number
+from ._task_output import get_sidecar_path
+from .logging_config import WRAPPER_LOGGER_NAME
+
+logger = logging.getLogger(WRAPPER_LOGGER_NAME)
+
+HEARTBEAT_SUFFIX = ".heartbeat.json"
+DEFAULT_HEARTBEAT_INTERVAL: float = 5.0
+
+
+def get_heartbeat_interval() -> float:
+    """
+    Get the minimum interval (in seconds) between heartbeat-file writes.
+    """
+    # Use default value if the env variable is unset or set to an empty string
+    interval = get_positive_number("FRACTAL_TASK_HEARTBEAT_INTERVAL")
+    if interval is None:
+        return DEFAULT_HEARTBEAT_INTERVAL
+    return interval
+
+
+class ProgressReporter:
+    """
+    Rate-limited writer of the heartbeat file of a task unit.
+
+    Attributes:
+        path: Path of the heartbeat file.
+        interval: Minimum interval between writes, in seconds.
+        last_report_time:
+            Monotonic time of the latest progress report (written or not),
+            or of the creation of the reporter.
+    """
+
+    def __init__(self, *, out_json: str, interval: float):
+        self.path = get_sidecar_path(out_json, HEARTBEAT_SUFFIX)
+        self.interval = interval
+        self.start_time = time.monotonic()
+        self.last_report_time = self.start_time
+        self._next_write_time = self.start_time
+        self._pending: dict[str, Any] | None = None
+        self._lock = threading.Lock()
+
+    def report(self, done: int, total: int | None, extra: dict[str, Any]) -> None:
+        """
+        Record the progress of the task unit, and write the heartbeat file if
+        the previous write is older than `interval`.
+        """
+        now = time.monotonic()
+        self.last_report_time = now
+        self._pending = dict(done=done, total=total, extra=extra)
+        if now >= self._next_write_time:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the latest progress report, if it was not written yet.
+        """
+        # Concurrent calls (e.g. from a thread pool) skip the write, which
+        # is already in progress
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            pending, self._pending = self._pending, None
+            if pending is None:
+                return
+            now = time.monotonic()
+            self._next_write_time = now + self.interval
+            self._write(now=now, **pending)
+        finally:
+            self._lock.release()
+
+    def _write(
+        self,
+        *,
+        now: float,
+        done: int,
+        total: int | None,
+        extra: dict[str, Any],
+    ) -> None:
+        elapsed = now - self.start_time
+        rate = done / elapsed if elapsed > 0 else None
+        eta = None
+        if total is not None and rate:
+            eta = max(total - done, 0) / rate
+        heartbeat = dict(
+            pid=os.getpid(),
+            timestamp=time.time(),
+            elapsed=elapsed,
+            done=done,
+            total=total,
+            fraction=(done / total if total else None),
+            rate=rate,
+            eta=eta,
+            extra=extra,
+        )
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(heartbeat, f, default=str)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            # Progress reports never make the task unit fail
+            logger.warning(f"Could not write heartbeat file {self.path}: {e}")
+
+
+_current_reporter: ProgressReporter | None = None
+
+
+@contextmanager
+def track_progress(*, out_json: str) -> Iterator[ProgressReporter]:
+    """
+    Make `report_progress` write to the heartbeat file of `out_json`, within
+    the enclosed block. The latest report is always written at the end.
+    """
+    global _current_reporter
+    reporter = ProgressReporter(out_json=out_json, interval=get_heartbeat_interval())
+    previous_reporter, _current_reporter = _current_reporter, reporter
+    try:
+        yield reporter
+    finally:
+        _current_reporter = previous_reporter
+        reporter.flush()
+
+
+def report_progress(done: int, total: int | None = None, **extra: Any) -> None:
+    """
+    Report the progress of the running task unit.
+
+    The progress is written to a heartbeat file next to the output file
+    (e.g. `out.heartbeat.json` for `out.json`), which also includes the
+    elapsed time, the rate of progress and the estimated remaining time (in
+    seconds). Writes are rate-limited through the
+    `FRACTAL_TASK_HEARTBEAT_INTERVAL` environment variable (default: 5
+    seconds), so that this function can be called at every iteration of a
+    loop. Calls outside of `run_fractal_task` have no effect.
+
+    Args:
+        done: Number of completed items (e.g. images or chunks).
+        total: Total number of items, if known.
+        extra:
+            Additional values to include (under the `extra` key), which are
+            converted to strings if they are not JSON-serializable.
+    """
+    reporter = _current_reporter
+    if reporter is not None:
+        reporter.report(done, total, extra)
@@ -0,0 +1,239 @@
+"""
+Resource-usage reports for task units.
+
+When `FRACTAL_TASK_RESOURCE_REPORT=true`, each task unit writes a report
+next to its output file (e.g. `out.resources.json` for `out.json`), with the
+resources used by the unit and, when the task `meta` is available in the
+package manifest, the ratio between used and requested resources.
+"""
+
+import logging
+import os
+import resource
+import sys
+import time
+import typing
+from contextlib import contextmanager
+from typing import Any
+from typing import Iterator
+
+from ._installed_manifest import get_task_meta
+from ._json_codec import get_json_codec
+from ._task_output import get_sidecar_path
+from .logging_config import WRAPPER_LOGGER_NAME
+
+logger = logging.getLogger(WRAPPER_LOGGER_NAME)
+
+ValidResourceReport = typing.Literal["true", "false"]
+ALLOWED_RESOURCE_REPORTS: tuple[ValidResourceReport, ...] = typing.get_args(
+    ValidResourceReport
+)
+DEFAULT_RESOURCE_REPORT: ValidResourceReport = "false"
+
+RESOURCE_REPORT_SUFFIX = ".resources.json"
+
+# Units of memory sizes in `meta["mem"]`, in MB
+_MEM_UNITS = {"K": 1 / 1024, "M": 1, "G": 1024, "T": 1024**2}
+
+
+def get_resource_report() -> bool:
+    """
+    Get whether to write resource-usage reports, from environment variable
+    or default value.
+    """
+    # Use default value if the env variable is unset or set to an empty string
+    value = os.getenv("FRACTAL_TASK_RESOURCE_REPORT") or DEFAULT_RESOURCE_REPORT
+    # Validate `value`
+    if value not in ALLOWED_RESOURCE_REPORTS:
+        raise ValueError(
+            f"Invalid FRACTAL_TASK_RESOURCE_REPORT={value} environment "
+            f"variable. Allowed values: {ALLOWED_RESOURCE_REPORTS}."
+        )
+    return value == "true"
+
+
+def _maxrss_to_mb(maxrss: int) -> float:
+    if sys.platform == "darwin":
+        # On macOS, `ru_maxrss` is in bytes
+        return maxrss / 1024**2
+    return maxrss / 1024
+
+
+def _reset_peak_rss() -> bool:
+    """
+    Reset the peak RSS of the current process (only available on Linux).
+
+    Returns:
+        Whether the reset succeeded.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _get_peak_rss(peak_rss_was_reset: bool) -> float:
+    """
+    Get the peak RSS (in MB) of the current process.
+
+    If the peak RSS could not be reset, this is the peak RSS over the whole
+    process lifetime.
+    """
+    if peak_rss_was_reset:
+        try:
+            with open("/proc/self/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) / 1024
+        except (OSError, ValueError, IndexError):
+            pass
+    return _maxrss_to_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def _get_io_counters() -> dict[str, int] | None:
+    """
+    Get the number of bytes read/written by the current process.
+
+    These are the `rchar`/`wchar` counters of `/proc/self/io`, which include
+    network and parallel filesystems, or `None` if they are not available.
+    """
+    try:
+        with open("/proc/self/io", "r") as f:
+            counters = dict(line.split(":") for line in f if line.strip())
+        return dict(
+            bytes_read=int(counters["rchar"]),
+            bytes_written=int(counters["wchar"]),
+        )
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def parse_mem(mem: Any) -> float | None:
+    """
+    Convert a `meta["mem"]` value (e.g. `4000` or `"4G"`) to MB.
+    """
+    if isinstance(mem, bool):
+        return None
+    if isinstance(mem, (int, float)):
+        return float(mem)
+    if isinstance(mem, str) and mem:
+        mem = mem.strip().upper().removesuffix("B")
+        unit = _MEM_UNITS.get(mem[-1:])
+        try:
+            if unit is None:
+                return float(mem)
+            return float(mem[:-1]) * unit
+        except ValueError:
+            return None
+    return None
+
+
+def compare_with_meta(usage: dict[str, Any], meta: dict[str, Any]) -> dict:
+    """
+    Compare the used resources with the ones requested in the task `meta`.
+
+    Returns:
+        The requested CPUs and memory, and the used fraction of each one of
+        them (for the CPUs, this is the CPU time over the wall time, divided
+        by the requested CPUs).
+    """
+    comparison = {}
+    cpus_per_task = meta.get("cpus_per_task")
+    if isinstance(cpus_per_task, (int, float)) and cpus_per_task > 0:
+        cpu_time = usage["user_time"] + usage["system_time"]
+        comparison["cpus_per_task"] = cpus_per_task
+        if usage["wall_time"] > 0:
+            comparison["cpu_usage_fraction"] = (
+                cpu_time / usage["wall_time"] / cpus_per_task
+            )
+    mem = parse_mem(meta.get("mem"))
+    if mem is not None and mem > 0:
+        comparison["mem"] = mem
+        comparison["mem_usage_fraction"] = usage["peak_rss"] / mem
+    return comparison
+
+
+class ResourceUsage:
+    """
+    Resources used by the current process since the object was created.
+
+    Resources used by child processes are included, once they terminated.
+    """
+
+    def __init__(self):
+        self._peak_rss_was_reset = _reset_peak_rss()
+        self._start_time = time.monotonic()
+        self._start_self = resource.getrusage(resource.RUSAGE_SELF)
+        self._start_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        self._start_io = _get_io_counters()
+
+    def get(self) -> dict[str, Any]:
+        """
+        Get the resources used so far.
+
+        Time values are in seconds, and memory values are in MB.
+        """
+        wall_time = time.monotonic() - self._start_time
+        end_self = resource.getrusage(resource.RUSAGE_SELF)
+        end_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        def _delta(field: str) -> float:
+            return (
+                getattr(end_self, field)
+                - getattr(self._start_self, field)
+                + getattr(end_children, field)
+                - getattr(self._start_children, field)
+            )
+
+        usage = dict(
+            wall_time=wall_time,
+            user_time=_delta("ru_utime"),
+            system_time=_delta("ru_stime"),
+            peak_rss=_get_peak_rss(self._peak_rss_was_reset),
+            peak_rss_children=_maxrss_to_mb(end_children.ru_maxrss),
+            voluntary_context_switches=_delta("ru_nvcsw"),
+            involuntary_context_switches=_delta("ru_nivcsw"),
+            bytes_read=None,
+            bytes_written=None,
+        )
+        end_io = _get_io_counters()
+        if self._start_io is not None and end_io is not None:
+            for key, value in end_io.items():
+                usage[key] = value - self._start_io[key]
+        return usage
+
+
+@contextmanager
+def record_resource_usage(*, task_function: callable, out_json: str) -> Iterator[None]:
+    """
+    Write the resource-usage report of the enclosed block, also if it fails.
+
+    Args:
+        task_function: Callable function that runs the task.
+        out_json: Path of the output file of the task unit.
+    """
+    usage = ResourceUsage()
+    success = False
+    try:
+        yield
+        success = True
+    finally:
+        report = dict(
+            task=task_function.__name__,
+            success=success,
+            usage=usage.get(),
+        )
+        meta = get_task_meta(task_function)
+        report["meta"] = meta
+        if meta is not None:
+            report["comparison"] = compare_with_meta(report["usage"], meta)
+        report_path = get_sidecar_path(out_json, RESOURCE_REPORT_SUFFIX)
+        with open(report_path, "wb") as f:
+            f.write(get_json_codec().dumps(report, compact=False))
+        logger.info(
+            f"Resource usage: wall time {report['usage']['wall_time']:.2f} s, "
+            f"peak RSS {report['usage']['peak_rss']:.1f} MB "
+            f"(report: {report_path})."
+        )
@@ -0,0 +1,218 @@
+"""
+Cache of task outputs, keyed on task arguments, task source and inputs.
+
+When the `FRACTAL_TASK_RESULT_CACHE_DIR` environment variable is set, the
+output file of each successful task unit is stored in that folder, and a
+later unit with the same cache key gets a copy of the stored output file
+without running the task function. The cache key combines:
+
+* the canonicalized task arguments;
+* the name and the source code of the task module, and the version of its
+  package (if available);
+* the modification time and size of the input paths declared by the task
+  (if any), e.g. the `.zattrs` file of the input image.
+"""
+
+import json
+import logging
+import os
+import sys
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Iterable
+
+from ._compression import remove_compressed_suffix
+from ._lazy_zarr_urls import LazyZarrUrls
+from .logging_config import WRAPPER_LOGGER_NAME
+
+logger = logging.getLogger(WRAPPER_LOGGER_NAME)
+
+# Version of the cache-key format, to be bumped whenever it changes
+RESULT_CACHE_VERSION = 2
+
+ResultCacheInputs = Callable[[dict[str, Any]], Iterable[str]]
+
+
+def get_result_cache_dir() -> str | None:
+    """
+    Get the result-cache folder from environment variable (if set).
+    """
+    # The cache is disabled if the env variable is unset or set to an empty
+    # string
+    return os.getenv("FRACTAL_TASK_RESULT_CACHE_DIR") or None
+
+
+def _to_json(obj: Any) -> Any:
+    """
+    Convert non-JSON objects in task arguments (e.g. lazy sequences).
+    """
+    if isinstance(obj, Path):
+        return obj.as_posix()
+    if isinstance(obj, LazyZarrUrls):
+        # NOTE: the key then depends on the formatting of the arguments file,
+        # but large arrays are not decoded (nor copied) just to be hashed
+        return dict(lazy_zarr_urls_sha256=obj.get_sha256())
+    if isinstance(obj, Sequence) and not isinstance(obj, (str, bytes)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _get_path_fingerprint(path: str) -> list | None:
+    """
+    Get the modification time (in ns) and size of a path, if it exists.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _get_task_source_fingerprint(task_function: callable) -> dict[str, Any]:
+    """
+    Get the name and the source hash of the task module, and the version of
+    its package.
+    """
+    import hashlib
+
+    from ._installed_manifest import get_package_root
+    from ._installed_manifest import get_task_executable
+
+    fingerprint = dict(
+        name=f"{task_function.__module__}.{task_function.__qualname__}",
+        source_sha256=None,
+        package_version=None,
+    )
+    executable = get_task_executable(task_function)
+    if executable is None:
+        return fingerprint
+    with open(executable, "rb") as f:
+        fingerprint["source_sha256"] = hashlib.sha256(f.read()).hexdigest()
+    module = sys.modules.get(task_function.__module__)
+    package_name = getattr(module, "__package__", None) or None
+    if package_name is None:
+        # For task modules run as scripts, the package name is the name of
+        # the package-root folder (where the manifest is)
+        package_root = get_package_root(executable)
+        if package_root is not None:
+            package_name = package_root.name
+    if package_name is not None:
+        from importlib.metadata import PackageNotFoundError
+        from importlib.metadata import version
+
+        try:
+            fingerprint["package_version"] = version(package_name.split(".")[0])
+        except PackageNotFoundError:
+            pass
+    return fingerprint
+
+
+def get_result_cache_key(
+    *,
+    task_function: callable,
+    pars: dict[str, Any],
+    inputs: Iterable[str],
+) -> str:
+    """
+    Compute the cache key of a task unit.
+
+    Args:
+        task_function: Callable function that runs the task.
+        pars: Task arguments.
+        inputs: Input paths of the task unit.
+    """
+    import hashlib
+
+    key_data = dict(
+        version=RESULT_CACHE_VERSION,
+        task=_get_task_source_fingerprint(task_function),
+        args=pars,
+        inputs=[[path, _get_path_fingerprint(path)] for path in inputs],
+    )
+    data = json.dumps(
+        key_data, sort_keys=True, separators=(",", ":"), default=_to_json
+    ).encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    """
+    Stored output of a task unit, identified by its cache key.
+
+    Attributes:
+        path: Path of the stored output file.
+    """
+
+    def __init__(self, *, cache_dir: str, key: str, out_json: str):
+        # Keep the compression extension of the output file, if any
+        compression_suffix = out_json[len(remove_compressed_suffix(out_json)) :]
+        self.path = Path(cache_dir) / key[:2] / f"{key}.json{compression_suffix}"
+
+    def restore(self, out_json: str) -> bool:
+        """
+        Copy the stored output to `out_json`, if available.
+
+        Returns:
+            Whether the output was restored.
+        """
+        import shutil
+
+        try:
+            shutil.copyfile(self.path, out_json)
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+        logger.info(f"Restored cached task output from {self.path}.")
+        return True
+
+    def store(self, out_json: str) -> None:
+        """
+        Store a copy of `out_json`, without failing the task unit on errors.
+        """
+        import shutil
+        import tempfile
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Write atomically, since concurrent task units may share the
+            # cache
+            with tempfile.NamedTemporaryFile(
+                dir=self.path.parent, suffix=".tmp", delete=False
+            ) as f:
+                tmp_path = f.name
+            try:
+                shutil.copyfile(out_json, tmp_path)
+                os.replace(tmp_path, self.path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+        except OSError as e:
+            logger.warning(f"Could not store task output in cache: {e}")
+            return
+        logger.info(f"Stored task output in cache, at {self.path}.")
+
+
+def get_result_cache(
+    *,
+    task_function: callable,
+    pars: dict[str, Any],
+    out_json: str,
+    cache_dir: str,
+    result_cache_inputs: ResultCacheInputs | None,
+) -> ResultCache:
+    """
+    Get the result cache of a task unit.
+
+    Args:
+        task_function: Callable function that runs the task.
+        pars: Task arguments.
+        out_json: Path of the output file of the task unit.
+        cache_dir: Result-cache folder.
+        result_cache_inputs:
+            Function that returns the input paths of the task unit, given its
+            arguments.
+    """
+    inputs = [] if result_cache_inputs is None else result_cache_inputs(pars)
+    key = get_result_cache_key(task_function=task_function, pars=pars, inputs=inputs)
+    return ResultCache(cache_dir=cache_dir, key=key, out_json=out_json)
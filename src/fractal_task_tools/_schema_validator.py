@@ -0,0 +1,320 @@
+"""
+Validators of task arguments, generated from JSON schemas.
+
+A JSON schema is compiled into the source code of a Python module, with one
+function per (sub)schema, so that neither `pydantic` nor `jsonschema` are
+needed. The module is generated on every run (which takes a few milliseconds)
+and imported from a private temporary folder, rather than from a shared cache
+where other users could replace it with arbitrary code.
+
+Only the keywords that `pydantic` generates for task arguments are supported:
+* `$ref` (to `#/$defs/...`), `type` (as a single string), `enum`, `const`;
+* `minimum`, `maximum`, `exclusiveMinimum`, `exclusiveMaximum`;
+* `minLength`, `maxLength`, `pattern`;
+* `items`, `prefixItems`, `minItems`, `maxItems`;
+* `properties`, `required`, `additionalProperties`;
+* `anyOf` and `oneOf` (which is validated as `anyOf`).
+Other keywords (e.g. `format`, `allOf` or lists of types) and boolean
+subschemas are ignored, so that validators never reject arguments that the
+schema accepts.
+"""
+
+import importlib.util
+import re
+import tempfile
+from pathlib import Path
+from typing import Any
+from typing import Callable
+
+Validator = Callable[[Any], list[str]]
+
+_TYPE_CHECKS = {
+    "string": "isinstance(value, str)",
+    "integer": (
+        "(isinstance(value, int) and not isinstance(value, bool)) or "
+        "(isinstance(value, float) and value.is_integer())"
+    ),
+    "number": "isinstance(value, (int, float)) and not isinstance(value, bool)",
+    "boolean": "isinstance(value, bool)",
+    "null": "value is None",
+    "array": "isinstance(value, list)",
+    "object": "isinstance(value, dict)",
+}
+
+_RUNTIME = '''
+import re
+
+
+def _equal(a, b):
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    return a == b
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate(value):
+    """
+    Return the list of errors of `value` (empty, if `value` is valid).
+    """
+    errors = []
+    _v0(value, "", errors)
+    return errors
+'''
+
+
+class _ValidatorGenerator:
+    """
+    Generator of the source code of a validator module.
+    """
+
+    def __init__(self, schema: dict[str, Any]):
+        self.schema = schema
+        self.functions: list[str] = []
+        self.ref_to_name: dict[str, str] = {}
+
+    def _new_name(self) -> str:
+        name = f"_v{len(self.functions)}"
+        self.functions.append("")
+        return name
+
+    def _resolve_ref(self, ref: str) -> Any:
+        if not ref.startswith("#/"):
+            return None
+        node = self.schema
+        for part in ref[2:].split("/"):
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def compile(self, schema: Any) -> str:
+        """
+        Generate the function for a (sub)schema, and return its name.
+        """
+        name = self._new_name()
+        ind = int(name[2:])
+        lines = [f"def {name}(value, path, errors):"]
+        body = []
+        if isinstance(schema, dict):
+            body.extend(self._compile_keywords(schema))
+        if not body:
+            body.append("pass")
+        lines.extend(f"    {line}" for line in body)
+        self.functions[ind] = "\n".join(lines)
+        return name
+
+    def _compile_ref(self, ref: str) -> str | None:
+        if ref in self.ref_to_name:
+            return self.ref_to_name[ref]
+        target = self._resolve_ref(ref)
+        if target is None:
+            return None
+        # Register the name before compiling, to support recursive schemas
+        name = f"_v{len(self.functions)}"
+        self.ref_to_name[ref] = name
+        self.compile(target)
+        return name
+
+    def _compile_keywords(self, schema: dict[str, Any]) -> list[str]:
+        body = []
+
+        ref = schema.get("$ref")
+        if isinstance(ref, str):
+            ref_name = self._compile_ref(ref)
+            if ref_name is not None:
+                body.append(f"{ref_name}(value, path, errors)")
+
+        # Type
+        schema_type = schema.get("type")
+        if isinstance(schema_type, str) and schema_type in _TYPE_CHECKS:
+            body.append(f"if not ({_TYPE_CHECKS[schema_type]}):")
+            body.append("    " + _error(f"is not of type {schema_type}"))
+            body.append("    return")
+
+        # Enum and const
+        if isinstance(schema.get("enum"), list):
+            body.append(f"if not any(_equal(value, v) for v in {schema['enum']!r}):")
+            body.append("    " + _error(f"is not one of {schema['enum']!r}"))
+        if "const" in schema:
+            body.append(f"if not _equal(value, {schema['const']!r}):")
+            body.append("    " + _error(f"is not {schema['const']!r}"))
+
+        # Numbers
+        for keyword, operator in (
+            ("minimum", "<"),
+            ("maximum", ">"),
+            ("exclusiveMinimum", "<="),
+            ("exclusiveMaximum", ">="),
+        ):
+            limit = schema.get(keyword)
+            if isinstance(limit, (int, float)) and not isinstance(limit, bool):
+                body.append(f"if _is_number(value) and value {operator} {limit!r}:")
+                body.append("    " + _error(f"violates {keyword}={limit!r}"))
+
+        # Strings
+        for keyword, operator in (("minLength", "<"), ("maxLength", ">")):
+            limit = schema.get(keyword)
+            if isinstance(limit, int):
+                body.append(
+                    f"if isinstance(value, str) and len(value) {operator} {limit}:"
+                )
+                body.append("    " + _error(f"violates {keyword}={limit}"))
+        if isinstance(schema.get("pattern"), str):
+            try:
+                re.compile(schema["pattern"])
+            except re.error:
+                pass
+            else:
+                body.append(
+                    "if isinstance(value, str) and "
+                    f"re.search({schema['pattern']!r}, value) is None:"
+                )
+                body.append(
+                    "    " + _error(f"does not match pattern {schema['pattern']!r}")
+                )
+
+        # Arrays
+        for keyword, operator in (("minItems", "<"), ("maxItems", ">")):
+            limit = schema.get(keyword)
+            if isinstance(limit, int):
+                body.append(
+                    f"if isinstance(value, list) and len(value) {operator} {limit}:"
+                )
+                body.append(
+                    "    " + _error(f"violates {keyword}={limit}", show_value=False)
+                )
+        prefix_items = schema.get("prefixItems")
+        num_prefix_items = 0
+        if isinstance(prefix_items, list):
+            num_prefix_items = len(prefix_items)
+            for ind, item_schema in enumerate(prefix_items):
+                item_name = self.compile(item_schema)
+                body.append(f"if isinstance(value, list) and len(value) > {ind}:")
+                body.append(f'    {item_name}(value[{ind}], f"{{path}}/{ind}", errors)')
+        items = schema.get("items")
+        if isinstance(items, dict):
+            items_name = self.compile(items)
+            body.append("if isinstance(value, list):")
+            body.append(
+                f"    for ind, item in enumerate(value[{num_prefix_items}:], "
+                f"start={num_prefix_items}):"
+            )
+            body.append(f'        {items_name}(item, f"{{path}}/{{ind}}", errors)')
+
+        # Objects
+        properties = schema.get("properties")
+        if not isinstance(properties, dict):
+            properties = {}
+        required = schema.get("required")
+        if isinstance(required, list) and required:
+            body.append("if isinstance(value, dict):")
+            body.append(f"    for key in {required!r}:")
+            body.append("        if key not in value:")
+            body.append(
+                "            errors.append(f\"{path or '/'}: missing required "
+                'property {key!r}")'
+            )
+        if properties:
+            body.append("if isinstance(value, dict):")
+            for key, property_schema in properties.items():
+                property_name = self.compile(property_schema)
+                body.append(f"    if {key!r} in value:")
+                body.append(
+                    f"        {property_name}(value[{key!r}], "
+                    f'f"{{path}}/{_escape_braces(key)}", errors)'
+                )
+        additional_properties = schema.get("additionalProperties")
+        if additional_properties is False or isinstance(additional_properties, dict):
+            body.append("if isinstance(value, dict):")
+            body.append("    for key in value:")
+            # NOTE: sorting makes the generated code deterministic
+            known_keys = ", ".join(repr(key) for key in sorted(properties))
+            body.append(f"        if key in ({known_keys}{',' if known_keys else ''}):")
+            body.append("            continue")
+            if additional_properties is False:
+                body.append(
+                    "        errors.append(f\"{path or '/'}: unexpected property "
+                    '{key!r}")'
+                )
+            else:
+                additional_name = self.compile(additional_properties)
+                body.append(
+                    f'        {additional_name}(value[key], f"{{path}}/{{key}}", '
+                    "errors)"
+                )
+
+        # Combinations
+        for keyword in ("anyOf", "oneOf"):
+            # NOTE: `oneOf` is validated as `anyOf`, which is more permissive
+            subschemas = schema.get(keyword)
+            if isinstance(subschemas, list) and subschemas:
+                names = [self.compile(subschema) for subschema in subschemas]
+                body.append(f"for function in ({', '.join(names)},):")
+                body.append("    branch_errors = []")
+                body.append("    function(value, path, branch_errors)")
+                body.append("    if not branch_errors:")
+                body.append("        break")
+                body.append("else:")
+                body.append("    " + _error(f"does not match any schema of {keyword}"))
+        return body
+
+    def generate(self) -> str:
+        """
+        Generate the source code of the validator module.
+        """
+        self.compile(self.schema)
+        return _RUNTIME + "\n\n" + "\n\n\n".join(self.functions) + "\n"
+
+
+def _error(message: str, *, show_value: bool = True) -> str:
+    """
+    Generate the code that appends an error message, prefixed by the path
+    (and value) that it refers to.
+    """
+    if show_value:
+        return f"errors.append(f\"{{path or '/'}}: {{value!r}} \" + {message!r})"
+    return f"errors.append(f\"{{path or '/'}}: \" + {message!r})"
+
+
+def _escape_braces(key: str) -> str:
+    """
+    Escape a property name, to be included in an f-string literal.
+    """
+    return (
+        key.replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("{", "{{")
+        .replace("}", "}}")
+        .replace("\n", "\\n")
+    )
+
+
+def generate_validator_source(schema: dict[str, Any]) -> str:
+    """
+    Generate the source code of the validator module for a JSON schema.
+    """
+    return _ValidatorGenerator(schema).generate()
+
+
+def _load_module(path: Path, module_name: str) -> Validator:
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.validate
+
+
+def get_validator(schema: dict[str, Any]) -> Validator:
+    """
+    Get the validator of a JSON schema.
+
+    Returns:
+        Function that returns the list of validation errors of a value.
+    """
+    source = generate_validator_source(schema)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "_fractal_validator.py"
+        path.write_text(source)
+        return _load_module(path, "_fractal_validator")
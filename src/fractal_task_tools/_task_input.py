@@ -0,0 +1,58 @@
+"""
+Loading of task arguments.
+"""
+
+from typing import Any
+
+from ._compression import open_file
+from ._json_codec import get_json_codec
+
+# Arguments read by `check_task_arguments`, as `(args_json, pars)`, which are
+# reused by the next `load_task_args` call rather than read again
+_preloaded_task_args: tuple[str, dict[str, Any]] | None = None
+
+
+def preload_task_args(args_json: str) -> dict[str, Any]:
+    """
+    Read the task arguments with a lazy `zarr_urls` sequence, and keep them
+    for the next `load_task_args` call with the same path.
+
+    Args:
+        args_json: Path of the arguments file.
+    """
+    global _preloaded_task_args
+    pars = load_task_args(args_json, lazy_zarr_urls=True)
+    _preloaded_task_args = (args_json, pars)
+    return pars
+
+
+def load_task_args(args_json: str, *, lazy_zarr_urls: bool = False) -> dict[str, Any]:
+    """
+    Read the task-arguments dictionary from file.
+
+    Args:
+        args_json:
+            Path of the arguments file, which is decompressed if its
+            extension is `.gz` or `.zst`.
+        lazy_zarr_urls:
+            If `True`, the `zarr_urls` argument is a lazy `LazyZarrUrls`
+            sequence rather than a list.
+    """
+    global _preloaded_task_args
+    if _preloaded_task_args is not None:
+        preloaded_args_json, pars = _preloaded_task_args
+        _preloaded_task_args = None
+        if preloaded_args_json == args_json:
+            from ._lazy_zarr_urls import LazyZarrUrls
+
+            zarr_urls = pars.get("zarr_urls")
+            if not lazy_zarr_urls and isinstance(zarr_urls, LazyZarrUrls):
+                pars["zarr_urls"] = zarr_urls.to_list()
+            return pars
+    if lazy_zarr_urls:
+        from ._lazy_zarr_urls import load_task_args_with_lazy_zarr_urls
+
+        return load_task_args_with_lazy_zarr_urls(args_json)
+    with open_file(args_json, "rb") as f:
+        data = f.read()
+    return get_json_codec().loads(data)
@@ -0,0 +1,176 @@
+"""
+Serialization of task outputs.
+"""
+
+import os
+import typing
+from typing import Any
+from typing import Iterator
+
+from ._compression import open_file
+from ._compression import remove_compressed_suffix
+from ._env import get_positive_number
+from ._json_codec import get_json_codec
+
+IMAGE_LIST_UPDATES = "image_list_updates"
+IMAGE_LIST_REMOVALS = "image_list_removals"
+
+ValidOutputFormat = typing.Literal["indent", "compact", "auto"]
+ALLOWED_OUTPUT_FORMATS: tuple[ValidOutputFormat, ...] = typing.get_args(
+    ValidOutputFormat
+)
+
+DEFAULT_OUTPUT_FORMAT: ValidOutputFormat = "auto"
+DEFAULT_OUTPUT_COMPACT_THRESHOLD: int = 1_000_000
+
+
+def get_output_format() -> ValidOutputFormat:
+    """
+    Get valid output format from environment variable or default value.
+    """
+    # Use default value if the env variable is unset or set to an empty string
+    output_format = os.getenv("FRACTAL_TASK_OUTPUT_FORMAT") or DEFAULT_OUTPUT_FORMAT
+    # Validate `output_format`
+    if output_format not in ALLOWED_OUTPUT_FORMATS:
+        raise ValueError(
+            f"Invalid FRACTAL_TASK_OUTPUT_FORMAT={output_format} environment "
+            f"variable. Allowed values: {ALLOWED_OUTPUT_FORMATS}."
+        )
+    return output_format
+
+
+def get_output_compact_threshold() -> int:
+    """
+    Get the output size (in bytes) above which the `auto` format is compact.
+    """
+    # Use default value if the env variable is unset or set to an empty string
+    threshold = get_positive_number(
+        "FRACTAL_TASK_OUTPUT_COMPACT_THRESHOLD", number_type=int, unit="bytes"
+    )
+    if threshold is None:
+        return DEFAULT_OUTPUT_COMPACT_THRESHOLD
+    return threshold
+
+
+def get_sidecar_path(out_json: str, suffix: str) -> str:
+    """
+    Get the path of a file next to `out_json` (e.g. `out.log` for `out.json`
+    or for `out.json.gz`).
+
+    Args:
+        out_json: Path of the output file.
+        suffix:
+            Suffix that replaces the `.json` extension of `out_json`, and its
+            compression extension (if any).
+    """
+    out_json = remove_compressed_suffix(out_json)
+    if out_json.endswith(".json"):
+        out_json = out_json[: -len(".json")]
+    return f"{out_json}{suffix}"
+
+
+def write_task_output(metadata_update: Any, out_json: str) -> None:
+    """
+    Write the output of a task to file.
+
+    With the `auto` output format, the output is first encoded in compact
+    form; if it is smaller than the threshold, it is then re-encoded with
+    indentation.
+
+    Args:
+        metadata_update: Task output.
+        out_json:
+            Path of the output file, which is compressed if its extension is
+            `.gz` or `.zst`.
+    """
+    codec = get_json_codec()
+    output_format = get_output_format()
+    if output_format == "auto":
+        data = codec.dumps(metadata_update, compact=True)
+        if len(data) < get_output_compact_threshold():
+            data = codec.dumps(metadata_update, compact=False)
+    else:
+        data = codec.dumps(metadata_update, compact=(output_format == "compact"))
+    with open_file(out_json, "wb") as fout:
+        fout.write(data)
+
+
+def write_streaming_task_output(items: Iterator[Any], out_json: str) -> None:
+    """
+    Write the items yielded by a generator task as a single task output.
+
+    Items which are dictionaries are written to the `image_list_updates`
+    list, and items which are strings (that is, `zarr_url`s) are written to
+    the `image_list_removals` list. Each item is written as soon as it is
+    yielded, and removals are spooled to a temporary file, so that memory
+    usage does not depend on the size of the output.
+
+    Items are always encoded in compact form. Since the output size is not
+    known in advance, the `auto` output format is compact; with the `indent`
+    output format, each item is written on a separate line.
+
+    Items are written to a temporary file next to `out_json`, which is only
+    renamed to `out_json` once the generator is exhausted, so that a failing
+    task does not leave a truncated output file.
+
+    Args:
+        items: Iterator over task-output items.
+        out_json:
+            Path of the output file, which is compressed (in a streaming way)
+            if its extension is `.gz` or `.zst`.
+    """
+    # Imported here, since it is not needed for standard task outputs
+    import tempfile
+
+    codec = get_json_codec()
+    if get_output_format() == "indent":
+        head = f'{{\n  "{IMAGE_LIST_UPDATES}": ['.encode()
+        middle = f'\n  ],\n  "{IMAGE_LIST_REMOVALS}": ['.encode()
+        tail = b"\n  ]\n}"
+        first_separator = b"\n    "
+        separator = b",\n    "
+    else:
+        head = f'{{"{IMAGE_LIST_UPDATES}":['.encode()
+        middle = f'],"{IMAGE_LIST_REMOVALS}":['.encode()
+        tail = b"]}"
+        first_separator = b""
+        separator = b","
+
+    # NOTE: the temporary file keeps the compression extension of `out_json`
+    out_json_uncompressed = remove_compressed_suffix(out_json)
+    compressed_suffix = out_json[len(out_json_uncompressed) :]
+    tmp_path = f"{out_json_uncompressed}.{os.getpid()}.tmp{compressed_suffix}"
+    try:
+        with (
+            open_file(tmp_path, "wb") as fout,
+            tempfile.TemporaryFile(mode="w+b") as removals,
+        ):
+            fout.write(head)
+            current_separator = first_separator
+            for item in items:
+                if isinstance(item, dict):
+                    fout.write(current_separator)
+                    fout.write(codec.dumps(item, compact=True))
+                    current_separator = separator
+                elif isinstance(item, str):
+                    removals.write(codec.dumps(item, compact=True))
+                    removals.write(b"\n")
+                else:
+                    raise TypeError(
+                        "Items yielded by a task must be dictionaries (image-list "
+                        "updates) or strings (image-list removals), not "
+                        f"{type(item).__name__}."
+                    )
+            fout.write(middle)
+            removals.seek(0)
+            current_separator = first_separator
+            for line in removals:
+                fout.write(current_separator)
+                fout.write(line.rstrip(b"\n"))
+                current_separator = separator
+            fout.write(tail)
+        os.replace(tmp_path, out_json)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
@@ -0,0 +1,267 @@
+"""
+Watchdog for stalled task units.
+
+When the `FRACTAL_TASK_STALL_TIMEOUT` environment variable is set, a
+watchdog thread dumps the stacks of all threads (through `faulthandler`) to
+the log stream whenever the task function makes no progress reports and
+emits no log records for that many seconds. When the
+`FRACTAL_TASK_STALL_ABORT_TIMEOUT` environment variable is set, the unit is
+aborted after that many seconds without activity; since the abort timer runs
+in `faulthandler`'s own C thread, this also works when the task function
+holds the GIL.
+
+Processes that serve many units (i.e. workers) set an abort handler through
+`stall_abort_handler`. In that case the watchdog thread itself aborts the
+unit: it dumps the thread stacks, calls the handler (e.g. to send the error
+reply of the job) and flushes logging before terminating the process, and
+the `faulthandler` timer only fires (after `ABORT_GRACE_PERIOD` more seconds)
+if the watchdog thread cannot run.
+"""
+
+import faulthandler
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+from typing import Iterator
+from typing import TextIO
+
+from ._env import get_positive_number
+from ._progress import ProgressReporter
+from .logging_config import WRAPPER_LOGGER_NAME
+from .logging_config import flush_log_summaries
+from .logging_config import flush_logging
+from .logging_config import get_log_handlers
+
+logger = logging.getLogger(WRAPPER_LOGGER_NAME)
+
+# Maximum interval between two checks of the watchdog thread, in seconds
+MAX_CHECK_INTERVAL = 1.0
+
+# Additional delay of the `faulthandler` abort timer (in seconds), when an
+# abort handler is set
+ABORT_GRACE_PERIOD = 5.0
+
+AbortHandler = Callable[[str], None]
+
+# Function that reports the abort of the running unit, if any
+_abort_handler: AbortHandler | None = None
+
+
+@contextmanager
+def stall_abort_handler(handler: AbortHandler) -> Iterator[None]:
+    """
+    Within the enclosed block, call `handler` (with the error message) when a
+    stalled unit is aborted, before terminating the process.
+
+    Args:
+        handler: Function that reports the abort of the running unit.
+    """
+    global _abort_handler
+    previous_handler = _abort_handler
+    _abort_handler = handler
+    try:
+        yield
+    finally:
+        _abort_handler = previous_handler
+
+
+def get_stall_timeout() -> float | None:
+    """
+    Get the inactivity interval (in seconds) after which thread stacks are
+    dumped, from environment variable (if set).
+    """
+    return get_positive_number("FRACTAL_TASK_STALL_TIMEOUT")
+
+
+def get_stall_abort_timeout() -> float | None:
+    """
+    Get the inactivity interval (in seconds) after which the unit is aborted,
+    from environment variable (if set).
+    """
+    return get_positive_number("FRACTAL_TASK_STALL_ABORT_TIMEOUT")
+
+
+def _get_dump_file() -> TextIO:
+    """
+    Get the stream of the first root-logger handler with a file descriptor
+    (e.g. standard error, or a log file), which `faulthandler` requires.
+    """
+    streams = [getattr(handler, "stream", None) for handler in get_log_handlers()]
+    for stream in streams + [sys.stderr, sys.__stderr__]:
+        try:
+            stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            continue
+        return stream
+    raise RuntimeError("No stream with a file descriptor is available.")
+
+
+class _ActivityHandler(logging.Handler):
+    """
+    Logging handler that records the time of the latest log record (except
+    for those of the watchdog thread).
+    """
+
+    def __init__(self, watchdog: "StallWatchdog"):
+        super().__init__()
+        self.watchdog = watchdog
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.thread != self.watchdog.thread_id:
+            self.watchdog.last_log_time = time.monotonic()
+
+
+class StallWatchdog:
+    """
+    Thread that dumps thread stacks (and optionally aborts the process) when
+    a task unit has no progress reports and no log records for too long.
+    """
+
+    def __init__(
+        self,
+        *,
+        task_name: str,
+        progress_reporter: ProgressReporter,
+        stall_timeout: float | None,
+        abort_timeout: float | None,
+        abort_handler: AbortHandler | None = None,
+    ):
+        self.task_name = task_name
+        self.progress_reporter = progress_reporter
+        self.stall_timeout = stall_timeout
+        self.abort_timeout = abort_timeout
+        self.abort_handler = abort_handler
+        self.check_interval = min(
+            [MAX_CHECK_INTERVAL]
+            + [timeout / 10 for timeout in (stall_timeout, abort_timeout) if timeout]
+        )
+        self.last_log_time = time.monotonic()
+        self.thread_id: int | None = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="fractal-task-watchdog", daemon=True
+        )
+        self._handler = _ActivityHandler(self)
+        self._file = _get_dump_file()
+
+    def _get_last_activity_time(self) -> float:
+        return max(self.last_log_time, self.progress_reporter.last_report_time)
+
+    def _arm_abort_timer(self, timeout: float) -> None:
+        if self.abort_handler is not None:
+            timeout += ABORT_GRACE_PERIOD
+        # NOTE: logging is not flushed here, since the timer is re-armed at
+        # every check that sees some activity. Without an abort handler, log
+        # records are written by the time `faulthandler` aborts the process
+        # (since each record postpones the abort), unless the log destination
+        # blocks the background thread of asynchronous logging for as long.
+        faulthandler.dump_traceback_later(
+            max(timeout, self.check_interval), exit=True, file=self._file
+        )
+
+    def _abort(self, inactivity: float) -> None:
+        """
+        Dump thread stacks, call the abort handler and terminate the process.
+        """
+        error = (
+            f"No progress or log activity for {inactivity:.1f}s in "
+            f"{self.task_name} task, aborting the unit."
+        )
+        try:
+            logger.error(error)
+            flush_log_summaries()
+            flush_logging()
+            self._file.flush()
+            faulthandler.dump_traceback(file=self._file, all_threads=True)
+            self.abort_handler(error)
+        finally:
+            # NOTE: `os._exit` skips `atexit` hooks, so queued log records are
+            # written here
+            flush_logging()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(1)
+
+    def _run(self) -> None:
+        self.thread_id = threading.get_ident()
+        armed_activity_time = last_dump_time = self._get_last_activity_time()
+        while not self._stopped.wait(self.check_interval):
+            now = time.monotonic()
+            last_activity_time = self._get_last_activity_time()
+            if self.abort_timeout and last_activity_time > armed_activity_time:
+                # Postpone the abort, counting from the latest activity
+                self._arm_abort_timer(self.abort_timeout - (now - last_activity_time))
+                armed_activity_time = last_activity_time
+            if (
+                self.abort_handler is not None
+                and self.abort_timeout
+                and now - last_activity_time >= self.abort_timeout
+            ):
+                self._abort(now - last_activity_time)
+            last_dump_time = max(last_dump_time, last_activity_time)
+            if self.stall_timeout and now - last_dump_time >= self.stall_timeout:
+                logger.warning(
+                    f"No progress or log activity for "
+                    f"{now - last_activity_time:.1f}s in {self.task_name} task, "
+                    "dumping the stacks of all threads."
+                )
+                flush_logging()
+                self._file.flush()
+                faulthandler.dump_traceback(file=self._file, all_threads=True)
+                last_dump_time = now
+
+    def start(self) -> None:
+        """
+        Start the watchdog thread, and the abort timer (if any).
+        """
+        logging.getLogger().addHandler(self._handler)
+        if self.abort_timeout:
+            self._arm_abort_timer(self.abort_timeout)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the watchdog thread, and cancel the abort timer (if any).
+        """
+        self._stopped.set()
+        self._thread.join()
+        if self.abort_timeout:
+            faulthandler.cancel_dump_traceback_later()
+        logging.getLogger().removeHandler(self._handler)
+
+
+@contextmanager
+def watch_stalls(
+    *,
+    task_name: str,
+    progress_reporter: ProgressReporter,
+) -> Iterator[None]:
+    """
+    Run a stall watchdog within the enclosed block, if it is enabled through
+    the `FRACTAL_TASK_STALL_TIMEOUT` or `FRACTAL_TASK_STALL_ABORT_TIMEOUT`
+    environment variables.
+
+    Stalled units are aborted through the current abort handler (see
+    `stall_abort_handler`), if any, and otherwise by `faulthandler`.
+    """
+    stall_timeout = get_stall_timeout()
+    abort_timeout = get_stall_abort_timeout()
+    if stall_timeout is None and abort_timeout is None:
+        yield
+        return
+    watchdog = StallWatchdog(
+        task_name=task_name,
+        progress_reporter=progress_reporter,
+        stall_timeout=stall_timeout,
+        abort_timeout=abort_timeout,
+        abort_handler=_abort_handler,
+    )
+    watchdog.start()
+    try:
+        yield
+    finally:
+        watchdog.stop()
@@ -0,0 +1,320 @@
+"""
+Persistent worker that serves many task units within a single interpreter.
+
+Job descriptors are JSON objects with the `args_json` and `out_json` keys,
+one per line. For each job, the worker writes back a JSON line with the
+`args_json`, `out_json`, `exit_status` (`0` for success, `1` for failure)
+and `error` keys.
+"""
+
+import json
+import logging
+import os
+import resource
+import socket
+import sys
+from functools import partial
+from pathlib import Path
+from typing import Callable
+from typing import Iterable
+
+from ._phase_timing import PhaseTimer
+from ._result_cache import ResultCacheInputs
+from ._watchdog import stall_abort_handler
+from .logging_config import WRAPPER_LOGGER_NAME
+from .task_wrapper import _run_task_unit
+
+logger = logging.getLogger(WRAPPER_LOGGER_NAME)
+
+WriteReply = Callable[[dict], None]
+ServeLines = Callable[..., bool]
+
+
+def _get_current_rss() -> float:
+    """
+    Get the current resident set size of this process (in MB).
+
+    When `/proc` is not available, fall back to the peak resident set size.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except (OSError, ValueError, IndexError):
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == "darwin":
+            # On macOS, `ru_maxrss` is in bytes
+            return maxrss / 1024**2
+        return maxrss / 1024
+
+
+class _RecyclePolicy:
+    """
+    Decide when a worker should stop serving jobs.
+
+    Attributes:
+        max_jobs: Maximum number of jobs (if set).
+        max_rss_growth: Maximum RSS growth in MB (if set).
+        num_jobs: Number of jobs served so far.
+        baseline_rss: RSS (in MB) when the worker started serving jobs.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_jobs: int | None,
+        max_rss_growth: float | None,
+    ):
+        self.max_jobs = max_jobs
+        self.max_rss_growth = max_rss_growth
+        self.num_jobs = 0
+        self.baseline_rss = _get_current_rss()
+
+    def job_done(self) -> bool:
+        """
+        Register a completed job, and return whether to recycle the worker.
+        """
+        self.num_jobs += 1
+        if self.max_jobs is not None and self.num_jobs >= self.max_jobs:
+            logger.info(f"Recycling worker after {self.num_jobs} jobs.")
+            return True
+        if self.max_rss_growth is not None:
+            rss_growth = _get_current_rss() - self.baseline_rss
+            if rss_growth >= self.max_rss_growth:
+                logger.info(
+                    f"Recycling worker after RSS growth of {rss_growth:.1f} MB "
+                    f"({self.num_jobs} jobs)."
+                )
+                return True
+        return False
+
+
+def run_job(
+    *,
+    task_function: callable,
+    args_json: str,
+    out_json: str,
+    lazy_zarr_urls: bool = False,
+    result_cache_inputs: ResultCacheInputs | None = None,
+    unit_index: int | None = None,
+) -> dict:
+    """
+    Run a single task unit, without letting its failure propagate.
+
+    Args:
+        task_function: Callable function that runs the task.
+        args_json: Path to the JSON file with task arguments.
+        out_json: Path to the JSON file where the task output is written.
+        lazy_zarr_urls: Whether to pass `zarr_urls` as a lazy sequence.
+        result_cache_inputs: Function that returns the input paths of a unit.
+        unit_index: Index of the unit within a worker or a batch (if any).
+
+    Returns:
+        Status record for the job.
+    """
+    status = dict(
+        args_json=args_json,
+        out_json=out_json,
+        exit_status=0,
+        error=None,
+    )
+    phase_timer = PhaseTimer()
+    with phase_timer.phase("check_out_json"):
+        out_json_exists = Path(out_json).exists()
+    if out_json_exists:
+        msg = f"Output file {out_json} already exists."
+        logger.error(msg)
+        status.update(exit_status=1, error=msg)
+        return status
+    try:
+        _run_task_unit(
+            task_function=task_function,
+            args_json=args_json,
+            out_json=out_json,
+            lazy_zarr_urls=lazy_zarr_urls,
+            result_cache_inputs=result_cache_inputs,
+            phase_timer=phase_timer,
+            unit_index=unit_index,
+        )
+    except (Exception, SystemExit) as e:
+        logger.exception(f"Task unit failed ({args_json=}, {out_json=}).")
+        status.update(exit_status=1, error=f"{type(e).__name__}: {e}")
+    return status
+
+
+def parse_job_descriptor(line: str) -> tuple[str, str]:
+    """
+    Extract the `(args_json, out_json)` pair from a job-descriptor line.
+    """
+    job = json.loads(line)
+    return job["args_json"], job["out_json"]
+
+
+def get_invalid_job_status(line: str, error: Exception) -> dict:
+    """
+    Log an invalid job-descriptor line, and return its status record.
+    """
+    logger.error(f"Invalid job descriptor {line.strip()!r}: {error}")
+    return dict(
+        args_json=None,
+        out_json=None,
+        exit_status=1,
+        error=f"Invalid job descriptor: {error}",
+    )
+
+
+def _write_abort_reply(
+    error: str,
+    *,
+    write_reply: WriteReply,
+    args_json: str,
+    out_json: str,
+) -> None:
+    """
+    Send the reply of a job that is aborted by the stall watchdog.
+    """
+    write_reply(
+        dict(args_json=args_json, out_json=out_json, exit_status=1, error=error)
+    )
+
+
+def _serve_lines(
+    *,
+    lines: Iterable[str],
+    write_reply: WriteReply,
+    task_function: callable,
+    policy: _RecyclePolicy,
+    lazy_zarr_urls: bool,
+    result_cache_inputs: ResultCacheInputs | None,
+) -> bool:
+    """
+    Run a job for each line, and return whether the worker should stop.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            args_json, out_json = parse_job_descriptor(line)
+        except (ValueError, KeyError, TypeError) as e:
+            write_reply(get_invalid_job_status(line, e))
+            continue
+        # NOTE: a stalled job terminates the worker, after sending its reply
+        abort_handler = partial(
+            _write_abort_reply,
+            write_reply=write_reply,
+            args_json=args_json,
+            out_json=out_json,
+        )
+        with stall_abort_handler(abort_handler):
+            status = run_job(
+                task_function=task_function,
+                args_json=args_json,
+                out_json=out_json,
+                lazy_zarr_urls=lazy_zarr_urls,
+                result_cache_inputs=result_cache_inputs,
+                unit_index=policy.num_jobs,
+            )
+        write_reply(status)
+        if policy.job_done():
+            return True
+    return False
+
+
+def serve_stdin(serve_lines: ServeLines) -> None:
+    """
+    Serve jobs from standard input, and write replies to standard output.
+
+    While serving, file descriptor 1 is redirected to standard error, so that
+    any output of the task itself cannot corrupt the replies.
+
+    Args:
+        serve_lines: Function that runs the jobs for a stream of lines.
+    """
+    sys.stdout.flush()
+    reply_fd = os.dup(1)
+    os.dup2(2, 1)
+    try:
+        with os.fdopen(reply_fd, "w", closefd=False) as reply_stream:
+
+            def write_reply(status: dict) -> None:
+                reply_stream.write(json.dumps(status) + "\n")
+                reply_stream.flush()
+
+            serve_lines(lines=sys.stdin, write_reply=write_reply)
+    finally:
+        sys.stdout.flush()
+        os.dup2(reply_fd, 1)
+        os.close(reply_fd)
+
+
+def serve_socket(*, socket_path: str, serve_lines: ServeLines) -> None:
+    """
+    Serve jobs from the connections to a Unix-domain socket, one at a time.
+
+    Args:
+        socket_path: Path of the socket to be created.
+        serve_lines: Function that runs the jobs for a stream of lines.
+    """
+    if os.path.exists(socket_path):
+        raise FileExistsError(f"Worker socket {socket_path} already exists.")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(socket_path)
+        server.listen()
+        logger.info(f"Listening on {socket_path}.")
+        stop = False
+        while not stop:
+            conn, _ = server.accept()
+            with conn, conn.makefile("r") as rfile, conn.makefile("w") as wfile:
+
+                def write_reply(status: dict) -> None:
+                    wfile.write(json.dumps(status) + "\n")
+                    wfile.flush()
+
+                try:
+                    stop = serve_lines(lines=rfile, write_reply=write_reply)
+                except (BrokenPipeError, ConnectionResetError):
+                    logger.warning("Client disconnected.")
+    finally:
+        server.close()
+        os.unlink(socket_path)
+
+
+def run_worker(
+    *,
+    task_function: callable,
+    socket_path: str | None = None,
+    max_jobs: int | None = None,
+    max_rss_growth: float | None = None,
+    lazy_zarr_urls: bool = False,
+    result_cache_inputs: ResultCacheInputs | None = None,
+) -> None:
+    """
+    Serve task units until the input is exhausted or the worker is recycled.
+
+    Args:
+        task_function: Callable function that runs the task.
+        socket_path:
+            If set, read jobs from a Unix-domain socket at this path, rather
+            than from standard input.
+        max_jobs: If set, stop after this number of jobs.
+        max_rss_growth:
+            If set, stop once the RSS grew by this amount (in MB) since the
+            worker started.
+        lazy_zarr_urls: Whether to pass `zarr_urls` as a lazy sequence.
+        result_cache_inputs: Function that returns the input paths of a unit.
+    """
+    policy = _RecyclePolicy(max_jobs=max_jobs, max_rss_growth=max_rss_growth)
+    serve_lines = partial(
+        _serve_lines,
+        task_function=task_function,
+        policy=policy,
+        lazy_zarr_urls=lazy_zarr_urls,
+        result_cache_inputs=result_cache_inputs,
+    )
+    logger.info(f"Worker START ({max_jobs=}, {max_rss_growth=}).")
+    if socket_path is None:
+        serve_stdin(serve_lines)
+    else:
+        serve_socket(socket_path=socket_path, serve_lines=serve_lines)
+    logger.info(f"Worker END ({policy.num_jobs} jobs).")
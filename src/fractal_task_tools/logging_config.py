@@ -2,10 +2,21 @@
 Tools to configure logging.
 """
 
+import atexit
 import logging
 import os
+import signal
+import threading
 import typing
 
+from ._env import get_positive_number
+
+if typing.TYPE_CHECKING:
+    from logging.handlers import QueueHandler
+    from logging.handlers import QueueListener
+
+    from ._log_filters import LogVolumeFilter
+
 WRAPPER_LOGGER_NAME = "run_fractal_task"
 
 ValidLoggingLevel = typing.Literal[
@@ -20,8 +31,28 @@ ALLOWED_LOGGING_LEVELS: tuple[ValidLoggingLevel, ...] = typing.get_args(
 )
 
 
+ValidLogAsync = typing.Literal["true", "false"]
+ALLOWED_LOG_ASYNC: tuple[ValidLogAsync, ...] = typing.get_args(ValidLogAsync)
+
+
 DEFAULT_LOG_LEVEL: ValidLoggingLevel = "INFO"
 DEFAULT_LOG_FORMAT: str = r"%(asctime)s; %(name)s; %(levelname)s; %(message)s"
+# Value of `FRACTAL_TASK_LOG_FORMAT` that selects JSON-lines log records
+JSON_LOG_FORMAT = "json"
+DEFAULT_LOG_ASYNC: ValidLogAsync = "false"
+
+# Queue handler of the root logger and its listener, in asynchronous mode
+_queue_handler: "QueueHandler | None" = None
+_queue_listener: "QueueListener | None" = None
+_queue_listener_lock = threading.RLock()
+_async_hooks_registered = False
+
+# Loggers whose level was set from `FRACTAL_TASK_LOG_LEVELS`
+_configured_logger_names: list[str] = []
+
+# Deduplication and rate-limit filter of the root handler (if enabled)
+_log_volume_filter: "LogVolumeFilter | None" = None
+_log_volume_hook_registered = False
 
 
 def get_logging_format() -> str:
@@ -30,11 +61,24 @@ def get_logging_format() -> str:
     """
     # Use default value if the env variable is unset or set to an empty string
     log_format = os.getenv("FRACTAL_TASK_LOG_FORMAT") or DEFAULT_LOG_FORMAT
+    if log_format == JSON_LOG_FORMAT:
+        return log_format
     # Validate `log_format`
     logging.PercentStyle(fmt=log_format).validate()
     return log_format
 
 
+def get_log_formatter(log_format: str) -> logging.Formatter:
+    """
+    Get the formatter for a `FRACTAL_TASK_LOG_FORMAT` value.
+    """
+    if log_format == JSON_LOG_FORMAT:
+        from ._json_log import JsonLinesFormatter
+
+        return JsonLinesFormatter()
+    return logging.Formatter(log_format)
+
+
 def get_logging_level() -> ValidLoggingLevel:
     """
     Get valid logging level from environment variable or default value.
@@ -50,20 +94,255 @@ def get_logging_level() -> ValidLoggingLevel:
     return log_level
 
 
+def get_logging_levels() -> dict[str, ValidLoggingLevel]:
+    """
+    Get valid per-logger levels from environment variable (if set).
+
+    The variable is a comma-separated list of `name=LEVEL` items, e.g.
+    `distributed=WARNING,zarr=ERROR`. The level of a logger also applies to
+    its children (e.g. `distributed.worker`), unless they have their own.
+    """
+    # No per-logger levels if the env variable is unset or set to an empty
+    # string
+    log_levels = os.getenv("FRACTAL_TASK_LOG_LEVELS") or ""
+    levels = {}
+    for item in log_levels.split(","):
+        if not item.strip():
+            continue
+        name, _, level = (part.strip() for part in item.partition("="))
+        # Validate `name` and `level`
+        if not name or level not in ALLOWED_LOGGING_LEVELS:
+            raise ValueError(
+                f"Invalid FRACTAL_TASK_LOG_LEVELS={log_levels} environment "
+                f"variable (item {item!r}). It must be a comma-separated list "
+                "of `name=LEVEL` items. Allowed values for LEVEL: "
+                f"{ALLOWED_LOGGING_LEVELS}."
+            )
+        levels[name] = level
+    return levels
+
+
+def get_logging_async() -> bool:
+    """
+    Get whether to write logs from a background thread, from environment
+    variable or default value.
+    """
+    # Use default value if the env variable is unset or set to an empty string
+    log_async = os.getenv("FRACTAL_TASK_LOG_ASYNC") or DEFAULT_LOG_ASYNC
+    # Validate `log_async`
+    if log_async not in ALLOWED_LOG_ASYNC:
+        raise ValueError(
+            f"Invalid FRACTAL_TASK_LOG_ASYNC={log_async} environment "
+            f"variable. Allowed values: {ALLOWED_LOG_ASYNC}."
+        )
+    return log_async == "true"
+
+
+def get_log_dedup_window() -> float | None:
+    """
+    Get the interval (in seconds) during which repeated log records are
+    collapsed, from environment variable (if set).
+    """
+    return get_positive_number("FRACTAL_TASK_LOG_DEDUP_WINDOW")
+
+
+def get_log_rate_limit() -> int | None:
+    """
+    Get the maximum number of log records per second per logger, from
+    environment variable (if set).
+    """
+    return get_positive_number(
+        "FRACTAL_TASK_LOG_RATE_LIMIT",
+        number_type=int,
+        unit="records per second",
+    )
+
+
+def get_log_volume_filter() -> "LogVolumeFilter | None":
+    """
+    Get the deduplication and rate-limit filter of the root handler, if
+    enabled by `setup_logging_config`.
+    """
+    return _log_volume_filter
+
+
+def flush_log_summaries() -> None:
+    """
+    Log the summaries of records that were collapsed or dropped so far, e.g.
+    at the end of a task unit.
+    """
+    if _log_volume_filter is not None:
+        _log_volume_filter.flush()
+
+
+def get_log_handlers() -> list[logging.Handler]:
+    """
+    Get the handlers that write the records of the root logger, that is, the
+    handlers of the queue listener in asynchronous mode.
+    """
+    root_logger = logging.getLogger()
+    if _queue_listener is not None and _queue_handler in root_logger.handlers:
+        return list(_queue_listener.handlers)
+    return root_logger.handlers[:]
+
+
+def flush_logging() -> None:
+    """
+    Write all queued log records, in asynchronous mode.
+
+    This blocks until the records are written, e.g. before a process ends
+    through `os._exit`. Summaries of collapsed or dropped records are not
+    written (see `flush_log_summaries`), since they close the current windows.
+    """
+    with _queue_listener_lock:
+        if _queue_listener is not None and _queue_listener._thread is not None:
+            _queue_listener.stop()
+            _queue_listener.start()
+
+
+def _stop_queue_listener() -> None:
+    global _queue_listener
+    with _queue_listener_lock:
+        if _queue_listener is not None:
+            if _queue_listener._thread is not None:
+                _queue_listener.stop()
+            _queue_listener = None
+
+
+def _start_queue_listener(handlers: list[logging.Handler]) -> None:
+    """
+    Send the records of the queue handler to `handlers`, from a new queue
+    and a new listener thread.
+    """
+    import queue
+    from logging.handlers import QueueListener
+
+    global _queue_listener
+    log_queue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
+
+
+def _shutdown_logging() -> None:
+    """
+    Write all pending log records and summaries, and stop the listener.
+    """
+    flush_log_summaries()
+    _stop_queue_listener()
+
+
+def _restart_queue_listener_in_child() -> None:
+    """
+    Restart the listener in a forked child, where its thread does not exist.
+    """
+    global _queue_listener_lock
+    # NOTE: the inherited lock and queue are replaced, since their state may be
+    # inconsistent after the fork
+    _queue_listener_lock = threading.RLock()
+    if _queue_listener is not None:
+        _start_queue_listener(list(_queue_listener.handlers))
+
+
+def _handle_sigterm(signum: int, frame) -> None:
+    """
+    Flush queued log records, and then terminate as with the default handler.
+    """
+    _shutdown_logging()
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+def _setup_async_logging() -> None:
+    """
+    Move the handlers of the root logger behind a queue, whose records are
+    written by a background thread.
+    """
+    from logging.handlers import QueueHandler
+
+    from ._json_log import UnitContextFilter
+
+    global _queue_handler, _async_hooks_registered
+    root_logger = logging.getLogger()
+    handlers = root_logger.handlers[:]
+    _queue_handler = QueueHandler(None)
+    # Records are formatted by the listener thread, possibly after the end of
+    # their task unit
+    _queue_handler.addFilter(UnitContextFilter())
+    _start_queue_listener(handlers)
+    root_logger.handlers = [_queue_handler]
+
+    if not _async_hooks_registered:
+        # Queued records are written when the process exits (also after an
+        # unhandled exception), when it is terminated by SIGTERM (e.g. by a
+        # batch scheduler) and before forked children end (see
+        # `flush_logging`)
+        atexit.register(_shutdown_logging)
+        os.register_at_fork(after_in_child=_restart_queue_listener_in_child)
+        _async_hooks_registered = True
+    if (
+        threading.current_thread() is threading.main_thread()
+        and signal.getsignal(signal.SIGTERM) is signal.SIG_DFL
+    ):
+        signal.signal(signal.SIGTERM, _handle_sigterm)
+
+
 def setup_logging_config() -> None:
     """
     Configure root logging handler.
 
     Note that calling `logging.basicConfig` with `force=True` removes all
-    existing handlers of the `root` logger and creates a new handler.
+    existing handlers of the `root` logger and sets a new handler. When
+    `FRACTAL_TASK_LOG_ASYNC=true`, this handler is moved behind a queue, so
+    that records are written by a background thread. When
+    `FRACTAL_TASK_LOG_DEDUP_WINDOW` or `FRACTAL_TASK_LOG_RATE_LIMIT` are set,
+    repeated records are collapsed and records are dropped beyond the rate
+    limit, before they are formatted. When `FRACTAL_TASK_LOG_LEVELS` is set,
+    the levels of specific loggers are set (e.g. to silence chatty
+    dependencies).
     """
+    global _log_volume_filter, _log_volume_hook_registered
     FRACTAL_TASK_LOG_LEVEL = get_logging_level()
+    FRACTAL_TASK_LOG_LEVELS = get_logging_levels()
     FRACTAL_TASK_LOG_FORMAT = get_logging_format()
+    FRACTAL_TASK_LOG_ASYNC = get_logging_async()
+    FRACTAL_TASK_LOG_DEDUP_WINDOW = get_log_dedup_window()
+    FRACTAL_TASK_LOG_RATE_LIMIT = get_log_rate_limit()
+    # Write all records of a previous configuration
+    _shutdown_logging()
+    handler = logging.StreamHandler()
+    handler.setFormatter(get_log_formatter(FRACTAL_TASK_LOG_FORMAT))
     logging.basicConfig(
         level=FRACTAL_TASK_LOG_LEVEL,
-        format=FRACTAL_TASK_LOG_FORMAT,
+        handlers=[handler],
         force=True,
     )
+    # Reset the levels of a previous configuration, and set the new ones
+    for name in _configured_logger_names:
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    for name, level in FRACTAL_TASK_LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
+    _configured_logger_names[:] = FRACTAL_TASK_LOG_LEVELS
+    if FRACTAL_TASK_LOG_ASYNC:
+        _setup_async_logging()
+    _log_volume_filter = None
+    if FRACTAL_TASK_LOG_DEDUP_WINDOW or FRACTAL_TASK_LOG_RATE_LIMIT:
+        from ._log_filters import LogVolumeFilter
+
+        _log_volume_filter = LogVolumeFilter(
+            dedup_window=FRACTAL_TASK_LOG_DEDUP_WINDOW,
+            rate_limit=FRACTAL_TASK_LOG_RATE_LIMIT,
+        )
+        # NOTE: in asynchronous mode, this is the queue handler
+        logging.getLogger().handlers[0].addFilter(_log_volume_filter)
+        if not _log_volume_hook_registered:
+            atexit.register(flush_log_summaries)
+            _log_volume_hook_registered = True
     task_wrapper_logger = logging.getLogger(WRAPPER_LOGGER_NAME)
     task_wrapper_logger.debug(f"Logging level: {FRACTAL_TASK_LOG_LEVEL=}")
+    task_wrapper_logger.debug(f"Per-logger levels: {FRACTAL_TASK_LOG_LEVELS=}")
     task_wrapper_logger.debug(f"Logging format: {FRACTAL_TASK_LOG_FORMAT=}")
+    task_wrapper_logger.debug(f"Asynchronous logging: {FRACTAL_TASK_LOG_ASYNC=}")
+    task_wrapper_logger.debug(
+        f"Log volume: {FRACTAL_TASK_LOG_DEDUP_WINDOW=}, {FRACTAL_TASK_LOG_RATE_LIMIT=}"
+    )
@@ -2,33 +2,44 @@
 Wrapper to run a Fractal task.
 """
 
-import json
 import logging
 import os
 import sys
+import types
 from argparse import ArgumentParser
-from json import JSONEncoder
 from pathlib import Path
 
+from ._async import gather_bounded  # noqa: F401
+from ._async import is_async_output
+from ._async import iterate_async_generator
+from ._async import run_coroutine
+from ._json_codec import TaskParameterEncoder  # noqa: F401
+from ._json_codec import register_json_encoder  # noqa: F401
+from ._json_log import unit_log_context
+from ._json_log import update_unit_log_context
+from ._memory_limit import limit_memory
+from ._parallel_map import map_zarr_urls  # noqa: F401
+from ._phase_timing import PhaseTimer
+from ._preflight import check_task_arguments  # noqa: F401
+from ._profiling import profile_task_call
+from ._progress import report_progress  # noqa: F401
+from ._progress import track_progress
+from ._resource_usage import get_resource_report
+from ._resource_usage import record_resource_usage
+from ._result_cache import ResultCacheInputs
+from ._result_cache import get_result_cache
+from ._result_cache import get_result_cache_dir
+from ._task_input import load_task_args
+from ._task_output import write_streaming_task_output
+from ._task_output import write_task_output
+from ._watchdog import watch_stalls
 from .logging_config import WRAPPER_LOGGER_NAME
+from .logging_config import flush_log_summaries
 from .logging_config import setup_logging_config
 
 task_wrapper_logger = logging.getLogger(WRAPPER_LOGGER_NAME)
 
 
-class TaskParameterEncoder(JSONEncoder):
-    """
-    Custom JSONEncoder that transforms Path objects to strings.
-
-    Ref https://docs.python.org/3/library/json.html
-    """
-
-    def default(self, o):
-        if isinstance(o, Path):
-            return o.as_posix()
-        return super().default(o)
-
-
 def _check_deprecated_argument(logger_name: str | None = None) -> None:
     """
     Emit warning for deprecated argument.
@@ -42,72 +53,327 @@ def _check_deprecated_argument(logger_name: str | None = None) -> None:
         )
 
 
-def run_fractal_task(
+def _run_task_unit(
     *,
     task_function: callable,
-    skip_logging_configuration: bool = False,
-    logger_name: str | None = None,
+    args_json: str,
+    out_json: str,
+    lazy_zarr_urls: bool = False,
+    result_cache_inputs: ResultCacheInputs | None = None,
+    phase_timer: PhaseTimer | None = None,
+    unit_index: int | None = None,
 ) -> None:
     """
-    Implement standard task interface and call task_function.
+    Read arguments, call `task_function` and write its output.
 
     Args:
-        task_function:
-            Callable function that runs the task.
-        skip_logging_configuration:
-            If `True`, do not call override logging configuration.
-        logger_name:
-            Deprecated argument (will be removed in a future version)
+        task_function: Callable function that runs the task.
+        args_json: Path to the JSON file with task arguments.
+        out_json: Path to the JSON file where the task output is written.
+        lazy_zarr_urls: Whether to pass `zarr_urls` as a lazy sequence.
+        result_cache_inputs: Function that returns the input paths of a unit.
+        phase_timer:
+            Timer that already includes the previous phases of this unit (if
+            any). Phase timings are logged when the unit ends.
+        unit_index:
+            Index of the unit within a worker or a batch (if any), for JSON
+            log records.
+    """
+    if phase_timer is None:
+        phase_timer = PhaseTimer()
+    with unit_log_context(task_name=task_function.__name__, unit_index=unit_index):
+        try:
+            if get_resource_report():
+                with record_resource_usage(
+                    task_function=task_function, out_json=out_json
+                ):
+                    _call_task_function(
+                        task_function=task_function,
+                        args_json=args_json,
+                        out_json=out_json,
+                        lazy_zarr_urls=lazy_zarr_urls,
+                        result_cache_inputs=result_cache_inputs,
+                        phase_timer=phase_timer,
+                    )
+            else:
+                _call_task_function(
+                    task_function=task_function,
+                    args_json=args_json,
+                    out_json=out_json,
+                    lazy_zarr_urls=lazy_zarr_urls,
+                    result_cache_inputs=result_cache_inputs,
+                    phase_timer=phase_timer,
+                )
+        finally:
+            phase_timer.report(task_function.__name__)
+            # Summarize the records of this unit that were collapsed or dropped
+            flush_log_summaries()
+
+
+def _call_task_function(
+    *,
+    task_function: callable,
+    args_json: str,
+    out_json: str,
+    lazy_zarr_urls: bool,
+    result_cache_inputs: ResultCacheInputs | None,
+    phase_timer: PhaseTimer,
+) -> None:
     """
+    Read arguments, call `task_function` and write its output.
+    """
+    # Read parameters dictionary
+    with phase_timer.phase("load_args"):
+        pars = load_task_args(args_json, lazy_zarr_urls=lazy_zarr_urls)
+    if "zarr_url" in pars:
+        update_unit_log_context(zarr_url=pars["zarr_url"])
 
-    # Parse `--args-json` and `--out-json` CLI arguments
+    # Restore cached output, if available
+    result_cache = None
+    result_cache_dir = get_result_cache_dir()
+    if result_cache_dir is not None:
+        with phase_timer.phase("check_result_cache"):
+            result_cache = get_result_cache(
+                task_function=task_function,
+                pars=pars,
+                out_json=out_json,
+                cache_dir=result_cache_dir,
+                result_cache_inputs=result_cache_inputs,
+            )
+            if result_cache.restore(out_json):
+                return
+
+    # Run task
+    task_wrapper_logger.info(f"START {task_function.__name__} task")
+    with (
+        phase_timer.phase("run_task"),
+        profile_task_call(out_json=out_json),
+        limit_memory(task_function=task_function),
+        track_progress(out_json=out_json) as progress_reporter,
+        watch_stalls(
+            task_name=task_function.__name__,
+            progress_reporter=progress_reporter,
+        ),
+    ):
+        metadata_update = task_function(**pars)
+        if is_async_output(metadata_update):
+            # Async task functions run on an event loop
+            if isinstance(metadata_update, types.AsyncGeneratorType):
+                metadata_update = iterate_async_generator(metadata_update)
+            else:
+                metadata_update = run_coroutine(metadata_update)
+        is_generator = isinstance(metadata_update, types.GeneratorType)
+        if is_generator:
+            # Generator tasks run while their output items are being written
+            write_streaming_task_output(metadata_update, out_json)
+    task_wrapper_logger.info(f"END {task_function.__name__} task")
+
+    # Write output metadata to file
+    with phase_timer.phase("write_output"):
+        if not is_generator:
+            write_task_output(metadata_update, out_json)
+        if result_cache is not None:
+            result_cache.store(out_json)
+
+
+def _get_argument_parser() -> ArgumentParser:
+    """
+    Get the parser of the CLI arguments of a task.
+    """
     parser = ArgumentParser()
     parser.add_argument(
         "--args-json",
         help="Read parameters from json file",
-        required=True,
+        required=False,
         type=str,
     )
     parser.add_argument(
         "--out-json",
         help="Output file to redirect serialised returned data",
-        required=True,
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--worker",
+        help=(
+            "Serve many task units, reading one JSON job descriptor per "
+            "line from standard input"
+        ),
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--fork-server",
+        help=(
+            "Serve many task units by forking a child process for each one, "
+            "reading one JSON job descriptor per line from standard input"
+        ),
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--fork-server-max-children",
+        help="Maximum number of concurrent children in fork-server mode",
+        required=False,
+        type=int,
+    )
+    parser.add_argument(
+        "--worker-socket",
+        help=(
+            "In worker or fork-server mode, read job descriptors from a "
+            "Unix-domain socket created at this path"
+        ),
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--worker-max-jobs",
+        help="Recycle the worker after this number of jobs",
+        required=False,
+        type=int,
+    )
+    parser.add_argument(
+        "--worker-max-rss-growth",
+        help="Recycle the worker after its RSS grew by this amount (in MB)",
+        required=False,
+        type=float,
+    )
+    parser.add_argument(
+        "--args-json-batch",
+        help=(
+            "Run many task units in forked child processes, reading the list "
+            "of job descriptors from this json file (if set, `--out-json` is "
+            "where the summary of exit statuses is written)"
+        ),
+        required=False,
         type=str,
     )
-    parsed_args = parser.parse_args()
+    parser.add_argument(
+        "--batch-max-workers",
+        help="Maximum number of concurrent children in batch mode",
+        required=False,
+        type=int,
+    )
+    return parser
 
-    # Configure root logger
-    if not (
-        skip_logging_configuration
-        or os.getenv(
-            "FRACTAL_TASK_SKIP_LOG_CONFIG",
-            False,
-        )
+
+def run_fractal_task(
+    *,
+    task_function: callable,
+    skip_logging_configuration: bool = False,
+    logger_name: str | None = None,
+    lazy_zarr_urls: bool = False,
+    result_cache_inputs: ResultCacheInputs | None = None,
+) -> None:
+    """
+    Implement standard task interface and call task_function.
+
+    Args:
+        task_function:
+            Callable function that runs the task. Coroutine functions and
+            async generator functions are run on a new event loop.
+        skip_logging_configuration:
+            If `True`, do not call override logging configuration.
+        logger_name:
+            Deprecated argument (will be removed in a future version)
+        lazy_zarr_urls:
+            If `True`, the `zarr_urls` argument is passed to `task_function`
+            as a read-only `LazyZarrUrls` sequence, which supports `len()`,
+            iteration and indexing without loading all items in memory. The
+            corresponding parameter must not be validated as a list (e.g. it
+            can be annotated as `SkipValidation[Sequence[str]]`).
+        result_cache_inputs:
+            Function that returns the input paths of a task unit (e.g. the
+            `.zattrs` file of the input image), given the task arguments.
+            When the `FRACTAL_TASK_RESULT_CACHE_DIR` environment variable is
+            set, the modification times and sizes of these paths are part of
+            the result-cache key.
+    """
+
+    # Parse CLI arguments
+    phase_timer = PhaseTimer()
+    with phase_timer.phase("parse_cli"):
+        parser = _get_argument_parser()
+        parsed_args = parser.parse_args()
+    fork_server_mode = parsed_args.fork_server
+    worker_mode = parsed_args.worker or (
+        parsed_args.worker_socket is not None and not fork_server_mode
+    )
+    batch_mode = parsed_args.args_json_batch is not None
+    if worker_mode + fork_server_mode + batch_mode > 1:
+        parser.error("worker, fork-server and batch modes are mutually exclusive")
+    if not (worker_mode or fork_server_mode or batch_mode) and (
+        parsed_args.args_json is None or parsed_args.out_json is None
     ):
-        setup_logging_config()
+        parser.error("the following arguments are required: --args-json, --out-json")
+
+    # Configure root logger
+    with phase_timer.phase("setup_logging"):
+        if not (
+            skip_logging_configuration
+            or os.getenv(
+                "FRACTAL_TASK_SKIP_LOG_CONFIG",
+                False,
+            )
+        ):
+            setup_logging_config()
 
     _check_deprecated_argument(logger_name)
 
+    if worker_mode or fork_server_mode or batch_mode:
+        phase_timer.report(task_function.__name__)
+
+    if worker_mode:
+        from ._worker import run_worker
+
+        run_worker(
+            task_function=task_function,
+            socket_path=parsed_args.worker_socket,
+            max_jobs=parsed_args.worker_max_jobs,
+            max_rss_growth=parsed_args.worker_max_rss_growth,
+            lazy_zarr_urls=lazy_zarr_urls,
+            result_cache_inputs=result_cache_inputs,
+        )
+        return
+
+    if fork_server_mode:
+        from ._fork_server import run_fork_server
+
+        run_fork_server(
+            task_function=task_function,
+            socket_path=parsed_args.worker_socket,
+            max_children=parsed_args.fork_server_max_children,
+            lazy_zarr_urls=lazy_zarr_urls,
+            result_cache_inputs=result_cache_inputs,
+        )
+        return
+
+    if batch_mode:
+        from ._batch import run_batch
+
+        run_batch(
+            task_function=task_function,
+            batch_json=parsed_args.args_json_batch,
+            summary_json=parsed_args.out_json,
+            max_workers=parsed_args.batch_max_workers,
+            lazy_zarr_urls=lazy_zarr_urls,
+            result_cache_inputs=result_cache_inputs,
+        )
+        return
+
     # Preliminary check
-    if Path(parsed_args.out_json).exists():
+    with phase_timer.phase("check_out_json"):
+        out_json_exists = Path(parsed_args.out_json).exists()
+    if out_json_exists:
         msg = f"Output file {parsed_args.out_json} already exists. Terminating"
         task_wrapper_logger.error(msg)
         sys.exit(msg)
 
-    # Read parameters dictionary
-    with open(parsed_args.args_json, "r") as f:
-        pars = json.load(f)
-
-    # Run task
-    task_wrapper_logger.info(f"START {task_function.__name__} task")
-    metadata_update = task_function(**pars)
-    task_wrapper_logger.info(f"END {task_function.__name__} task")
-
-    # Write output metadata to file, with custom JSON encoder
-    with open(parsed_args.out_json, "w") as fout:
-        json.dump(
-            metadata_update,
-            fout,
-            cls=TaskParameterEncoder,
-            indent=2,
-        )
+    _run_task_unit(
+        task_function=task_function,
+        args_json=parsed_args.args_json,
+        out_json=parsed_args.out_json,
+        lazy_zarr_urls=lazy_zarr_urls,
+        result_cache_inputs=result_cache_inputs,
+        phase_timer=phase_timer,
+    )
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import warnings
+
+import pytest
+from pydantic import validate_call
+
+from fractal_task_tools._async import DEFAULT_ASYNC_LOOP
+from fractal_task_tools._async import gather_bounded
+from fractal_task_tools._async import get_async_loop
+from fractal_task_tools._async import run_coroutine
+from fractal_task_tools.task_wrapper import _run_task_unit
+
+
+def _run(tmp_path, task_function, args):
+    args_path = tmp_path / "args.json"
+    out_path = tmp_path / "out.json"
+    out_path.unlink(missing_ok=True)
+    with args_path.open("w") as f:
+        json.dump(args, f)
+    _run_task_unit(
+        task_function=task_function,
+        args_json=args_path.as_posix(),
+        out_json=out_path.as_posix(),
+    )
+    with out_path.open("r") as f:
+        return json.load(f)
+
+
+def test_get_async_loop(monkeypatch):
+    assert get_async_loop() == DEFAULT_ASYNC_LOOP
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_ASYNC_LOOP", "invalid")
+        with pytest.raises(ValueError, match="Allowed values"):
+            get_async_loop()
+
+
+def test_run_coroutine_uvloop(monkeypatch):
+    async def coroutine():
+        return 1
+
+    monkeypatch.setenv("FRACTAL_TASK_ASYNC_LOOP", "uvloop")
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            with pytest.raises(ModuleNotFoundError, match="uvloop"):
+                run_coroutine(coroutine())
+    else:
+        assert run_coroutine(coroutine()) == 1
+
+
+def test_run_task_unit_async(tmp_path):
+    @validate_call
+    async def fake_async_task(zarr_url: str, parameter: float):
+        await asyncio.sleep(0)
+        return dict(zarr_url=zarr_url, parameter=parameter)
+
+    output = _run(tmp_path, fake_async_task, dict(zarr_url="/a", parameter=1))
+    assert output == dict(zarr_url="/a", parameter=1.0)
+
+
+def test_run_task_unit_async_generator(tmp_path):
+    async def fake_async_generator_task(zarr_urls: list[str], zarr_dir: str):
+        for zarr_url in zarr_urls:
+            await asyncio.sleep(0)
+            yield dict(zarr_url=zarr_url)
+        yield "/removed"
+
+    output = _run(
+        tmp_path,
+        fake_async_generator_task,
+        dict(zarr_urls=["/a", "/b"], zarr_dir="/zarr"),
+    )
+    assert output == dict(
+        image_list_updates=[dict(zarr_url="/a"), dict(zarr_url="/b")],
+        image_list_removals=["/removed"],
+    )
+
+
+def test_gather_bounded():
+    running = 0
+    max_running = 0
+
+    async def read_chunk(index: int) -> int:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        # Later chunks complete first
+        await asyncio.sleep(0.001 * (20 - index))
+        running -= 1
+        return index
+
+    results = asyncio.run(
+        gather_bounded((read_chunk(ind) for ind in range(20)), max_concurrency=4)
+    )
+    assert results == list(range(20))
+    assert max_running == 4
+
+    assert asyncio.run(gather_bounded([], max_concurrency=4)) == []
+    with pytest.raises(ValueError, match="max_concurrency"):
+        asyncio.run(gather_bounded([], max_concurrency=0))
+
+
+def test_gather_bounded_exceptions():
+    started = []
+
+    async def read_chunk(index: int) -> int:
+        started.append(index)
+        await asyncio.sleep(0.001)
+        if index == 2:
+            raise ValueError(f"Cannot read chunk {index}")
+        return index
+
+    results = asyncio.run(
+        gather_bounded(
+            [read_chunk(ind) for ind in range(5)],
+            max_concurrency=2,
+            return_exceptions=True,
+        )
+    )
+    assert results[:2] == [0, 1]
+    assert isinstance(results[2], ValueError)
+    assert results[3:] == [3, 4]
+
+    # The first exception is raised, and other awaitables are not started
+    started.clear()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        with pytest.raises(ValueError, match="Cannot read chunk 2"):
+            asyncio.run(
+                gather_bounded(
+                    [read_chunk(ind) for ind in range(10)],
+                    max_concurrency=2,
+                )
+            )
+    assert 9 not in started
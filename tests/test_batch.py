@@ -0,0 +1,155 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from fractal_task_tools._batch import _get_default_log_file
+from fractal_task_tools._batch import get_available_cpus
+
+TASK_PATH = Path(__file__).parent / "fake-task-for-logging/task1.py"
+
+
+def test_get_available_cpus(monkeypatch):
+    assert get_available_cpus() >= 1
+    with monkeypatch.context() as mc:
+        mc.setenv("SLURM_CPUS_PER_TASK", "7")
+        assert get_available_cpus() == 7
+
+
+def test_get_default_log_file():
+    assert _get_default_log_file("/some/out.json") == "/some/out.log"
+    assert _get_default_log_file("/some/out") == "/some/out.log"
+
+
+def test_batch_mode(tmp_path):
+    jobs = []
+    for ind in range(4):
+        args_path = tmp_path / f"args{ind}.json"
+        # The third unit has an invalid argument
+        arg = "invalid" if ind == 2 else ind
+        with args_path.open("w") as f:
+            json.dump(dict(zarr_urls=[], zarr_dir="/fake", arg=arg), f)
+        jobs.append(
+            dict(
+                args_json=args_path.as_posix(),
+                out_json=(tmp_path / f"out{ind}.json").as_posix(),
+            )
+        )
+    batch_path = tmp_path / "batch.json"
+    with batch_path.open("w") as f:
+        json.dump(jobs, f)
+    summary_path = tmp_path / "summary.json"
+
+    res = subprocess.run(
+        [
+            sys.executable,
+            TASK_PATH.as_posix(),
+            "--args-json-batch",
+            batch_path.as_posix(),
+            "--out-json",
+            summary_path.as_posix(),
+            "--batch-max-workers",
+            "2",
+        ],
+        capture_output=True,
+        encoding="utf-8",
+    )
+    assert res.returncode == 1
+    assert "1/4 task units failed" in res.stderr
+
+    with summary_path.open() as f:
+        summary = json.load(f)
+    assert [status["exit_status"] for status in summary] == [0, 0, 1, 0]
+    assert "validation error" in summary[2]["error"]
+
+    for ind in range(4):
+        log = (tmp_path / f"out{ind}.log").read_text()
+        if ind == 2:
+            assert not (tmp_path / f"out{ind}.json").exists()
+            assert "Task unit failed" in log
+        else:
+            assert "INFO from task" in log
+            with (tmp_path / f"out{ind}.json").open() as f:
+                assert json.load(f) == ["something"]
+
+
+def test_batch_mode_json_logs(tmp_path):
+    args_path = tmp_path / "args.json"
+    with args_path.open("w") as f:
+        json.dump(dict(zarr_urls=[], zarr_dir="/fake", arg=1), f)
+    batch_path = tmp_path / "batch.json"
+    with batch_path.open("w") as f:
+        json.dump(
+            [dict(args_json=args_path.as_posix(), out_json=f"{tmp_path}/out.json")], f
+        )
+
+    res = subprocess.run(
+        [sys.executable, TASK_PATH.as_posix(), "--args-json-batch", batch_path],
+        env=dict(os.environ, FRACTAL_TASK_LOG_FORMAT="json"),
+        capture_output=True,
+        encoding="utf-8",
+    )
+    assert res.returncode == 0, res.stderr
+    records = [
+        json.loads(line)
+        for line in (tmp_path / "out.log").read_text().splitlines()
+        if line.startswith("{")
+    ]
+    assert any(record["message"] == "INFO from task" for record in records)
+    assert all(record["unit_index"] == 0 for record in records if "task" in record)
+
+
+def test_batch_mode_unit_crash(tmp_path):
+    script = tmp_path / "task.py"
+    script.write_text(
+        "import os, time\n"
+        "from fractal_task_tools.task_wrapper import run_fractal_task\n"
+        "def my_task(zarr_url: str, value: int):\n"
+        "    if value == 2:\n"
+        "        os._exit(3)\n"
+        "    time.sleep(0.2)\n"
+        "    return dict(value=value)\n"
+        "run_fractal_task(task_function=my_task)\n"
+    )
+    jobs = []
+    for ind in range(6):
+        args_path = tmp_path / f"args{ind}.json"
+        with args_path.open("w") as f:
+            json.dump(dict(zarr_url="/fake", value=ind), f)
+        jobs.append(
+            dict(
+                args_json=args_path.as_posix(),
+                out_json=(tmp_path / f"out{ind}.json").as_posix(),
+            )
+        )
+    batch_path = tmp_path / "batch.json"
+    with batch_path.open("w") as f:
+        json.dump(jobs, f)
+    summary_path = tmp_path / "summary.json"
+
+    res = subprocess.run(
+        [
+            sys.executable,
+            script.as_posix(),
+            "--args-json-batch",
+            batch_path.as_posix(),
+            "--out-json",
+            summary_path.as_posix(),
+            "--batch-max-workers",
+            "2",
+        ],
+        capture_output=True,
+        encoding="utf-8",
+    )
+    assert res.returncode == 1
+    assert "1/6 task units failed" in res.stderr
+
+    # Only the unit whose process died fails
+    with summary_path.open() as f:
+        summary = json.load(f)
+    assert [status["exit_status"] for status in summary] == [0, 0, 3, 0, 0, 0]
+    assert "exited with status 3" in summary[2]["error"]
+    for ind in (0, 1, 3, 4, 5):
+        with (tmp_path / f"out{ind}.json").open() as f:
+            assert json.load(f) == dict(value=ind)
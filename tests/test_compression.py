@@ -0,0 +1,101 @@
+import gzip
+import json
+
+import pytest
+
+from fractal_task_tools._compression import is_compressed
+from fractal_task_tools._compression import open_file
+from fractal_task_tools._compression import remove_compressed_suffix
+from fractal_task_tools._task_output import get_sidecar_path
+from fractal_task_tools.task_wrapper import _run_task_unit
+
+
+def _has_zstd() -> bool:
+    try:
+        from compression import zstd  # noqa: F401
+
+        return True
+    except ImportError:
+        pass
+    try:
+        import zstandard  # noqa: F401
+
+        return True
+    except ImportError:
+        return False
+
+
+SUFFIXES = [
+    "",
+    ".gz",
+    pytest.param(
+        ".zst",
+        marks=pytest.mark.skipif(not _has_zstd(), reason="zstd not available"),
+    ),
+]
+
+
+def test_paths():
+    assert is_compressed("/a/out.json.gz")
+    assert is_compressed("/a/out.json.zst")
+    assert not is_compressed("/a/out.json")
+    assert remove_compressed_suffix("/a/out.json.zst") == "/a/out.json"
+    assert remove_compressed_suffix("/a/out.json") == "/a/out.json"
+    for out_json in ("/a/out.json", "/a/out.json.gz", "/a/out.json.zst", "/a/out"):
+        assert get_sidecar_path(out_json, ".log") == "/a/out.log"
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES)
+def test_open_file(tmp_path, suffix):
+    path = (tmp_path / f"file.json{suffix}").as_posix()
+    data = b'{"zarr_urls": ["/somewhere/plate.zarr/B/03/0"]}' * 100
+    with open_file(path, "wb") as f:
+        f.write(data)
+    with open_file(path, "rb") as f:
+        assert f.read() == data
+    if suffix:
+        with open(path, "rb") as f:
+            assert len(f.read()) < len(data)
+
+
+def test_open_file_gzip_interoperability(tmp_path):
+    path = (tmp_path / "file.json.gz").as_posix()
+    with gzip.open(path, "wb") as f:
+        f.write(b"[1, 2]")
+    with open_file(path, "rb") as f:
+        assert f.read() == b"[1, 2]"
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES)
+@pytest.mark.parametrize("generator", [False, True])
+@pytest.mark.parametrize("lazy_zarr_urls", [False, True])
+def test_run_task_unit_compressed(tmp_path, suffix, generator, lazy_zarr_urls):
+    def fake_task(zarr_urls: list[str], zarr_dir: str):
+        return dict(image_list_updates=[dict(zarr_url=url) for url in zarr_urls])
+
+    def fake_generator_task(zarr_urls: list[str], zarr_dir: str):
+        for zarr_url in zarr_urls:
+            yield dict(zarr_url=zarr_url)
+
+    zarr_urls = [f"/somewhere/plate.zarr/B/{ind:02d}/0" for ind in range(10)]
+    args_json = (tmp_path / f"args.json{suffix}").as_posix()
+    out_json = (tmp_path / f"out.json{suffix}").as_posix()
+    with open_file(args_json, "wb") as f:
+        f.write(json.dumps(dict(zarr_urls=zarr_urls, zarr_dir="/zarr")).encode())
+    _run_task_unit(
+        task_function=fake_generator_task if generator else fake_task,
+        args_json=args_json,
+        out_json=out_json,
+        lazy_zarr_urls=lazy_zarr_urls,
+    )
+    with open_file(out_json, "rb") as f:
+        task_output = json.loads(f.read())
+    assert task_output["image_list_updates"] == [
+        dict(zarr_url=zarr_url) for zarr_url in zarr_urls
+    ]
+
+
+@pytest.mark.skipif(_has_zstd(), reason="zstd available")
+def test_open_file_zstd_missing(tmp_path):
+    with pytest.raises(ModuleNotFoundError, match="zstandard"):
+        open_file((tmp_path / "out.json.zst").as_posix(), "wb")
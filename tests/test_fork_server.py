@@ -0,0 +1,103 @@
+import json
+import os
+import select
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+TASK_PATH = Path(__file__).parent / "fake-task-for-logging/task1.py"
+
+
+@pytest.mark.parametrize("log_async", ["false", "true"])
+def test_fork_server(tmp_path, log_async):
+    lines = []
+    for ind in range(5):
+        args_path = tmp_path / f"args{ind}.json"
+        # The fourth unit has an invalid argument
+        arg = "invalid" if ind == 3 else ind
+        with args_path.open("w") as f:
+            json.dump(dict(zarr_urls=[], zarr_dir="/fake", arg=arg), f)
+        job = dict(
+            args_json=args_path.as_posix(),
+            out_json=(tmp_path / f"out{ind}.json").as_posix(),
+        )
+        lines.append(json.dumps(job))
+    lines.append("not-a-json-line")
+
+    res = subprocess.run(
+        [
+            sys.executable,
+            TASK_PATH.as_posix(),
+            "--fork-server",
+            "--fork-server-max-children",
+            "2",
+        ],
+        input="\n".join(lines) + "\n",
+        capture_output=True,
+        encoding="utf-8",
+        env=dict(os.environ, FRACTAL_TASK_LOG_ASYNC=log_async),
+    )
+    assert res.returncode == 0
+    assert "Fork server START (max_children=2)" in res.stderr
+    # The log records of all children are written before they end
+    assert res.stderr.count("task1; INFO; INFO from task") == 4
+    replies = [json.loads(line) for line in res.stdout.splitlines()]
+    assert len(replies) == 6
+
+    # Replies may come in any order
+    replies_by_args = {reply["args_json"]: reply for reply in replies}
+    assert replies_by_args[None]["exit_status"] == 1
+    for ind in range(5):
+        reply = replies_by_args[(tmp_path / f"args{ind}.json").as_posix()]
+        out_path = tmp_path / f"out{ind}.json"
+        if ind == 3:
+            assert reply["exit_status"] == 1
+            assert "validation error" in reply["error"]
+            assert not out_path.exists()
+        else:
+            assert reply["exit_status"] == 0
+            assert reply["error"] is None
+            with out_path.open() as f:
+                assert json.load(f) == ["something"]
+
+
+def test_fork_server_invalid_modes(tmp_path):
+    res = subprocess.run(
+        [sys.executable, TASK_PATH.as_posix(), "--fork-server", "--worker"],
+        capture_output=True,
+        encoding="utf-8",
+    )
+    assert res.returncode == 2
+    assert "mutually exclusive" in res.stderr
+
+
+def test_fork_server_reply_before_end_of_input(tmp_path):
+    args_path = tmp_path / "args.json"
+    with args_path.open("w") as f:
+        json.dump(dict(zarr_urls=[], zarr_dir="/fake", arg=1), f)
+    job = dict(
+        args_json=args_path.as_posix(),
+        out_json=(tmp_path / "out.json").as_posix(),
+    )
+    proc = subprocess.Popen(
+        [sys.executable, TASK_PATH.as_posix(), "--fork-server"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        encoding="utf-8",
+    )
+    try:
+        # The reply is sent while the standard input is still open
+        proc.stdin.write(json.dumps(job) + "\n")
+        proc.stdin.flush()
+        readable, _, _ = select.select([proc.stdout], [], [], 20)
+        assert readable, "No reply before the end of the input."
+        reply = json.loads(proc.stdout.readline())
+        assert reply["exit_status"] == 0
+        assert reply["args_json"] == args_path.as_posix()
+    finally:
+        proc.stdin.close()
+        proc.wait(timeout=20)
+    assert proc.returncode == 0
@@ -0,0 +1,91 @@
+import subprocess
+import sys
+
+# Maximum cumulative import time of `fractal_task_tools.task_wrapper`, in
+# microseconds (including the non-preloaded stdlib modules it depends on)
+TASK_WRAPPER_IMPORT_BUDGET_US = 75_000
+
+# Modules that must only be imported on the manifest-creation path
+MANIFEST_ONLY_MODULES = (
+    "pydantic",
+    "docstring_parser",
+    "fractal_task_tools._create_manifest",
+    "fractal_task_tools.task_models",
+)
+
+
+def _run_importtime(statement: str) -> dict[str, int]:
+    """
+    Run `statement` with `-X importtime`, and parse its output.
+
+    Returns:
+        Map from the names of top-level imports of `fractal_task_tools`
+        modules to their cumulative import time (in microseconds), plus the
+        names of all other imported modules (with value `0`).
+    """
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        encoding="utf-8",
+        check=True,
+    )
+    modules = {}
+    for line in res.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        is_top_level = not name[1:].startswith(" ")
+        name = name.strip()
+        if is_top_level and name.startswith("fractal_task_tools"):
+            modules[name] = int(cumulative)
+        else:
+            modules.setdefault(name, 0)
+    return modules
+
+
+def test_task_wrapper_imports():
+    modules = _run_importtime("import fractal_task_tools.task_wrapper")
+    assert "fractal_task_tools.task_wrapper" in modules
+    for name in MANIFEST_ONLY_MODULES:
+        assert name not in modules
+    # Running modes which are not used by standard task units
+    assert "fractal_task_tools._worker" not in modules
+    assert "fractal_task_tools._batch" not in modules
+    assert "fractal_task_tools._fork_server" not in modules
+    assert "concurrent.futures" not in modules
+
+
+def test_manifest_imports():
+    modules = _run_importtime("import fractal_task_tools._create_manifest")
+    for name in MANIFEST_ONLY_MODULES:
+        assert name in modules
+
+
+def test_task_wrapper_import_budget():
+    # The first run may include bytecode compilation, and it is discarded
+    _run_importtime("import fractal_task_tools.task_wrapper")
+    import_times = []
+    for _ in range(3):
+        modules = _run_importtime("import fractal_task_tools.task_wrapper")
+        import_times.append(
+            sum(
+                cumulative
+                for name, cumulative in modules.items()
+                if name.startswith("fractal_task_tools")
+            )
+        )
+    assert min(import_times) < TASK_WRAPPER_IMPORT_BUDGET_US
+
+
+def test_no_logging_side_effects():
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            (
+                "import logging; import fractal_task_tools.task_wrapper; "
+                "assert not logging.getLogger().handlers"
+            ),
+        ],
+        check=True,
+    )
@@ -0,0 +1,68 @@
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+from fractal_task_tools._installed_manifest import MANIFEST_FILENAME
+from fractal_task_tools._installed_manifest import get_manifest_task
+from fractal_task_tools._installed_manifest import get_task_executable
+from fractal_task_tools._installed_manifest import get_task_meta
+
+MANIFEST = dict(
+    manifest_version="2",
+    task_list=[
+        dict(
+            name="Compound task",
+            executable_non_parallel="tasks/init_task.py",
+            executable_parallel="tasks/compute_task.py",
+            meta_non_parallel=dict(cpus_per_task=1, mem=1000),
+            meta_parallel=dict(cpus_per_task=4, mem="8G"),
+        ),
+    ],
+)
+
+
+def _create_package(tmp_path):
+    package_root = tmp_path / "my_package"
+    (package_root / "tasks").mkdir(parents=True)
+    with (package_root / MANIFEST_FILENAME).open("w") as f:
+        json.dump(MANIFEST, f)
+    for name in ("init_task", "compute_task", "other_task"):
+        with (package_root / "tasks" / f"{name}.py").open("w") as f:
+            f.write(f"def {name}():\n    pass\n")
+    return package_root
+
+
+def test_get_manifest_task(tmp_path):
+    package_root = _create_package(tmp_path)
+    task, kind = get_manifest_task((package_root / "tasks/compute_task.py").as_posix())
+    assert task["name"] == "Compound task"
+    assert kind == "parallel"
+    _, kind = get_manifest_task((package_root / "tasks/init_task.py").as_posix())
+    assert kind == "non_parallel"
+    assert get_manifest_task((package_root / "tasks/other_task.py").as_posix()) is None
+    assert get_manifest_task((tmp_path / "task.py").as_posix()) is None
+
+
+def test_get_task_meta(tmp_path):
+    package_root = _create_package(tmp_path)
+    module_path = (package_root / "tasks/compute_task.py").resolve()
+    spec = importlib.util.spec_from_file_location("compute_task", module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # The function module is not registered in `sys.modules`
+    assert get_task_executable(module.compute_task) is None
+    assert get_task_meta(module.compute_task) is None
+
+    def task_function():
+        pass
+
+    assert get_task_executable(task_function) == Path(__file__).resolve().as_posix()
+    assert get_task_meta(task_function) is None
+
+    sys.modules["compute_task"] = module
+    try:
+        assert get_task_executable(module.compute_task) == module_path.as_posix()
+        assert get_task_meta(module.compute_task) == dict(cpus_per_task=4, mem="8G")
+    finally:
+        sys.modules.pop("compute_task")
@@ -0,0 +1,257 @@
+import json
+import math
+import sys
+import types
+from datetime import date
+from datetime import datetime
+from datetime import time
+from enum import Enum
+from pathlib import Path
+from pathlib import PurePosixPath
+
+import pytest
+
+from fractal_task_tools._json_codec import _REGISTERED_ENCODERS
+from fractal_task_tools._json_codec import DEFAULT_JSON_CODEC
+from fractal_task_tools._json_codec import JSONCodec
+from fractal_task_tools._json_codec import encode_default
+from fractal_task_tools._json_codec import get_json_codec
+from fractal_task_tools._json_codec import get_json_codec_name
+from fractal_task_tools._json_codec import register_json_encoder
+
+TASK_OUTPUT = dict(
+    image_list_updates=[
+        dict(
+            zarr_url="/somewhere/plate.zarr/B/03/0",
+            origin=Path("/somewhere/raw.zarr/B/03/0"),
+            attributes=dict(well="B03", acquisition=1, value=0.5),
+            types=dict(is_3D=False),
+        )
+    ],
+    image_list_removals=[],
+    empty=dict(),
+    nothing=None,
+)
+
+
+class Channel(Enum):
+    DAPI = "DAPI"
+    GFP = 2
+
+
+ENCODED_TYPES = dict(
+    path=PurePosixPath("/a/b"),
+    enum=[Channel.DAPI, Channel.GFP],
+    datetime=datetime(2025, 1, 2, 3, 4, 5, 6),
+    date=date(2025, 1, 2),
+    time=time(3, 4, 5),
+)
+
+
+def test_get_json_codec_name(monkeypatch):
+    assert get_json_codec_name() == DEFAULT_JSON_CODEC
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_JSON_CODEC", "invalid-codec")
+        with pytest.raises(ValueError, match="Allowed values"):
+            get_json_codec_name()
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_JSON_CODEC", "json")
+        assert get_json_codec().name == "json"
+
+
+def test_json_codec():
+    codec = JSONCodec()
+    for compact in (True, False):
+        data = codec.dumps(TASK_OUTPUT, compact=compact)
+        # Same output as the previous `json.dump`-based implementation
+        if not compact:
+            expected = json.dumps(
+                TASK_OUTPUT,
+                default=lambda o: o.as_posix(),
+                indent=2,
+            )
+            assert data.decode() == expected
+        assert codec.loads(data)["image_list_updates"][0]["origin"] == (
+            "/somewhere/raw.zarr/B/03/0"
+        )
+    with pytest.raises(TypeError, match="set is not JSON serializable"):
+        codec.dumps(dict(values={1, 2}), compact=True)
+
+
+def test_orjson_codec(monkeypatch):
+    pytest.importorskip("orjson")
+    monkeypatch.setenv("FRACTAL_TASK_JSON_CODEC", "orjson")
+    codec = get_json_codec()
+    assert codec.name == "orjson"
+    stdlib_codec = JSONCodec()
+
+    # Same output as the standard-library codec
+    for compact in (True, False):
+        assert codec.dumps(TASK_OUTPUT, compact=compact) == stdlib_codec.dumps(
+            TASK_OUTPUT, compact=compact
+        )
+
+    # Same errors as the standard-library codec
+    with pytest.raises(TypeError, match="set is not JSON serializable"):
+        codec.dumps(dict(values={1, 2}), compact=True)
+    with pytest.raises(json.JSONDecodeError):
+        codec.loads(b"{invalid")
+
+    # Same output for the types with a built-in encoder
+    assert codec.dumps(ENCODED_TYPES, compact=True) == stdlib_codec.dumps(
+        ENCODED_TYPES, compact=True
+    )
+
+    # Fallback to the standard-library codec
+    assert codec.dumps(2**70, compact=True) == b"1180591620717411303424"
+    assert codec.loads(b"[NaN]")[0] != codec.loads(b"[NaN]")[0]
+
+    # Same parsed arguments
+    args = dict(zarr_urls=[f"/somewhere/{ind}" for ind in range(100)], x=1.5)
+    data = stdlib_codec.dumps(args, compact=False)
+    assert codec.loads(data) == stdlib_codec.loads(data) == args
+
+
+def test_orjson_codec_parity(monkeypatch):
+    """
+    The outputs of both codecs decode to the same values, or both codecs
+    raise the same errors.
+    """
+    pytest.importorskip("orjson")
+    monkeypatch.setenv("FRACTAL_TASK_JSON_CODEC", "orjson")
+    codec = get_json_codec()
+    stdlib_codec = JSONCodec()
+    for obj in (
+        dict(mean=math.nan),
+        dict(attributes=dict(mean=math.nan, zarr_url=None)),
+        dict(values=[math.inf, -math.inf, 1.5]),
+        dict(values=(None, [math.nan])),
+        {1: "int key", "2": None},
+        dict(zarr_url=None, label="null", value=1e16),
+        dict(label="Noyau é", path="/data/画像.zarr"),
+    ):
+        for compact in (True, False):
+            data = codec.dumps(obj, compact=compact)
+            stdlib_data = stdlib_codec.dumps(obj, compact=compact)
+            assert repr(stdlib_codec.loads(data)) == repr(
+                stdlib_codec.loads(stdlib_data)
+            )
+    assert codec.dumps(dict(mean=math.nan), compact=True) == b'{"mean":NaN}'
+    # Outputs with `null` but without non-finite floats are written by `orjson`
+    data = codec.dumps(dict(origin=None, label="é"), compact=True)
+    assert data == '{"origin":null,"label":"é"}'.encode()
+
+    # Enum keys are not supported by the standard-library codec
+    for tested_codec in (codec, stdlib_codec):
+        with pytest.raises(TypeError, match="keys must be"):
+            tested_codec.dumps({Channel.DAPI: 1}, compact=True)
+
+
+def test_auto_codec(monkeypatch):
+    monkeypatch.setenv("FRACTAL_TASK_JSON_CODEC", "auto")
+    try:
+        import orjson  # noqa: F401
+
+        assert get_json_codec().name == "orjson"
+    except ImportError:
+        assert get_json_codec().name == "json"
+
+
+def test_encode_default():
+    assert JSONCodec().loads(JSONCodec().dumps(ENCODED_TYPES, compact=True)) == dict(
+        path="/a/b",
+        enum=["DAPI", 2],
+        datetime="2025-01-02T03:04:05.000006",
+        date="2025-01-02",
+        time="03:04:05",
+    )
+    with pytest.raises(TypeError, match="object is not JSON serializable"):
+        encode_default(object())
+
+
+def test_register_json_encoder(monkeypatch):
+    monkeypatch.setattr(
+        "fractal_task_tools._json_codec._REGISTERED_ENCODERS",
+        _REGISTERED_ENCODERS.copy(),
+    )
+    monkeypatch.setattr("fractal_task_tools._json_codec._ENCODERS_BY_TYPE", {})
+
+    class Point:
+        def __init__(self, x, y):
+            self.x, self.y = x, y
+
+    class Point3D(Point):
+        pass
+
+    with pytest.raises(TypeError, match="Point is not JSON serializable"):
+        encode_default(Point(1, 2))
+    register_json_encoder(Point, lambda o: [o.x, o.y])
+    assert encode_default(Point(1, 2)) == [1, 2]
+    # Subclasses use the encoder of their base class
+    assert encode_default(Point3D(1, 2)) == [1, 2]
+    assert JSONCodec().dumps(dict(points=[Point(1, 2)]), compact=True) == (
+        b'{"points":[[1,2]]}'
+    )
+
+    # Registered encoders take precedence over built-in ones, also after a
+    # type was already encoded
+    assert encode_default(Path("/a")) == "/a"
+    register_json_encoder(Path, lambda o: f"file://{o.as_posix()}")
+    assert encode_default(Path("/a")) == "file:///a"
+
+
+def test_encode_default_numpy_lazy(monkeypatch):
+    """
+    `numpy` types are only encoded when `numpy` is imported.
+    """
+
+    class generic:
+        def item(self):
+            return 1.5
+
+    class ndarray:
+        def tolist(self):
+            return [[1, 2], [3, 4]]
+
+    fake_numpy = types.ModuleType("numpy")
+    fake_numpy.generic = generic
+    fake_numpy.ndarray = ndarray
+    with monkeypatch.context() as mc:
+        mc.delitem(sys.modules, "numpy", raising=False)
+        with pytest.raises(TypeError, match="generic is not JSON serializable"):
+            encode_default(generic())
+        mc.setitem(sys.modules, "numpy", fake_numpy)
+        assert JSONCodec().dumps([generic(), ndarray()], compact=True) == (
+            b"[1.5,[[1,2],[3,4]]]"
+        )
+
+
+@pytest.mark.parametrize("codec_name", ["json", "orjson"])
+def test_encode_numpy(codec_name, monkeypatch):
+    np = pytest.importorskip("numpy")
+    if codec_name == "orjson":
+        pytest.importorskip("orjson")
+    monkeypatch.setenv("FRACTAL_TASK_JSON_CODEC", codec_name)
+    codec = get_json_codec()
+    task_output = dict(
+        attributes=dict(
+            count=np.int64(3),
+            is_3D=np.bool_(True),
+            scale=np.float64(0.5),
+            shape=np.array([1, 2, 3], dtype=np.uint16),
+            matrix=np.eye(2)[:, ::-1],
+            mean=np.float32(0.1),
+        )
+    )
+    assert codec.loads(codec.dumps(task_output, compact=True)) == dict(
+        attributes=dict(
+            count=3,
+            is_3D=True,
+            scale=0.5,
+            shape=[1, 2, 3],
+            matrix=[[0.0, 1.0], [1.0, 0.0]],
+            mean=float(np.float32(0.1)),
+        )
+    )
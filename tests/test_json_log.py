@@ -0,0 +1,89 @@
+import json
+import logging
+import sys
+
+from fractal_task_tools._json_log import JsonLinesFormatter
+from fractal_task_tools._json_log import UnitContextFilter
+from fractal_task_tools._json_log import unit_log_context
+from fractal_task_tools._json_log import update_unit_log_context
+from fractal_task_tools._worker import run_job
+
+
+def _make_record(msg: str, *args, exc_info=None) -> logging.LogRecord:
+    return logging.LogRecord(
+        "my_task", logging.WARNING, __file__, 1, msg, args, exc_info
+    )
+
+
+def test_json_lines_formatter():
+    formatter = JsonLinesFormatter()
+
+    # Outside of task units
+    line = formatter.format(_make_record('Value "%s"\n', "é"))
+    assert "\n" not in line
+    record = json.loads(line)
+    assert list(record) == ["timestamp", "logger", "level", "message"]
+    assert record["logger"] == "my_task"
+    assert record["level"] == "WARNING"
+    assert record["message"] == 'Value "é"\n'
+    assert record["timestamp"].endswith("Z")
+
+    # Within task units
+    with unit_log_context(task_name="my_task", unit_index=3):
+        record = json.loads(formatter.format(_make_record("First")))
+        assert record["task"] == "my_task"
+        assert record["unit_index"] == 3
+        assert "zarr_url" not in record
+        assert record["elapsed"] >= 0
+        update_unit_log_context(zarr_url="/zarr/A/01/0")
+        record = json.loads(formatter.format(_make_record("Second")))
+        assert record["zarr_url"] == "/zarr/A/01/0"
+    record = json.loads(formatter.format(_make_record("Third")))
+    assert "task" not in record
+
+    # Exceptions
+    try:
+        raise ValueError("failure")
+    except ValueError:
+        record = json.loads(
+            formatter.format(_make_record("Error", exc_info=sys.exc_info()))
+        )
+    assert "ValueError: failure" in record["exc_info"]
+
+
+def test_unit_context_filter():
+    formatter = JsonLinesFormatter()
+    unit_filter = UnitContextFilter()
+    with unit_log_context(task_name="my_task", unit_index=None):
+        log_record = _make_record("Message")
+        unit_filter.filter(log_record)
+    # The context of the record is kept after the end of the unit
+    record = json.loads(formatter.format(log_record))
+    assert record["task"] == "my_task"
+    assert "unit_index" not in record
+
+
+def test_run_job_json_logs(tmp_path, caplog):
+    def fake_task(zarr_url: str):
+        logging.getLogger("my_task").info("Processing")
+
+    args_json = tmp_path / "args.json"
+    args_json.write_text(json.dumps(dict(zarr_url="/zarr/A/01/0")))
+    # NOTE: the handler of `caplog` is shared by all tests
+    previous_formatter = caplog.handler.formatter
+    caplog.handler.setFormatter(JsonLinesFormatter())
+    try:
+        with caplog.at_level(logging.INFO):
+            run_job(
+                task_function=fake_task,
+                args_json=args_json.as_posix(),
+                out_json=(tmp_path / "out.json").as_posix(),
+                unit_index=7,
+            )
+    finally:
+        caplog.handler.setFormatter(previous_formatter)
+    records = [json.loads(line) for line in caplog.text.splitlines()]
+    (record,) = [record for record in records if record["message"] == "Processing"]
+    assert record["task"] == "fake_task"
+    assert record["zarr_url"] == "/zarr/A/01/0"
+    assert record["unit_index"] == 7
@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+
+from fractal_task_tools._lazy_zarr_urls import LazyZarrUrls
+from fractal_task_tools._lazy_zarr_urls import load_task_args_with_lazy_zarr_urls
+from fractal_task_tools._task_input import load_task_args
+from fractal_task_tools._task_input import preload_task_args
+
+ZARR_URLS = [f"/somewhere/plate.zarr/B/{ind:02d}/0" for ind in range(20)]
+
+
+def _write_args(tmp_path, content: str) -> str:
+    args_json = (tmp_path / "args.json").as_posix()
+    with open(args_json, "w") as f:
+        f.write(content)
+    return args_json
+
+
+@pytest.mark.parametrize(
+    "zarr_urls",
+    [
+        ZARR_URLS,
+        [],
+        ["/plate.zarr/A/01/0"],
+        ['/with "quotes" and \\ backslash', "/with ] bracket", "/ünïcode"],
+        ["/with ] bracket", "/with [ bracket"],
+    ],
+)
+def test_lazy_zarr_urls(tmp_path, zarr_urls):
+    args = dict(
+        zarr_urls=zarr_urls,
+        zarr_dir="/somewhere",
+        nested=dict(zarr_urls=["/not/this/one"], other="]"),
+        after=[1, 2, "]"],
+    )
+    args_json = _write_args(tmp_path, json.dumps(args, indent=2))
+    pars = load_task_args(args_json, lazy_zarr_urls=True)
+    lazy = pars.pop("zarr_urls")
+    assert isinstance(lazy, LazyZarrUrls)
+    assert pars == {key: value for key, value in args.items() if key != "zarr_urls"}
+    assert len(lazy) == len(zarr_urls)
+    assert list(lazy) == zarr_urls
+    assert lazy[:] == zarr_urls
+    assert lazy[::-2] == zarr_urls[::-2]
+    for ind in range(-len(zarr_urls), len(zarr_urls)):
+        assert lazy[ind] == zarr_urls[ind]
+    with pytest.raises(IndexError):
+        lazy[len(zarr_urls)]
+    if zarr_urls:
+        assert zarr_urls[-1] in lazy
+        assert lazy.index(zarr_urls[-1]) == len(zarr_urls) - 1
+
+
+def test_lazy_zarr_urls_not_an_array(tmp_path):
+    # Missing key
+    args_json = _write_args(tmp_path, json.dumps(dict(zarr_dir="/somewhere")))
+    assert load_task_args_with_lazy_zarr_urls(args_json) == dict(zarr_dir="/somewhere")
+    # Only nested key
+    args = dict(nested=dict(zarr_urls=["/a"]), x=1)
+    args_json = _write_args(tmp_path, json.dumps(args))
+    assert load_task_args_with_lazy_zarr_urls(args_json) == args
+    # Null value
+    args = dict(zarr_urls=None)
+    args_json = _write_args(tmp_path, json.dumps(args))
+    assert load_task_args_with_lazy_zarr_urls(args_json) == args
+
+
+def test_lazy_zarr_urls_empty_file(tmp_path):
+    args_json = _write_args(tmp_path, "")
+    with pytest.raises(ValueError):
+        load_task_args_with_lazy_zarr_urls(args_json)
+    args_json = _write_args(tmp_path, '{"zarr_urls": ["/a", "/b"')
+    with pytest.raises(ValueError, match="end of the `zarr_urls` array"):
+        load_task_args_with_lazy_zarr_urls(args_json)
+
+
+@pytest.mark.parametrize("lazy_zarr_urls", [False, True])
+def test_preloaded_task_args(tmp_path, lazy_zarr_urls):
+    args = dict(zarr_urls=ZARR_URLS, zarr_dir="/somewhere")
+    args_json = _write_args(tmp_path, json.dumps(args))
+    preloaded = preload_task_args(args_json)
+    assert isinstance(preloaded["zarr_urls"], LazyZarrUrls)
+    # The preloaded arguments are reused, without reading the file again
+    os.remove(args_json)
+    pars = load_task_args(args_json, lazy_zarr_urls=lazy_zarr_urls)
+    assert pars is preloaded
+    assert isinstance(pars["zarr_urls"], LazyZarrUrls) is lazy_zarr_urls
+    assert list(pars["zarr_urls"]) == ZARR_URLS
+    # ... only once
+    _write_args(tmp_path, "{}")
+    assert load_task_args(args_json, lazy_zarr_urls=lazy_zarr_urls) == {}
+
+
+def test_preloaded_task_args_other_path(tmp_path):
+    args_json = _write_args(tmp_path, json.dumps(dict(zarr_urls=["/a"])))
+    other_args_json = (tmp_path / "other.json").as_posix()
+    with open(other_args_json, "w") as f:
+        f.write(json.dumps(dict(zarr_urls=["/b", 1])))
+    preload_task_args(args_json)
+    assert load_task_args(other_args_json) == dict(zarr_urls=["/b", 1])
+    assert load_task_args(args_json) == dict(zarr_urls=["/a"])
@@ -0,0 +1,129 @@
+import logging
+
+import pytest
+
+from fractal_task_tools._log_filters import LogVolumeFilter
+from fractal_task_tools.task_wrapper import _run_task_unit
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(f"{record.levelname} {record.getMessage()}")
+
+
+@pytest.fixture
+def log_volume(request):
+    """
+    Logger whose handler has a `LogVolumeFilter`, with the parameters of
+    `request.param`.
+    """
+    logger = logging.getLogger(f"test_log_filters.{request.node.name}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = ListHandler()
+    log_filter = LogVolumeFilter(**request.param)
+    handler.addFilter(log_filter)
+    logger.addHandler(handler)
+    yield logger, handler, log_filter
+    logger.removeHandler(handler)
+
+
+def _log(logger: logging.Logger, created: float, msg: str, *args, **kwargs):
+    """
+    Log a record with a given creation time, from a single call site.
+    """
+    record = logger.makeRecord(
+        logger.name,
+        kwargs.get("level", logging.INFO),
+        __file__,
+        1,
+        msg,
+        args,
+        None,
+    )
+    record.created = created
+    logger.handle(record)
+
+
+@pytest.mark.parametrize(
+    "log_volume", [dict(dedup_window=10.0, rate_limit=None)], indirect=True
+)
+def test_dedup(log_volume):
+    logger, handler, log_filter = log_volume
+    for ind in range(5):
+        _log(logger, 100.0 + ind, "Processing chunk")
+    _log(logger, 105.0, "Processing chunk %d", 1)
+    assert handler.messages == ["INFO Processing chunk", "INFO Processing chunk 1"]
+
+    # The summary is emitted when the window is over
+    _log(logger, 111.0, "Processing chunk")
+    assert handler.messages[2:] == [
+        "INFO Processing chunk [repeated 4 more times in 4.0s]",
+        "INFO Processing chunk",
+    ]
+
+    # Pending summaries are emitted by `flush`
+    _log(logger, 112.0, "Processing chunk")
+    log_filter.flush()
+    log_filter.flush()
+    assert handler.messages[4:] == [
+        "INFO Processing chunk [repeated 1 more times in 1.0s]"
+    ]
+
+
+@pytest.mark.parametrize(
+    "log_volume", [dict(dedup_window=None, rate_limit=3)], indirect=True
+)
+def test_rate_limit(log_volume):
+    logger, handler, log_filter = log_volume
+    for ind in range(10):
+        _log(logger, 100.0 + ind / 10, "Chunk %d", ind)
+    # Errors are never dropped
+    _log(logger, 100.95, "Failure", level=logging.ERROR)
+    assert handler.messages == [
+        "INFO Chunk 0",
+        "INFO Chunk 1",
+        "INFO Chunk 2",
+        "ERROR Failure",
+    ]
+
+    # The summary is emitted in the next one-second window
+    _log(logger, 101.0, "Chunk %d", 10)
+    assert handler.messages[4:] == [
+        f"WARNING Dropped 7 records of the {logger.name} logger (rate limit: 3 "
+        "records per second).",
+        "INFO Chunk 10",
+    ]
+    log_filter.flush()
+    assert len(handler.messages) == 6
+
+
+def test_run_task_unit_flushes_summaries(tmp_path, monkeypatch, caplog):
+    def fake_task(zarr_url: str):
+        for _ in range(10):
+            logging.getLogger("my_task").info("Processing chunk")
+
+    log_filter = LogVolumeFilter(dedup_window=60.0, rate_limit=None)
+    monkeypatch.setattr(
+        "fractal_task_tools.logging_config._log_volume_filter", log_filter
+    )
+    args_json = tmp_path / "args.json"
+    args_json.write_text('{"zarr_url": "/zarr"}')
+    # NOTE: the handler of `caplog` is shared by all tests
+    caplog.handler.addFilter(log_filter)
+    try:
+        with caplog.at_level(logging.INFO, logger="my_task"):
+            _run_task_unit(
+                task_function=fake_task,
+                args_json=args_json.as_posix(),
+                out_json=(tmp_path / "out.json").as_posix(),
+            )
+    finally:
+        caplog.handler.removeFilter(log_filter)
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages.count("Processing chunk") == 1
+    assert any("[repeated 9 more times in" in message for message in messages)
@@ -1,6 +1,8 @@
 import json
 import logging
+import logging.handlers
 import shlex
+import signal
 import subprocess
 import sys
 from pathlib import Path
@@ -9,8 +11,14 @@ import pytest
 
 from fractal_task_tools.logging_config import DEFAULT_LOG_FORMAT
 from fractal_task_tools.logging_config import DEFAULT_LOG_LEVEL
+from fractal_task_tools.logging_config import flush_logging
+from fractal_task_tools.logging_config import get_log_dedup_window
+from fractal_task_tools.logging_config import get_log_handlers
+from fractal_task_tools.logging_config import get_log_rate_limit
+from fractal_task_tools.logging_config import get_logging_async
 from fractal_task_tools.logging_config import get_logging_format
 from fractal_task_tools.logging_config import get_logging_level
+from fractal_task_tools.logging_config import get_logging_levels
 from fractal_task_tools.logging_config import setup_logging_config
 
 
@@ -28,6 +36,18 @@ def test_get_logging_level(monkeypatch):
             assert get_logging_level() == levelname
 
 
+def test_get_logging_levels(monkeypatch):
+    assert get_logging_levels() == {}
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_LOG_LEVELS", "distributed=WARNING, zarr=ERROR,")
+        assert get_logging_levels() == dict(distributed="WARNING", zarr="ERROR")
+        for invalid in ("distributed", "=WARNING", "zarr=error", "zarr=INFO;a=B"):
+            mc.setenv("FRACTAL_TASK_LOG_LEVELS", invalid)
+            with pytest.raises(ValueError, match="Allowed values"):
+                get_logging_levels()
+
+
 def test_get_logging_format(monkeypatch):
     assert get_logging_format() == DEFAULT_LOG_FORMAT
 
@@ -41,6 +61,10 @@ def test_get_logging_format(monkeypatch):
         mc.setenv("FRACTAL_TASK_LOG_FORMAT", log_format)
         assert get_logging_format() == log_format
 
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_LOG_FORMAT", "json")
+        assert get_logging_format() == "json"
+
     invalid_log_format = r"custom - %(level)"
     with monkeypatch.context() as mc:
         mc.setenv("FRACTAL_TASK_LOG_FORMAT", invalid_log_format)
@@ -73,6 +97,212 @@ def test_setup_logging_config(monkeypatch):
         assert some_logger.parent == root_logger
 
 
+def test_setup_logging_config_per_logger_levels(monkeypatch):
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_LOG_LEVEL", "DEBUG")
+        mc.setenv("FRACTAL_TASK_LOG_LEVELS", "chatty=WARNING,chatty.io=ERROR")
+        setup_logging_config()
+        assert not logging.getLogger("chatty").isEnabledFor(logging.INFO)
+        assert logging.getLogger("chatty").isEnabledFor(logging.WARNING)
+        assert logging.getLogger("chatty.worker").getEffectiveLevel() == (
+            logging.WARNING
+        )
+        assert logging.getLogger("chatty.io").getEffectiveLevel() == logging.ERROR
+        assert logging.getLogger("my_task").isEnabledFor(logging.DEBUG)
+
+    # A new configuration resets the previous levels
+    setup_logging_config()
+    assert logging.getLogger("chatty").level == logging.NOTSET
+    assert logging.getLogger("chatty.io").level == logging.NOTSET
+
+
+def test_get_logging_async(monkeypatch):
+    assert get_logging_async() is False
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_LOG_ASYNC", "true")
+        assert get_logging_async() is True
+        mc.setenv("FRACTAL_TASK_LOG_ASYNC", "invalid")
+        with pytest.raises(ValueError, match="Allowed values"):
+            get_logging_async()
+
+
+def test_setup_logging_config_async(monkeypatch, capsys):
+    original_sigterm_handler = signal.getsignal(signal.SIGTERM)
+    root_logger = logging.getLogger("root")
+    original_handlers = root_logger.handlers[:]
+    original_level = root_logger.level
+    FRACTAL_TASK_LOG_FORMAT = r"xxx %(levelname)s %(message)s"
+    try:
+        with monkeypatch.context() as mc:
+            mc.setenv("FRACTAL_TASK_LOG_ASYNC", "true")
+            mc.setenv("FRACTAL_TASK_LOG_FORMAT", FRACTAL_TASK_LOG_FORMAT)
+            setup_logging_config()
+
+            # The root logger only has a queue handler, and the original
+            # handler is available through `get_log_handlers`
+            assert len(root_logger.handlers) == 1
+            assert isinstance(root_logger.handlers[0], logging.handlers.QueueHandler)
+            (handler,) = get_log_handlers()
+            assert isinstance(handler, logging.StreamHandler)
+            assert handler.formatter._fmt == FRACTAL_TASK_LOG_FORMAT
+
+            # Records are written by the listener thread
+            for ind in range(100):
+                logging.getLogger("my_task").warning(f"Message {ind}")
+            flush_logging()
+            err = capsys.readouterr().err
+            assert "xxx WARNING Message 0" in err
+            assert "xxx WARNING Message 99" in err
+
+        # A new configuration stops the listener
+        setup_logging_config()
+        assert not isinstance(root_logger.handlers[0], logging.handlers.QueueHandler)
+        assert get_log_handlers() == root_logger.handlers
+    finally:
+        signal.signal(signal.SIGTERM, original_sigterm_handler)
+        root_logger.handlers = original_handlers
+        root_logger.setLevel(original_level)
+
+
+def test_async_logging_flush_at_exit(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text(
+        "import logging, os, signal, sys\n"
+        "from fractal_task_tools.logging_config import setup_logging_config\n"
+        "setup_logging_config()\n"
+        "for ind in range(1000):\n"
+        "    logging.getLogger('my_task').info(f'Message {ind}')\n"
+        "if sys.argv[1] == 'sigterm':\n"
+        "    os.kill(os.getpid(), signal.SIGTERM)\n"
+        "elif sys.argv[1] == 'error':\n"
+        "    raise RuntimeError('Task failure')\n"
+    )
+    for mode, returncode in (
+        ("success", 0),
+        ("error", 1),
+        ("sigterm", -signal.SIGTERM),
+    ):
+        res = subprocess.run(
+            [sys.executable, script.as_posix(), mode],
+            capture_output=True,
+            encoding="utf-8",
+            env=dict(FRACTAL_TASK_LOG_ASYNC="true"),
+        )
+        assert res.returncode == returncode
+        assert "my_task; INFO; Message 999" in res.stderr
+
+
+def test_get_log_volume_limits(monkeypatch):
+    assert get_log_dedup_window() is None
+    assert get_log_rate_limit() is None
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_LOG_DEDUP_WINDOW", "2.5")
+        mc.setenv("FRACTAL_TASK_LOG_RATE_LIMIT", "100")
+        assert get_log_dedup_window() == 2.5
+        assert get_log_rate_limit() == 100
+        for invalid in ("nan", "inf", "-1"):
+            mc.setenv("FRACTAL_TASK_LOG_DEDUP_WINDOW", invalid)
+            with pytest.raises(ValueError, match="positive number of seconds"):
+                get_log_dedup_window()
+        for invalid in ("invalid", "0", "-1", "1.5"):
+            mc.setenv("FRACTAL_TASK_LOG_RATE_LIMIT", invalid)
+            with pytest.raises(ValueError, match="positive integer"):
+                get_log_rate_limit()
+
+
+@pytest.mark.parametrize("log_async", ["false", "true"])
+def test_log_volume_filter(tmp_path, log_async):
+    script = tmp_path / "script.py"
+    script.write_text(
+        "import logging\n"
+        "from fractal_task_tools.logging_config import setup_logging_config\n"
+        "setup_logging_config()\n"
+        "logger = logging.getLogger('my_task')\n"
+        "for ind in range(1000):\n"
+        "    logger.info('Processing chunk')\n"
+        "    logging.getLogger('chatty').info(f'Chunk {ind}')\n"
+    )
+    res = subprocess.run(
+        [sys.executable, script.as_posix()],
+        capture_output=True,
+        encoding="utf-8",
+        env=dict(
+            FRACTAL_TASK_LOG_DEDUP_WINDOW="60",
+            FRACTAL_TASK_LOG_RATE_LIMIT="10",
+            FRACTAL_TASK_LOG_ASYNC=log_async,
+        ),
+    )
+    assert res.returncode == 0
+    assert res.stderr.count("my_task; INFO; Processing chunk") == 2
+    assert "Processing chunk [repeated 999 more times in" in res.stderr
+    assert res.stderr.count("chatty; INFO; Chunk") <= 20
+    assert "Dropped" in res.stderr
+    assert "records per second" in res.stderr
+
+
+def test_log_volume_filter_with_watchdog(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text(
+        "import logging, time\n"
+        "from fractal_task_tools._progress import track_progress\n"
+        "from fractal_task_tools._watchdog import watch_stalls\n"
+        "from fractal_task_tools.logging_config import setup_logging_config\n"
+        "setup_logging_config()\n"
+        "with track_progress(out_json='out.json') as reporter:\n"
+        "    with watch_stalls(task_name='my_task', progress_reporter=reporter):\n"
+        "        for ind in range(200):\n"
+        "            time.sleep(0.01)\n"
+        "            logging.getLogger('my_task').info('Processing chunk')\n"
+    )
+    res = subprocess.run(
+        [sys.executable, script.as_posix()],
+        cwd=tmp_path,
+        capture_output=True,
+        encoding="utf-8",
+        env=dict(
+            FRACTAL_TASK_LOG_DEDUP_WINDOW="60",
+            FRACTAL_TASK_STALL_ABORT_TIMEOUT="30",
+        ),
+    )
+    assert res.returncode == 0
+    # The watchdog does not close the deduplication window
+    assert res.stderr.count("Processing chunk [repeated") == 1
+    assert "Processing chunk [repeated 199 more times in" in res.stderr
+
+
+def test_task_runner_json_logs(tmp_path):
+    task_path = Path(__file__).parent / "fake-task-for-logging/task1.py"
+    args_path = tmp_path / "args.json"
+    with args_path.open("w") as f:
+        json.dump(dict(zarr_urls=[], zarr_dir="/fake", arg=1), f)
+    for log_async in ("false", "true"):
+        res = subprocess.run(
+            [
+                sys.executable,
+                task_path.as_posix(),
+                "--args-json",
+                args_path.as_posix(),
+                "--out-json",
+                (tmp_path / f"out-{log_async}.json").as_posix(),
+            ],
+            capture_output=True,
+            encoding="utf-8",
+            env=dict(FRACTAL_TASK_LOG_FORMAT="json", FRACTAL_TASK_LOG_ASYNC=log_async),
+        )
+        assert res.returncode == 0
+        records = [json.loads(line) for line in res.stderr.splitlines()]
+        record = next(
+            record for record in records if record["message"] == "INFO from task"
+        )
+        assert record["logger"] == "task1"
+        assert record["level"] == "INFO"
+        assert record["task"] == "task1"
+        assert "unit_index" not in record
+        assert record["elapsed"] >= 0
+
+
 def test_task_runner_logging_config(monkeypatch, tmp_path):
     with monkeypatch.context() as mc:
         FRACTAL_TASK_LOG_LEVEL = "DEBUG"
@@ -104,6 +334,16 @@ def test_task_runner_logging_config(monkeypatch, tmp_path):
         assert "run_fractal_task; DEBUG; Logging level" in res.stderr
         assert "task1; DEBUG; DEBUG from task" in res.stderr
         assert "`logger_name` function argument is deprecated" in res.stderr
+        assert "run_fractal_task; INFO; Phase timings for" in res.stderr
+        for phase in (
+            "parse_cli",
+            "setup_logging",
+            "check_out_json",
+            "load_args",
+            "run_task",
+            "write_output",
+        ):
+            assert f"{phase}=" in res.stderr
 
         # Failed run, with env-variable-based logging configuration
         res = subprocess.run(
@@ -123,7 +363,8 @@ def test_task_runner_logging_config(monkeypatch, tmp_path):
             env=dict(FRACTAL_TASK_SKIP_LOG_CONFIG="set"),
         )
         assert res.returncode == 1
-        assert "ERROR:run_fractal_task:Output file" in res.stderr
+        assert "run_fractal_task; ERROR" not in res.stderr
+        assert "already exists" in res.stderr
 
         # Successful run, without logging configuration
         cmd2 = f"{sys.executable} {task2_path} {args2_option} {out2_option}"
@@ -132,4 +373,8 @@ def test_task_runner_logging_config(monkeypatch, tmp_path):
             capture_output=True,
             encoding="utf-8",
         )
-        assert "INFO:run_fractal_task:START" in res.stderr
+        # Importing `fractal_task_tools` does not configure logging, so that
+        # only the last-resort handler (for WARNING logs and above) is active
+        assert "START" not in res.stderr
+        assert "INFO from task" not in res.stderr
+        assert "WARNING from task" in res.stderr
@@ -0,0 +1,78 @@
+import logging
+import resource
+
+import pytest
+
+from fractal_task_tools._memory_limit import DEFAULT_MEMORY_LIMIT
+from fractal_task_tools._memory_limit import get_memory_limit
+from fractal_task_tools._memory_limit import limit_memory
+from fractal_task_tools.logging_config import WRAPPER_LOGGER_NAME
+
+
+def fake_task():
+    pass
+
+
+def _set_meta(monkeypatch, meta):
+    monkeypatch.setattr(
+        "fractal_task_tools._memory_limit.get_task_meta",
+        lambda task_function: meta,
+    )
+
+
+def test_get_memory_limit(monkeypatch):
+    assert get_memory_limit() == DEFAULT_MEMORY_LIMIT
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_MEMORY_LIMIT", "invalid")
+        with pytest.raises(ValueError, match="Allowed values"):
+            get_memory_limit()
+
+
+@pytest.mark.parametrize(
+    "memory_limit,rlimit",
+    [("data", resource.RLIMIT_DATA), ("as", resource.RLIMIT_AS)],
+)
+def test_limit_memory(memory_limit, rlimit, monkeypatch, caplog):
+    monkeypatch.setenv("FRACTAL_TASK_MEMORY_LIMIT", memory_limit)
+    _set_meta(monkeypatch, dict(cpus_per_task=1, mem="1T"))
+    original_limits = resource.getrlimit(rlimit)
+    with caplog.at_level(logging.INFO, logger=WRAPPER_LOGGER_NAME):
+        with limit_memory(task_function=fake_task):
+            soft, hard = resource.getrlimit(rlimit)
+            assert hard == original_limits[1]
+            if original_limits[0] == resource.RLIM_INFINITY:
+                assert soft == 1024**4
+    assert resource.getrlimit(rlimit) == original_limits
+    assert f"Set RLIMIT_{memory_limit.upper()} soft limit" in caplog.text
+
+
+def test_limit_memory_exceeded(monkeypatch, caplog):
+    monkeypatch.setenv("FRACTAL_TASK_MEMORY_LIMIT", "data")
+    _set_meta(monkeypatch, dict(mem=2000))
+    original_limits = resource.getrlimit(resource.RLIMIT_DATA)
+    with caplog.at_level(logging.INFO, logger=WRAPPER_LOGGER_NAME):
+        with pytest.raises(MemoryError):
+            with limit_memory(task_function=fake_task):
+                # NOTE: the allocation fails without touching the memory
+                bytearray(4 * 1024**3)
+    assert resource.getrlimit(resource.RLIMIT_DATA) == original_limits
+    assert "fake_task task exceeded its memory limit" in caplog.text
+    assert "RLIMIT_DATA=2000 MB" in caplog.text
+
+
+def test_limit_memory_disabled(monkeypatch, caplog):
+    _set_meta(monkeypatch, dict(mem=2000))
+    original_limits = resource.getrlimit(resource.RLIMIT_DATA)
+    with limit_memory(task_function=fake_task):
+        assert resource.getrlimit(resource.RLIMIT_DATA) == original_limits
+
+    # Missing or invalid `mem`
+    monkeypatch.setenv("FRACTAL_TASK_MEMORY_LIMIT", "data")
+    for meta in (None, dict(cpus_per_task=1), dict(mem="invalid")):
+        _set_meta(monkeypatch, meta)
+        caplog.clear()
+        with caplog.at_level(logging.WARNING, logger=WRAPPER_LOGGER_NAME):
+            with limit_memory(task_function=fake_task):
+                assert resource.getrlimit(resource.RLIMIT_DATA) == original_limits
+        assert "No memory limit is applied" in caplog.text
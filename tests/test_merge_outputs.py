@@ -0,0 +1,134 @@
+import gzip
+import json
+import sys
+
+import pytest
+
+from fractal_task_tools._merge_outputs import merge_task_outputs
+from fractal_task_tools._merge_outputs import read_task_output
+from fractal_task_tools._outputs_cli import _parse_arguments
+from fractal_task_tools._outputs_cli import main
+
+
+def _write(path, task_output):
+    with path.open("w") as f:
+        json.dump(task_output, f)
+    return path.as_posix()
+
+
+def test_merge_task_outputs(tmp_path):
+    paths = [
+        _write(
+            tmp_path / "0.json",
+            dict(
+                image_list_updates=[
+                    dict(zarr_url="/a", attributes=dict(well="A01"), types={}),
+                    dict(zarr_url="/b", attributes=dict(well="A02")),
+                ]
+            ),
+        ),
+        _write(tmp_path / "1.json", None),
+        _write(
+            tmp_path / "2.json",
+            dict(
+                image_list_updates=[
+                    dict(
+                        zarr_url="/a",
+                        attributes=dict(plate="p"),
+                        types=dict(is_3D=False),
+                        origin="/x",
+                    ),
+                    dict(zarr_url="/c"),
+                ],
+                image_list_removals=["/b", "/d"],
+            ),
+        ),
+    ]
+    with gzip.open(tmp_path / "3.json.gz", "wt") as f:
+        json.dump(dict(image_list_removals=["/d"]), f)
+    paths.append((tmp_path / "3.json.gz").as_posix())
+
+    out_json = tmp_path / "merged.json"
+    merge_task_outputs(iter(paths), out_json.as_posix(), max_workers=2)
+    assert read_task_output(out_json.as_posix()) == dict(
+        image_list_updates=[
+            dict(
+                zarr_url="/a",
+                attributes=dict(well="A01", plate="p"),
+                types=dict(is_3D=False),
+                origin="/x",
+            ),
+            dict(zarr_url="/c"),
+        ],
+        image_list_removals=["/b", "/d"],
+    )
+
+
+def test_merge_many_task_outputs(tmp_path):
+    paths = [
+        _write(
+            tmp_path / f"{ind}.json",
+            dict(image_list_updates=[dict(zarr_url=f"/zarr/{ind}")]),
+        )
+        for ind in range(100)
+    ]
+    out_json = tmp_path / "merged.json.gz"
+    merge_task_outputs(paths, out_json.as_posix(), max_workers=3)
+    assert read_task_output(out_json.as_posix()) == dict(
+        image_list_updates=[dict(zarr_url=f"/zarr/{ind}") for ind in range(100)],
+        image_list_removals=[],
+    )
+
+
+def test_read_task_output_invalid(tmp_path):
+    for task_output, match in [
+        ([], "not an object"),
+        (dict(other=1), "Invalid keys"),
+        (dict(image_list_updates=[dict(attributes={})]), "image_list_updates"),
+        (dict(image_list_removals=[1]), "image_list_removals"),
+    ]:
+        path = _write(tmp_path / "out.json", task_output)
+        with pytest.raises(ValueError, match=match):
+            read_task_output(path)
+
+    paths = [_write(tmp_path / "valid.json", None), (tmp_path / "missing").as_posix()]
+    with pytest.raises(FileNotFoundError):
+        merge_task_outputs(paths, (tmp_path / "merged.json").as_posix())
+    assert not (tmp_path / "merged.json").exists()
+
+
+def test_outputs_cli(tmp_path, monkeypatch):
+    with pytest.raises(SystemExit):
+        _parse_arguments(sys_argv=["xxx"])
+    with pytest.raises(SystemExit):
+        _parse_arguments(sys_argv=["xxx", "merge", "--out-json", "/out.json"])
+
+    paths = [
+        _write(
+            tmp_path / f"{ind}.json",
+            dict(image_list_updates=[dict(zarr_url=f"/zarr/{ind}")]),
+        )
+        for ind in range(3)
+    ]
+    files_from = tmp_path / "paths.txt"
+    files_from.write_text("\n".join(paths[1:]) + "\n")
+    out_json = tmp_path / "merged.json"
+    argv = [
+        "fractal-task-outputs",
+        "merge",
+        paths[0],
+        "--files-from",
+        files_from.as_posix(),
+        "--out-json",
+        out_json.as_posix(),
+    ]
+    monkeypatch.setattr(sys, "argv", argv)
+    main()
+    assert read_task_output(out_json.as_posix()) == dict(
+        image_list_updates=[dict(zarr_url=f"/zarr/{ind}") for ind in range(3)],
+        image_list_removals=[],
+    )
+
+    # The output file must not exist
+    with pytest.raises(SystemExit, match="already exists"):
+        main()
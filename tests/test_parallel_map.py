@@ -0,0 +1,105 @@
+import logging
+import os
+import time
+from functools import partial
+
+import pytest
+
+from fractal_task_tools._parallel_map import map_zarr_urls
+from fractal_task_tools.logging_config import WRAPPER_LOGGER_NAME
+
+
+def _process_image(zarr_url: str, suffix: str) -> dict | None:
+    """
+    Module-level per-image function, which can be sent to worker processes.
+    """
+    ind = int(zarr_url.split("/")[-1])
+    # Later images complete first
+    time.sleep(0.001 * (10 - ind))
+    if ind % 3 == 0:
+        return None
+    if ind % 4 == 0:
+        return dict(image_list_removals=[zarr_url])
+    return dict(image_list_updates=[dict(zarr_url=f"{zarr_url}{suffix}")])
+
+
+def _exit_on_image_5(zarr_url: str) -> dict:
+    ind = int(zarr_url.split("/")[-1])
+    if ind == 5:
+        os._exit(3)
+    time.sleep(0.01)
+    return dict(image_list_updates=[dict(zarr_url=zarr_url)])
+
+
+def _fail_on_odd_images(zarr_url: str) -> dict:
+    if int(zarr_url.split("/")[-1]) % 2 == 1:
+        raise ValueError(f"Cannot process {zarr_url}")
+    return dict(image_list_updates=[dict(zarr_url=zarr_url)])
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_map_zarr_urls(executor):
+    zarr_urls = [f"/zarr/{ind}" for ind in range(10)]
+    output = map_zarr_urls(
+        partial(_process_image, suffix="_new"),
+        zarr_urls,
+        executor=executor,
+        max_workers=4,
+    )
+    assert output == dict(
+        image_list_updates=[dict(zarr_url=f"/zarr/{ind}_new") for ind in (1, 2, 5, 7)],
+        image_list_removals=["/zarr/4", "/zarr/8"],
+    )
+
+
+def test_map_zarr_urls_failures(caplog):
+    zarr_urls = [f"/zarr/{ind}" for ind in range(30)]
+    with caplog.at_level(logging.INFO, logger=WRAPPER_LOGGER_NAME):
+        with pytest.raises(RuntimeError, match="15/30 images failed") as e:
+            map_zarr_urls(_fail_on_odd_images, zarr_urls, max_workers=2)
+    assert "/zarr/1: ValueError: Cannot process /zarr/1" in str(e.value)
+    assert "... (5 more failures)" in str(e.value)
+    assert "/zarr/29 failed" in caplog.text
+    assert "Map END (15/30 failed images)" in caplog.text
+
+    output = map_zarr_urls(
+        _fail_on_odd_images, zarr_urls, max_workers=2, allow_failures=True
+    )
+    assert output["image_list_updates"] == [
+        dict(zarr_url=f"/zarr/{ind}") for ind in range(0, 30, 2)
+    ]
+
+
+def test_map_zarr_urls_invalid():
+    with pytest.raises(ValueError, match="Allowed values"):
+        map_zarr_urls(_fail_on_odd_images, [], executor="invalid")
+
+    with pytest.raises(RuntimeError, match="must be a dictionary or None"):
+        map_zarr_urls(lambda zarr_url: [zarr_url], ["/zarr/0"])
+    with pytest.raises(RuntimeError, match="Invalid keys"):
+        map_zarr_urls(lambda zarr_url: dict(zarr_url=zarr_url), ["/zarr/0"])
+    with pytest.raises(RuntimeError, match="must be a list"):
+        map_zarr_urls(lambda zarr_url: dict(image_list_removals=zarr_url), ["/zarr/0"])
+
+    assert map_zarr_urls(_fail_on_odd_images, []) == dict(
+        image_list_updates=[], image_list_removals=[]
+    )
+
+
+def test_map_zarr_urls_process_dies(caplog):
+    zarr_urls = [f"/zarr/{ind}" for ind in range(20)]
+    with caplog.at_level(logging.INFO, logger=WRAPPER_LOGGER_NAME):
+        output = map_zarr_urls(
+            _exit_on_image_5,
+            zarr_urls,
+            executor="process",
+            max_workers=2,
+            allow_failures=True,
+        )
+    # Only the image whose process died fails
+    assert output["image_list_updates"] == [
+        dict(zarr_url=f"/zarr/{ind}") for ind in range(20) if ind != 5
+    ]
+    assert "A worker process died" in caplog.text
+    assert "/zarr/5 failed" in caplog.text
+    assert "Map END (1/20 failed images)" in caplog.text
@@ -0,0 +1,90 @@
+import json
+import logging
+import re
+import time
+
+import pytest
+
+from fractal_task_tools._phase_timing import DEFAULT_PHASE_TIMINGS
+from fractal_task_tools._phase_timing import PhaseTimer
+from fractal_task_tools._phase_timing import get_phase_timings
+from fractal_task_tools.logging_config import WRAPPER_LOGGER_NAME
+from fractal_task_tools.task_wrapper import _run_task_unit
+
+
+def test_get_phase_timings(monkeypatch):
+    assert get_phase_timings() == DEFAULT_PHASE_TIMINGS
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_PHASE_TIMINGS", "invalid")
+        with pytest.raises(ValueError, match="Allowed values"):
+            get_phase_timings()
+
+
+def test_phase_timer():
+    phase_timer = PhaseTimer()
+    with phase_timer.phase("first"):
+        time.sleep(0.01)
+    with pytest.raises(RuntimeError):
+        with phase_timer.phase("second"):
+            raise RuntimeError()
+    with phase_timer.phase("first"):
+        time.sleep(0.01)
+    assert list(phase_timer.durations) == ["first", "second"]
+    assert phase_timer.durations["first"] >= 0.02
+    assert phase_timer.durations["second"] >= 0.0
+
+
+def test_phase_timer_report(caplog, capsys, monkeypatch):
+    phase_timer = PhaseTimer()
+    with caplog.at_level(logging.INFO, logger=WRAPPER_LOGGER_NAME):
+        # Empty timers are not reported
+        phase_timer.report("my_task")
+        assert not caplog.records
+
+        with phase_timer.phase("load_args"):
+            pass
+        phase_timer.report("my_task")
+        assert "Phase timings for my_task task: load_args=" in caplog.text
+        assert capsys.readouterr().err == ""
+
+        monkeypatch.setenv("FRACTAL_TASK_PHASE_TIMINGS", "json")
+        phase_timer.report("my_task")
+        line = json.loads(capsys.readouterr().err)
+        assert line["event"] == "phase_timings"
+        assert line["task"] == "my_task"
+        assert list(line["durations"]) == ["load_args"]
+
+
+def test_run_task_unit_phase_timings(tmp_path, caplog):
+    def fake_task(zarr_url: str):
+        if zarr_url == "/fail":
+            raise ValueError("failure")
+        return dict(image_list_updates=[dict(zarr_url=zarr_url)])
+
+    for zarr_url, phases in (
+        ("/ok", "load_args=.*run_task=.*write_output="),
+        ("/fail", "load_args=.*run_task="),
+    ):
+        args_path = tmp_path / "args.json"
+        out_path = tmp_path / f"out{zarr_url.replace('/', '_')}.json"
+        with args_path.open("w") as f:
+            json.dump(dict(zarr_url=zarr_url), f)
+        caplog.clear()
+        with caplog.at_level(logging.INFO, logger=WRAPPER_LOGGER_NAME):
+            try:
+                _run_task_unit(
+                    task_function=fake_task,
+                    args_json=args_path.as_posix(),
+                    out_json=out_path.as_posix(),
+                )
+            except ValueError:
+                pass
+        messages = [
+            record.getMessage()
+            for record in caplog.records
+            if record.getMessage().startswith("Phase timings")
+        ]
+        assert len(messages) == 1
+        assert re.search(phases, messages[0])
+        assert ("write_output=" in messages[0]) is (zarr_url == "/ok")
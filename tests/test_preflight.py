@@ -0,0 +1,93 @@
+import json
+import subprocess
+import sys
+
+from fractal_task_tools._installed_manifest import MANIFEST_FILENAME
+
+TASK_MODULE = """
+if __name__ == "__main__":
+    from fractal_task_tools.task_wrapper import check_task_arguments
+
+    check_task_arguments()
+
+print("HEAVY IMPORTS")
+
+
+def my_task(zarr_url: str, level: int = 0):
+    return None
+
+
+if __name__ == "__main__":
+    from fractal_task_tools.task_wrapper import run_fractal_task
+
+    run_fractal_task(task_function=my_task)
+"""
+
+ARGS_SCHEMA = {
+    "additionalProperties": False,
+    "properties": {
+        "zarr_url": {"type": "string"},
+        "level": {"default": 0, "type": "integer", "minimum": 0},
+    },
+    "required": ["zarr_url"],
+    "type": "object",
+}
+
+
+def _run(tmp_path, args: dict, *, with_manifest: bool = True):
+    package_root = tmp_path / "my_package"
+    package_root.mkdir(exist_ok=True)
+    task_path = package_root / "my_task.py"
+    task_path.write_text(TASK_MODULE)
+    manifest_path = package_root / MANIFEST_FILENAME
+    manifest_path.unlink(missing_ok=True)
+    if with_manifest:
+        manifest = dict(
+            manifest_version="2",
+            task_list=[
+                dict(
+                    name="My task",
+                    executable_parallel="my_task.py",
+                    args_schema_parallel=ARGS_SCHEMA,
+                )
+            ],
+        )
+        manifest_path.write_text(json.dumps(manifest))
+    args_path = tmp_path / "args.json"
+    out_path = tmp_path / "out.json"
+    args_path.write_text(json.dumps(args))
+    out_path.unlink(missing_ok=True)
+    return subprocess.run(
+        [
+            sys.executable,
+            task_path.as_posix(),
+            "--args-json",
+            args_path.as_posix(),
+            "--out-json",
+            out_path.as_posix(),
+        ],
+        capture_output=True,
+        encoding="utf-8",
+    )
+
+
+def test_preflight_valid(tmp_path):
+    res = _run(tmp_path, dict(zarr_url="/a", level=1))
+    assert res.returncode == 0, res.stderr
+    assert "HEAVY IMPORTS" in res.stdout
+
+
+def test_preflight_invalid(tmp_path):
+    res = _run(tmp_path, dict(zarr_url="/a", level=-1, other=True))
+    assert res.returncode == 1
+    assert "HEAVY IMPORTS" not in res.stdout
+    assert "Invalid task arguments" in res.stderr
+    assert "/level: -1 violates minimum=0" in res.stderr
+    assert "unexpected property 'other'" in res.stderr
+
+
+def test_preflight_without_manifest(tmp_path):
+    # Without a manifest, invalid arguments only fail within the task
+    res = _run(tmp_path, dict(zarr_url="/a", level=-1), with_manifest=False)
+    assert res.returncode == 0, res.stderr
+    assert "HEAVY IMPORTS" in res.stdout
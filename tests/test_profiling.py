@@ -0,0 +1,73 @@
+import json
+import pstats
+import time
+
+import pytest
+
+from fractal_task_tools._profiling import DEFAULT_PROFILE_MODE
+from fractal_task_tools._profiling import get_profile_mode
+from fractal_task_tools.task_wrapper import _run_task_unit
+
+
+def test_get_profile_mode(monkeypatch):
+    assert get_profile_mode() == DEFAULT_PROFILE_MODE
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_PROFILE", "invalid-mode")
+        with pytest.raises(ValueError, match="Allowed values"):
+            get_profile_mode()
+
+
+def fake_task(zarr_url: str):
+    data = [list(range(1000)) for _ in range(100)]
+    time.sleep(0.1)
+    return dict(image_list_updates=[dict(zarr_url=zarr_url, size=len(data))])
+
+
+def _run(tmp_path) -> None:
+    args_path = tmp_path / "args.json"
+    with args_path.open("w") as f:
+        json.dump(dict(zarr_url="/a"), f)
+    _run_task_unit(
+        task_function=fake_task,
+        args_json=args_path.as_posix(),
+        out_json=(tmp_path / "out.json").as_posix(),
+    )
+    with (tmp_path / "out.json").open("r") as f:
+        assert json.load(f) == dict(image_list_updates=[dict(zarr_url="/a", size=100)])
+
+
+def test_profile_none(tmp_path):
+    _run(tmp_path)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "args.json",
+        "out.json",
+    ]
+
+
+def test_profile_cprofile(tmp_path, monkeypatch):
+    monkeypatch.setenv("FRACTAL_TASK_PROFILE", "cprofile")
+    _run(tmp_path)
+    stats = pstats.Stats((tmp_path / "out.prof").as_posix())
+    assert any(func[2] == "fake_task" for func in stats.stats)
+
+
+def test_profile_tracemalloc(tmp_path, monkeypatch):
+    monkeypatch.setenv("FRACTAL_TASK_PROFILE", "tracemalloc")
+    _run(tmp_path)
+    with (tmp_path / "out.tracemalloc.txt").open("r") as f:
+        lines = f.read().splitlines()
+    assert lines[0].startswith("Current traced memory:")
+    assert lines[1].startswith("Peak traced memory:")
+    assert len(lines) > 3
+
+
+def test_profile_sample(tmp_path, monkeypatch):
+    monkeypatch.setenv("FRACTAL_TASK_PROFILE", "sample")
+    _run(tmp_path)
+    with (tmp_path / "out.sample.txt").open("r") as f:
+        lines = f.read().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert stack.split(";")[-1].startswith("fake_task ")
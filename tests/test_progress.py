@@ -0,0 +1,110 @@
+import json
+import logging
+import time
+
+import pytest
+
+from fractal_task_tools._progress import DEFAULT_HEARTBEAT_INTERVAL
+from fractal_task_tools._progress import ProgressReporter
+from fractal_task_tools._progress import get_heartbeat_interval
+from fractal_task_tools._progress import report_progress
+from fractal_task_tools._progress import track_progress
+from fractal_task_tools.logging_config import WRAPPER_LOGGER_NAME
+from fractal_task_tools.task_wrapper import _run_task_unit
+
+
+def test_get_heartbeat_interval(monkeypatch):
+    assert get_heartbeat_interval() == DEFAULT_HEARTBEAT_INTERVAL
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_HEARTBEAT_INTERVAL", "0.5")
+        assert get_heartbeat_interval() == 0.5
+        for invalid in ("invalid", "0", "-1", "nan", "inf"):
+            mc.setenv("FRACTAL_TASK_HEARTBEAT_INTERVAL", invalid)
+            with pytest.raises(ValueError, match="positive number of seconds"):
+                get_heartbeat_interval()
+
+
+def test_progress_reporter(tmp_path):
+    out_json = (tmp_path / "out.json.gz").as_posix()
+    reporter = ProgressReporter(out_json=out_json, interval=3600)
+    assert reporter.path == (tmp_path / "out.heartbeat.json").as_posix()
+
+    # The first report is written, and the following ones are rate-limited
+    reporter.report(1, 10, dict(well="A01"))
+    with open(reporter.path) as f:
+        heartbeat = json.load(f)
+    assert heartbeat["done"] == 1
+    assert heartbeat["total"] == 10
+    assert heartbeat["fraction"] == 0.1
+    assert heartbeat["extra"] == dict(well="A01")
+    for done in range(2, 6):
+        reporter.report(done, 10, {})
+    with open(reporter.path) as f:
+        assert json.load(f)["done"] == 1
+
+    # Pending reports are written by `flush`
+    reporter.flush()
+    with open(reporter.path) as f:
+        heartbeat = json.load(f)
+    assert heartbeat["done"] == 5
+    assert heartbeat["rate"] > 0
+    assert heartbeat["eta"] >= 0
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_progress_reporter_unknown_total(tmp_path):
+    reporter = ProgressReporter(out_json=(tmp_path / "out.json").as_posix(), interval=0)
+    reporter.report(3, None, dict(path=tmp_path))
+    with open(reporter.path) as f:
+        heartbeat = json.load(f)
+    assert heartbeat["fraction"] is None
+    assert heartbeat["eta"] is None
+    assert heartbeat["extra"] == dict(path=tmp_path.as_posix())
+
+
+def test_progress_reporter_write_failure(tmp_path, caplog):
+    out_json = (tmp_path / "missing" / "out.json").as_posix()
+    reporter = ProgressReporter(out_json=out_json, interval=0)
+    with caplog.at_level(logging.WARNING, logger=WRAPPER_LOGGER_NAME):
+        reporter.report(1, 2, {})
+    assert "Could not write heartbeat file" in caplog.text
+
+
+def test_report_progress(tmp_path):
+    out_json = (tmp_path / "out.json").as_posix()
+    heartbeat_path = tmp_path / "out.heartbeat.json"
+
+    # No effect outside of task units
+    report_progress(1, 2)
+    assert not heartbeat_path.exists()
+
+    with track_progress(out_json=out_json):
+        report_progress(1, 2)
+        assert heartbeat_path.exists()
+        report_progress(2, 2)
+    with heartbeat_path.open() as f:
+        assert json.load(f)["done"] == 2
+
+
+def test_run_task_unit_report_progress(tmp_path, monkeypatch):
+    monkeypatch.setenv("FRACTAL_TASK_HEARTBEAT_INTERVAL", "0.01")
+    heartbeats = []
+
+    def fake_task(zarr_urls: list[str], zarr_dir: str):
+        for ind, zarr_url in enumerate(zarr_urls, start=1):
+            time.sleep(0.02)
+            report_progress(ind, len(zarr_urls), last=zarr_url)
+            with (tmp_path / "out.heartbeat.json").open() as f:
+                heartbeats.append(json.load(f))
+
+    args_path = tmp_path / "args.json"
+    with args_path.open("w") as f:
+        json.dump(dict(zarr_urls=["/a", "/b", "/c"], zarr_dir="/zarr"), f)
+    _run_task_unit(
+        task_function=fake_task,
+        args_json=args_path.as_posix(),
+        out_json=(tmp_path / "out.json").as_posix(),
+    )
+    assert [heartbeat["done"] for heartbeat in heartbeats] == [1, 2, 3]
+    assert heartbeats[-1]["extra"] == dict(last="/c")
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from fractal_task_tools._resource_usage import DEFAULT_RESOURCE_REPORT
+from fractal_task_tools._resource_usage import ResourceUsage
+from fractal_task_tools._resource_usage import compare_with_meta
+from fractal_task_tools._resource_usage import get_resource_report
+from fractal_task_tools._resource_usage import parse_mem
+from fractal_task_tools.task_wrapper import _run_task_unit
+
+
+def test_get_resource_report(monkeypatch):
+    assert get_resource_report() is (DEFAULT_RESOURCE_REPORT == "true")
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_RESOURCE_REPORT", "yes")
+        with pytest.raises(ValueError, match="Allowed values"):
+            get_resource_report()
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_RESOURCE_REPORT", "true")
+        assert get_resource_report() is True
+
+
+@pytest.mark.parametrize(
+    "mem,expected",
+    [
+        (4000, 4000.0),
+        (0.5, 0.5),
+        ("4000", 4000.0),
+        ("4G", 4096.0),
+        ("4gb", 4096.0),
+        ("512M", 512.0),
+        ("1T", 1024.0**2),
+        ("1024K", 1.0),
+        ("lots", None),
+        ("", None),
+        (None, None),
+        (True, None),
+    ],
+)
+def test_parse_mem(mem, expected):
+    assert parse_mem(mem) == expected
+
+
+def test_compare_with_meta():
+    usage = dict(wall_time=10.0, user_time=15.0, system_time=5.0, peak_rss=1000.0)
+    assert compare_with_meta(usage, dict(cpus_per_task=4, mem="2G")) == dict(
+        cpus_per_task=4,
+        cpu_usage_fraction=0.5,
+        mem=2048.0,
+        mem_usage_fraction=1000.0 / 2048.0,
+    )
+    assert compare_with_meta(usage, dict(needs_gpu=True)) == {}
+
+
+def test_resource_usage():
+    usage = ResourceUsage()
+    data = bytearray(50 * 1024**2)
+    data[::4096] = b"x" * len(data[::4096])
+    result = usage.get()
+    assert result["wall_time"] >= 0
+    assert result["user_time"] + result["system_time"] >= 0
+    assert result["peak_rss"] >= 50
+    assert set(result) >= {
+        "voluntary_context_switches",
+        "involuntary_context_switches",
+        "bytes_read",
+        "bytes_written",
+    }
+
+
+def test_run_task_unit_resource_report(tmp_path, monkeypatch):
+    monkeypatch.setenv("FRACTAL_TASK_RESOURCE_REPORT", "true")
+
+    def fake_task(zarr_url: str):
+        if zarr_url == "/fail":
+            raise ValueError("failure")
+        return dict(image_list_updates=[dict(zarr_url=zarr_url)])
+
+    for zarr_url, success in (("/ok", True), ("/fail", False)):
+        name = zarr_url.strip("/")
+        args_path = tmp_path / f"args_{name}.json"
+        out_path = tmp_path / f"out_{name}.json"
+        with args_path.open("w") as f:
+            json.dump(dict(zarr_url=zarr_url), f)
+        try:
+            _run_task_unit(
+                task_function=fake_task,
+                args_json=args_path.as_posix(),
+                out_json=out_path.as_posix(),
+            )
+        except ValueError:
+            pass
+        with (tmp_path / f"out_{name}.resources.json").open("r") as f:
+            report = json.load(f)
+        assert report["task"] == "fake_task"
+        assert report["success"] is success
+        assert report["usage"]["peak_rss"] > 0
+        # The test module is not part of a package with a manifest
+        assert report["meta"] is None
+        assert "comparison" not in report
@@ -0,0 +1,117 @@
+import json
+import logging
+import os
+
+from fractal_task_tools._lazy_zarr_urls import LazyZarrUrls
+from fractal_task_tools._lazy_zarr_urls import load_task_args_with_lazy_zarr_urls
+from fractal_task_tools._result_cache import get_result_cache_key
+from fractal_task_tools.logging_config import WRAPPER_LOGGER_NAME
+from fractal_task_tools.task_wrapper import _run_task_unit
+
+CALLS = []
+
+
+def fake_task(zarr_url: str, level: int = 0):
+    CALLS.append(zarr_url)
+    return dict(image_list_updates=[dict(zarr_url=zarr_url, level=level)])
+
+
+def _zattrs_input(pars: dict) -> list[str]:
+    return [f"{pars['zarr_url']}/.zattrs"]
+
+
+def _run(tmp_path, name: str, pars: dict, out_suffix: str = ".json") -> dict:
+    args_path = tmp_path / f"args_{name}.json"
+    out_path = tmp_path / f"out_{name}{out_suffix}"
+    with args_path.open("w") as f:
+        json.dump(pars, f)
+    _run_task_unit(
+        task_function=fake_task,
+        args_json=args_path.as_posix(),
+        out_json=out_path.as_posix(),
+        result_cache_inputs=_zattrs_input,
+    )
+    return out_path.read_bytes()
+
+
+def test_result_cache_disabled(tmp_path):
+    CALLS.clear()
+    zarr_url = (tmp_path / "image.zarr").as_posix()
+    _run(tmp_path, "1", dict(zarr_url=zarr_url))
+    _run(tmp_path, "2", dict(zarr_url=zarr_url))
+    assert CALLS == [zarr_url, zarr_url]
+
+
+def test_result_cache(tmp_path, monkeypatch, caplog):
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv("FRACTAL_TASK_RESULT_CACHE_DIR", cache_dir.as_posix())
+    image = tmp_path / "image.zarr"
+    image.mkdir()
+    zattrs = image / ".zattrs"
+    zattrs.write_text("{}")
+    zarr_url = image.as_posix()
+    CALLS.clear()
+
+    # Miss, and then hit (with a different key order)
+    output_1 = _run(tmp_path, "1", dict(zarr_url=zarr_url, level=0))
+    with caplog.at_level(logging.INFO, logger=WRAPPER_LOGGER_NAME):
+        output_2 = _run(tmp_path, "2", dict(level=0, zarr_url=zarr_url))
+    assert output_1 == output_2
+    assert CALLS == [zarr_url]
+    assert "Restored cached task output" in caplog.text
+    assert len(list(cache_dir.glob("*/*.json"))) == 1
+
+    # Different arguments
+    _run(tmp_path, "3", dict(zarr_url=zarr_url, level=1))
+    assert len(CALLS) == 2
+
+    # Modified input
+    stat = os.stat(zattrs)
+    os.utime(zattrs, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    _run(tmp_path, "4", dict(zarr_url=zarr_url, level=0))
+    assert len(CALLS) == 3
+    _run(tmp_path, "5", dict(zarr_url=zarr_url, level=0))
+    assert len(CALLS) == 3
+
+    # Compressed outputs are stored separately
+    _run(tmp_path, "6", dict(zarr_url=zarr_url), out_suffix=".json.gz")
+    assert len(CALLS) == 4
+    assert len(list(cache_dir.glob("*/*.json.gz"))) == 1
+
+
+def test_result_cache_failures(tmp_path, monkeypatch, caplog):
+    not_a_folder = tmp_path / "file"
+    not_a_folder.touch()
+    monkeypatch.setenv("FRACTAL_TASK_RESULT_CACHE_DIR", not_a_folder.as_posix())
+    CALLS.clear()
+    zarr_url = (tmp_path / "image.zarr").as_posix()
+    with caplog.at_level(logging.WARNING, logger=WRAPPER_LOGGER_NAME):
+        _run(tmp_path, "1", dict(zarr_url=zarr_url))
+    assert "Could not store task output in cache" in caplog.text
+    _run(tmp_path, "2", dict(zarr_url=zarr_url))
+    assert len(CALLS) == 2
+
+
+def test_result_cache_key_lazy_zarr_urls(tmp_path, monkeypatch):
+    def _get_key(name: str, pars: dict) -> str:
+        args_path = tmp_path / f"{name}.json"
+        with args_path.open("w") as f:
+            json.dump(pars, f)
+        lazy_pars = load_task_args_with_lazy_zarr_urls(args_path.as_posix())
+        return get_result_cache_key(task_function=fake_task, pars=lazy_pars, inputs=[])
+
+    # The raw array is hashed, without decoding its items
+    monkeypatch.setattr(LazyZarrUrls, "__iter__", None)
+    monkeypatch.setattr(LazyZarrUrls, "__getitem__", None)
+    pars = dict(zarr_urls=["/a", "/b"], zarr_dir="/zarr")
+    keys = [
+        _get_key(name, value)
+        for name, value in (
+            ("same_1", pars),
+            ("same_2", pars),
+            ("other_urls", dict(pars, zarr_urls=["/a", "/c"])),
+            ("other_dir", dict(pars, zarr_dir="/other")),
+        )
+    ]
+    assert keys[0] == keys[1]
+    assert len(set(keys)) == 3
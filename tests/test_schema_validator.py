@@ -0,0 +1,158 @@
+from enum import Enum
+from typing import Literal
+from typing import Optional
+
+import jsonschema
+import pytest
+from pydantic import BaseModel
+from pydantic import Field
+from pydantic import validate_call
+
+from fractal_task_tools._args_schemas import create_schema_for_single_task
+from fractal_task_tools._schema_validator import get_validator
+
+
+class Color(Enum):
+    RED = "red"
+    BLUE = "blue"
+
+
+class Channel(BaseModel):
+    """
+    Channel.
+
+    Attributes:
+        label: Label.
+        wavelength_id: Wavelength ID.
+        window: Window.
+    """
+
+    label: str = Field(min_length=1)
+    wavelength_id: Optional[str] = None
+    window: tuple[int, int] = (0, 255)
+
+
+class Node(BaseModel):
+    """
+    Recursive model.
+
+    Attributes:
+        name: Name.
+        children: Children.
+    """
+
+    name: str
+    children: list["Node"] = Field(default_factory=list)
+
+
+@validate_call
+def task_function(
+    zarr_url: str,
+    level: int = Field(default=0, ge=0, le=5),
+    factor: float = 1.0,
+    color: Color = Color.RED,
+    mode: Literal["fast", "slow"] = "fast",
+    channels: list[Channel] = Field(default_factory=list),
+    tree: Optional[Node] = None,
+    overwrite: bool = False,
+    mapping: dict[str, int] = Field(default_factory=dict),
+    name: str = Field(default="abc", pattern="^[a-z]+$"),
+):
+    """
+    Task function.
+
+    Args:
+        zarr_url: Zarr URL.
+        level: Level.
+        factor: Factor.
+        color: Color.
+        mode: Mode.
+        channels: Channels.
+        tree: Tree.
+        overwrite: Overwrite.
+        mapping: Mapping.
+        name: Name.
+    """
+
+
+SCHEMA = create_schema_for_single_task(
+    task_function=task_function,
+    executable=__file__,
+    package=None,
+)
+
+INSTANCES = [
+    dict(zarr_url="/a"),
+    dict(zarr_url="/a", level=3, factor=2, color="blue", mode="slow"),
+    dict(zarr_url="/a", level=2.0),
+    dict(zarr_url="/a", overwrite=True, mapping=dict(x=1, y=2), name="xyz"),
+    dict(zarr_url="/a", channels=[dict(label="DAPI", window=[0, 100])]),
+    dict(zarr_url="/a", tree=dict(name="root", children=[dict(name="leaf")])),
+    dict(zarr_url="/a", tree=None),
+    # Invalid
+    dict(),
+    dict(zarr_url=1),
+    dict(zarr_url="/a", level=-1),
+    dict(zarr_url="/a", level=6),
+    dict(zarr_url="/a", level=1.5),
+    dict(zarr_url="/a", level=True),
+    dict(zarr_url="/a", factor="1.0"),
+    dict(zarr_url="/a", color="green"),
+    dict(zarr_url="/a", mode="medium"),
+    dict(zarr_url="/a", channels=[dict(label="")]),
+    dict(zarr_url="/a", channels=[dict(wavelength_id="A01")]),
+    dict(zarr_url="/a", channels=[dict(label="DAPI", window=[0, "x"])]),
+    dict(zarr_url="/a", tree=dict(name="root", children=[dict(nome="leaf")])),
+    dict(zarr_url="/a", overwrite="true"),
+    dict(zarr_url="/a", mapping=dict(x="1")),
+    dict(zarr_url="/a", name="ABC"),
+    dict(zarr_url="/a", unexpected=1),
+    [],
+]
+
+
+@pytest.mark.parametrize("instance", INSTANCES)
+def test_validator_matches_jsonschema(instance):
+    validate = get_validator(SCHEMA)
+    errors = validate(instance)
+    expected_valid = jsonschema.Draft202012Validator(SCHEMA).is_valid(instance)
+    assert (not errors) is expected_valid, errors
+    assert all(isinstance(error, str) for error in errors)
+
+
+@pytest.mark.parametrize(
+    "schema,valid,invalid",
+    [
+        (True, [1, None], []),
+        ({"const": 1}, [1, 1.0], [True, "1"]),
+        ({"enum": [False, "a"]}, [False, "a"], [0, "b"]),
+        ({"exclusiveMinimum": 0, "exclusiveMaximum": 1}, [0.5, "x"], [0, 1]),
+        ({"minItems": 1, "maxItems": 2}, [[1], [1, 2]], [[], [1, 2, 3]]),
+        ({"additionalProperties": {"type": "integer"}}, [{"a": 1}], [{"a": "b"}]),
+        ({"oneOf": [{"type": "integer"}, {"type": "null"}]}, [1, None], ["a"]),
+        ({"$ref": "https://example.org/schema.json"}, [1, "a"], []),
+        ({"format": "email", "type": "string"}, ["not-an-email"], [1]),
+        # Unsupported keywords are ignored
+        ({"type": ["string", "null"]}, [1], []),
+        ({"allOf": [{"minimum": 0}]}, [-1], []),
+        ({"items": False}, [[1]], []),
+        ({"properties": {'a"{b}': {"type": "integer"}}}, [{'a"{b}': 1}], []),
+    ],
+)
+def test_validator_keywords(schema, valid, invalid):
+    validate = get_validator(schema)
+    for instance in valid:
+        assert validate(instance) == []
+    for instance in invalid:
+        assert validate(instance)
+
+
+def test_validator_leaves_no_files(tmp_path, monkeypatch):
+    # Validators are never loaded from (or written to) a shared cache
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HOME", tmp_path.as_posix())
+    monkeypatch.setenv("XDG_CACHE_HOME", tmp_path.as_posix())
+    validate = get_validator(SCHEMA)
+    assert validate(dict(zarr_url="/a")) == []
+    assert validate(dict()) != []
+    assert list(tmp_path.iterdir()) == []
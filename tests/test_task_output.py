@@ -0,0 +1,121 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from fractal_task_tools._task_output import DEFAULT_OUTPUT_COMPACT_THRESHOLD
+from fractal_task_tools._task_output import DEFAULT_OUTPUT_FORMAT
+from fractal_task_tools._task_output import get_output_compact_threshold
+from fractal_task_tools._task_output import get_output_format
+from fractal_task_tools._task_output import write_streaming_task_output
+from fractal_task_tools._task_output import write_task_output
+
+
+def test_get_output_format(monkeypatch):
+    assert get_output_format() == DEFAULT_OUTPUT_FORMAT
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_OUTPUT_FORMAT", "invalid-format")
+        with pytest.raises(ValueError, match="Allowed values"):
+            get_output_format()
+
+    for output_format in ["indent", "compact", "auto"]:
+        with monkeypatch.context() as mc:
+            mc.setenv("FRACTAL_TASK_OUTPUT_FORMAT", output_format)
+            assert get_output_format() == output_format
+
+
+def test_get_output_compact_threshold(monkeypatch):
+    assert get_output_compact_threshold() == DEFAULT_OUTPUT_COMPACT_THRESHOLD
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_OUTPUT_COMPACT_THRESHOLD", "1000")
+        assert get_output_compact_threshold() == 1000
+
+    with monkeypatch.context() as mc:
+        for invalid in ("1MB", "0", "-1", "1.5"):
+            mc.setenv("FRACTAL_TASK_OUTPUT_COMPACT_THRESHOLD", invalid)
+            with pytest.raises(ValueError, match="positive integer of bytes"):
+                get_output_compact_threshold()
+
+
+def test_write_task_output(tmp_path, monkeypatch):
+    out_path = tmp_path / "out.json"
+    task_output = dict(path=Path("/something"), value=1)
+
+    # Default (`auto` format, small output)
+    write_task_output(task_output, out_path.as_posix())
+    assert out_path.read_text() == '{\n  "path": "/something",\n  "value": 1\n}'
+
+    # Compact format
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_OUTPUT_FORMAT", "compact")
+        write_task_output(task_output, out_path.as_posix())
+    assert out_path.read_text() == '{"path":"/something","value":1}'
+
+    # `auto` format, large output
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_OUTPUT_COMPACT_THRESHOLD", "10")
+        write_task_output(task_output, out_path.as_posix())
+    assert out_path.read_text() == '{"path":"/something","value":1}'
+
+    # Indent format
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_OUTPUT_FORMAT", "indent")
+        mc.setenv("FRACTAL_TASK_OUTPUT_COMPACT_THRESHOLD", "10")
+        write_task_output(task_output, out_path.as_posix())
+    assert out_path.read_text() == '{\n  "path": "/something",\n  "value": 1\n}'
+
+
+@pytest.mark.parametrize("output_format", ["indent", "compact", "auto"])
+def test_write_streaming_task_output(tmp_path, monkeypatch, output_format):
+    monkeypatch.setenv("FRACTAL_TASK_OUTPUT_FORMAT", output_format)
+
+    def generate_items():
+        for ind in range(3):
+            yield dict(zarr_url=f"/zarr/{ind}", attributes=dict(path=Path("/x")))
+            yield f"/zarr/old-{ind}"
+
+    out_path = (tmp_path / "out.json").as_posix()
+    write_streaming_task_output(generate_items(), out_path)
+    with open(out_path) as f:
+        task_output = json.load(f)
+    assert task_output == dict(
+        image_list_updates=[
+            dict(zarr_url=f"/zarr/{ind}", attributes=dict(path="/x"))
+            for ind in range(3)
+        ],
+        image_list_removals=[f"/zarr/old-{ind}" for ind in range(3)],
+    )
+    with open(out_path) as f:
+        num_lines = len(f.readlines())
+    assert (num_lines == 1) == (output_format != "indent")
+
+    # Empty output
+    write_streaming_task_output(iter([]), out_path)
+    with open(out_path) as f:
+        task_output = json.load(f)
+    assert task_output == dict(image_list_updates=[], image_list_removals=[])
+
+    # Invalid items
+    with pytest.raises(TypeError, match="not int"):
+        write_streaming_task_output(iter([1]), out_path)
+
+
+@pytest.mark.parametrize("out_name", ["out.json", "out.json.gz"])
+def test_write_streaming_task_output_failure(tmp_path, out_name):
+    def generate_items(fail: bool):
+        yield dict(zarr_url="/a")
+        if fail:
+            raise ValueError("Task failure")
+        yield dict(zarr_url="/b")
+
+    # A failing generator leaves no (truncated) output file
+    out_path = (tmp_path / out_name).as_posix()
+    with pytest.raises(ValueError, match="Task failure"):
+        write_streaming_task_output(generate_items(fail=True), out_path)
+    assert list(tmp_path.iterdir()) == []
+
+    # The same output can be written again (e.g. when a job is retried)
+    write_streaming_task_output(generate_items(fail=False), out_path)
+    assert [path.name for path in tmp_path.iterdir()] == [out_name]
@@ -1,5 +1,4 @@
 import json
-from datetime import datetime
 from pathlib import Path
 
 import pytest
@@ -7,6 +6,7 @@ from pydantic import ValidationError
 from pydantic import validate_call
 
 from fractal_task_tools.task_wrapper import _check_deprecated_argument
+from fractal_task_tools.task_wrapper import _run_task_unit
 from fractal_task_tools.task_wrapper import run_fractal_task
 
 TASK_OUTPUT = {
@@ -27,7 +27,7 @@ def fake_task(zarr_url: str, parameter: float):
 
 @validate_call
 def fake_task_invalid_output(zarr_url: str, parameter: float):
-    return dict(non_json_serializable=datetime.now())
+    return dict(non_json_serializable={1, 2})
 
 
 def test_run_fractal_task(tmp_path, monkeypatch):
@@ -44,6 +44,14 @@ def test_run_fractal_task(tmp_path, monkeypatch):
                 def __init__(self):
                     self.args_json = str(ARGS_PATH)
                     self.out_json = str(METADIFF_PATH)
+                    self.worker = False
+                    self.fork_server = False
+                    self.fork_server_max_children = None
+                    self.worker_socket = None
+                    self.worker_max_jobs = None
+                    self.worker_max_rss_growth = None
+                    self.args_json_batch = None
+                    self.batch_max_workers = None
 
             return Args()
 
@@ -72,12 +80,13 @@ def test_run_fractal_task(tmp_path, monkeypatch):
     METADIFF_PATH.unlink()
     with pytest.raises(
         TypeError,
-        match="datetime is not JSON serializable",
+        match="set is not JSON serializable",
     ):
         run_fractal_task(task_function=fake_task_invalid_output)
+    # Output is encoded before opening the output file
+    assert not METADIFF_PATH.exists()
 
     # Failure (invalid input)
-    METADIFF_PATH.unlink()
     args = dict(zarr_url="/somewhere", parameter=None)
     with ARGS_PATH.open("w") as f:
         json.dump(args, f, indent=2)
@@ -93,3 +102,48 @@ def test_check_deprecated_argument(caplog):
     caplog.clear()
     _check_deprecated_argument(logger_name="something")
     assert "`logger_name` function argument is deprecated" in caplog.text
+
+
+def test_run_task_unit_generator(tmp_path):
+    def fake_generator_task(zarr_urls: list[str], zarr_dir: str):
+        for zarr_url in zarr_urls:
+            yield dict(zarr_url=zarr_url, attributes=dict(well="A01"))
+        yield "/removed"
+
+    args_path = tmp_path / "args.json"
+    out_path = tmp_path / "out.json"
+    with args_path.open("w") as f:
+        json.dump(dict(zarr_urls=["/a", "/b"], zarr_dir="/zarr"), f)
+    _run_task_unit(
+        task_function=fake_generator_task,
+        args_json=args_path.as_posix(),
+        out_json=out_path.as_posix(),
+    )
+    with out_path.open("r") as f:
+        task_output = json.load(f)
+    assert task_output == dict(
+        image_list_updates=[
+            dict(zarr_url="/a", attributes=dict(well="A01")),
+            dict(zarr_url="/b", attributes=dict(well="A01")),
+        ],
+        image_list_removals=["/removed"],
+    )
+
+
+def test_run_task_unit_lazy_zarr_urls(tmp_path):
+    def fake_task(zarr_urls, zarr_dir: str):
+        assert not isinstance(zarr_urls, list)
+        return dict(num_zarr_urls=len(zarr_urls), last=zarr_urls[-1])
+
+    args_path = tmp_path / "args.json"
+    out_path = tmp_path / "out.json"
+    with args_path.open("w") as f:
+        json.dump(dict(zarr_urls=["/a", "/b"], zarr_dir="/zarr"), f)
+    _run_task_unit(
+        task_function=fake_task,
+        args_json=args_path.as_posix(),
+        out_json=out_path.as_posix(),
+        lazy_zarr_urls=True,
+    )
+    with out_path.open("r") as f:
+        assert json.load(f) == dict(num_zarr_urls=2, last="/b")
@@ -0,0 +1,191 @@
+import json
+import logging
+import subprocess
+import sys
+import time
+
+import pytest
+
+from fractal_task_tools import _watchdog
+from fractal_task_tools._progress import track_progress
+from fractal_task_tools._watchdog import get_stall_abort_timeout
+from fractal_task_tools._watchdog import get_stall_timeout
+from fractal_task_tools._watchdog import watch_stalls
+
+
+def test_get_stall_timeouts(monkeypatch):
+    assert get_stall_timeout() is None
+    assert get_stall_abort_timeout() is None
+
+    with monkeypatch.context() as mc:
+        mc.setenv("FRACTAL_TASK_STALL_TIMEOUT", "1.5")
+        mc.setenv("FRACTAL_TASK_STALL_ABORT_TIMEOUT", "60")
+        assert get_stall_timeout() == 1.5
+        assert get_stall_abort_timeout() == 60.0
+        for invalid in ("invalid", "0", "-1"):
+            mc.setenv("FRACTAL_TASK_STALL_TIMEOUT", invalid)
+            with pytest.raises(ValueError, match="positive number of seconds"):
+                get_stall_timeout()
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """
+    Log file of the root logger, which `faulthandler` can write to.
+    """
+    path = tmp_path / "unit.log"
+    root_logger = logging.getLogger()
+    handler = logging.FileHandler(path)
+    # NOTE: this must be the first handler, since pytest also adds its own
+    root_logger.handlers.insert(0, handler)
+    previous_level = root_logger.level
+    root_logger.setLevel(logging.INFO)
+    yield path
+    root_logger.removeHandler(handler)
+    root_logger.setLevel(previous_level)
+    handler.close()
+
+
+def test_watch_stalls(tmp_path, monkeypatch, log_file):
+    monkeypatch.setenv("FRACTAL_TASK_STALL_TIMEOUT", "0.2")
+    out_json = (tmp_path / "out.json").as_posix()
+
+    # Stalled unit
+    with track_progress(out_json=out_json) as reporter:
+        with watch_stalls(task_name="my_task", progress_reporter=reporter):
+            time.sleep(0.5)
+    log = log_file.read_text()
+    assert "No progress or log activity" in log
+    assert "in my_task task" in log
+    assert "(most recent call first)" in log
+    assert "test_watch_stalls" in log
+
+    # Active unit (through progress reports or log records)
+    log_file.write_text("")
+    with track_progress(out_json=out_json) as reporter:
+        with watch_stalls(task_name="my_task", progress_reporter=reporter):
+            for ind in range(10):
+                time.sleep(0.05)
+                reporter.report(ind, 10, {})
+            for ind in range(10):
+                time.sleep(0.05)
+                logging.getLogger("my_task").info(f"Step {ind}")
+    log = log_file.read_text()
+    assert "Step 9" in log
+    assert "No progress or log activity" not in log
+
+
+def test_watch_stalls_abort_timer_without_flush(tmp_path, monkeypatch, log_file):
+    # Activity postpones the abort timer, without flushing logging
+    monkeypatch.setenv("FRACTAL_TASK_STALL_ABORT_TIMEOUT", "2")
+    flush_calls = []
+    monkeypatch.setattr(_watchdog, "flush_logging", lambda: flush_calls.append(1))
+    out_json = (tmp_path / "out.json").as_posix()
+    with track_progress(out_json=out_json) as reporter:
+        with watch_stalls(task_name="my_task", progress_reporter=reporter):
+            for ind in range(20):
+                time.sleep(0.05)
+                logging.getLogger("my_task").info(f"Step {ind}")
+    assert "Step 19" in log_file.read_text()
+    assert flush_calls == []
+
+
+def test_watch_stalls_abort(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text(
+        "import logging, time\n"
+        "from fractal_task_tools._progress import track_progress\n"
+        "from fractal_task_tools._watchdog import watch_stalls\n"
+        "logging.basicConfig(level=logging.INFO)\n"
+        "with track_progress(out_json='out.json') as reporter:\n"
+        "    with watch_stalls(task_name='my_task', progress_reporter=reporter):\n"
+        "        for ind in range(3):\n"
+        "            time.sleep(0.2)\n"
+        "            logging.info(f'Step {ind}')\n"
+        "        time.sleep(30)\n"
+    )
+    start = time.monotonic()
+    res = subprocess.run(
+        [sys.executable, script.as_posix()],
+        cwd=tmp_path,
+        env=dict(FRACTAL_TASK_STALL_ABORT_TIMEOUT="0.5"),
+        capture_output=True,
+        encoding="utf-8",
+    )
+    assert res.returncode == 1
+    assert time.monotonic() - start < 10
+    assert "Step 2" in res.stderr
+    assert "Timeout" in res.stderr
+    assert "time.sleep(30)" in res.stderr or "line 10" in res.stderr
+
+
+def test_watch_stalls_abort_worker(tmp_path):
+    script = tmp_path / "task.py"
+    script.write_text(
+        "import logging, time\n"
+        "from fractal_task_tools.task_wrapper import run_fractal_task\n"
+        "def my_task(zarr_url: str):\n"
+        "    logging.getLogger('my_task').info('Before stall')\n"
+        "    time.sleep(30)\n"
+        "run_fractal_task(task_function=my_task)\n"
+    )
+    lines = []
+    for ind in range(2):
+        args_json = tmp_path / f"args{ind}.json"
+        args_json.write_text('{"zarr_url": "/zarr"}')
+        job = dict(
+            args_json=args_json.as_posix(),
+            out_json=(tmp_path / f"out{ind}.json").as_posix(),
+        )
+        lines.append(json.dumps(job))
+    start = time.monotonic()
+    res = subprocess.run(
+        [sys.executable, script.as_posix(), "--worker"],
+        input="\n".join(lines) + "\n",
+        env=dict(FRACTAL_TASK_STALL_ABORT_TIMEOUT="0.5", FRACTAL_TASK_LOG_ASYNC="true"),
+        capture_output=True,
+        encoding="utf-8",
+    )
+    assert res.returncode == 1
+    assert time.monotonic() - start < 10
+    # The stalled job gets an error reply, and the worker stops
+    (reply,) = [json.loads(line) for line in res.stdout.splitlines()]
+    assert reply["out_json"] == (tmp_path / "out0.json").as_posix()
+    assert reply["exit_status"] == 1
+    assert "aborting the unit" in reply["error"]
+    # Queued log records are written before exiting
+    assert "Before stall" in res.stderr
+    assert "aborting the unit" in res.stderr
+    assert "time.sleep(30)" in res.stderr or "line 5" in res.stderr
+    assert "Timeout" not in res.stderr
+
+
+def test_watch_stalls_abort_async_logging(tmp_path):
+    script = tmp_path / "task.py"
+    script.write_text(
+        "import logging, time\n"
+        "from fractal_task_tools.task_wrapper import run_fractal_task\n"
+        "def my_task(zarr_url: str):\n"
+        "    logging.getLogger('my_task').info('Before stall')\n"
+        "    time.sleep(30)\n"
+        "run_fractal_task(task_function=my_task)\n"
+    )
+    args_json = tmp_path / "args.json"
+    args_json.write_text('{"zarr_url": "/zarr"}')
+    res = subprocess.run(
+        [
+            sys.executable,
+            script.as_posix(),
+            "--args-json",
+            args_json.as_posix(),
+            "--out-json",
+            (tmp_path / "out.json").as_posix(),
+        ],
+        env=dict(FRACTAL_TASK_STALL_ABORT_TIMEOUT="1", FRACTAL_TASK_LOG_ASYNC="true"),
+        capture_output=True,
+        encoding="utf-8",
+    )
+    assert res.returncode == 1
+    # Queued log records are written before the `faulthandler` abort
+    assert "Before stall" in res.stderr
+    assert "Timeout" in res.stderr
@@ -0,0 +1,167 @@
+import json
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from fractal_task_tools._worker import _get_current_rss
+from fractal_task_tools._worker import _RecyclePolicy
+from fractal_task_tools._worker import run_job
+
+TASK_PATH = Path(__file__).parent / "fake-task-for-logging/task1.py"
+
+
+def _write_args(path: Path, **kwargs) -> None:
+    with path.open("w") as f:
+        json.dump(dict(zarr_urls=[], zarr_dir="/fake", **kwargs), f)
+
+
+def fake_task(zarr_url: str, value: int):
+    if value < 0:
+        raise ValueError("Negative value")
+    return dict(value=value)
+
+
+def test_run_job(tmp_path):
+    args_path = tmp_path / "args.json"
+    out_path = tmp_path / "out.json"
+
+    # Success
+    with args_path.open("w") as f:
+        json.dump(dict(zarr_url="/fake", value=1), f)
+    status = run_job(
+        task_function=fake_task,
+        args_json=args_path.as_posix(),
+        out_json=out_path.as_posix(),
+    )
+    assert status["exit_status"] == 0
+    assert status["error"] is None
+    assert json.loads(out_path.read_text()) == dict(value=1)
+
+    # Failure (output file already exists)
+    status = run_job(
+        task_function=fake_task,
+        args_json=args_path.as_posix(),
+        out_json=out_path.as_posix(),
+    )
+    assert status["exit_status"] == 1
+    assert "already exists" in status["error"]
+
+    # Failure (task error)
+    out_path.unlink()
+    with args_path.open("w") as f:
+        json.dump(dict(zarr_url="/fake", value=-1), f)
+    status = run_job(
+        task_function=fake_task,
+        args_json=args_path.as_posix(),
+        out_json=out_path.as_posix(),
+    )
+    assert status["exit_status"] == 1
+    assert status["error"] == "ValueError: Negative value"
+    assert not out_path.exists()
+
+
+def test_recycle_policy():
+    assert _get_current_rss() > 0
+
+    policy = _RecyclePolicy(max_jobs=2, max_rss_growth=None)
+    assert not policy.job_done()
+    assert policy.job_done()
+
+    policy = _RecyclePolicy(max_jobs=None, max_rss_growth=0.0)
+    assert policy.job_done()
+
+    policy = _RecyclePolicy(max_jobs=None, max_rss_growth=None)
+    for _ in range(10):
+        assert not policy.job_done()
+
+
+def test_worker_stdin(tmp_path):
+    lines = []
+    for ind in range(3):
+        _write_args(tmp_path / f"args{ind}.json")
+        job = dict(
+            args_json=(tmp_path / f"args{ind}.json").as_posix(),
+            out_json=(tmp_path / f"out{ind}.json").as_posix(),
+        )
+        lines.append(json.dumps(job))
+    lines.insert(1, "not-a-json-line")
+
+    res = subprocess.run(
+        [sys.executable, TASK_PATH.as_posix(), "--worker"],
+        input="\n".join(lines) + "\n",
+        capture_output=True,
+        encoding="utf-8",
+    )
+    assert res.returncode == 0
+    replies = [json.loads(line) for line in res.stdout.splitlines()]
+    assert [reply["exit_status"] for reply in replies] == [0, 1, 0, 0]
+    assert "Invalid job descriptor" in replies[1]["error"]
+    for ind in range(3):
+        with (tmp_path / f"out{ind}.json").open() as f:
+            assert json.load(f) == ["something"]
+    assert "Worker END (3 jobs)" in res.stderr
+
+    # Recycle after two jobs
+    for ind in range(3):
+        (tmp_path / f"out{ind}.json").unlink()
+    res = subprocess.run(
+        [
+            sys.executable,
+            TASK_PATH.as_posix(),
+            "--worker",
+            "--worker-max-jobs",
+            "2",
+        ],
+        input="\n".join(lines) + "\n",
+        capture_output=True,
+        encoding="utf-8",
+    )
+    assert res.returncode == 0
+    assert len(res.stdout.splitlines()) == 3
+    assert (tmp_path / "out1.json").exists()
+    assert not (tmp_path / "out2.json").exists()
+    assert "Recycling worker after 2 jobs" in res.stderr
+
+
+def test_worker_socket(tmp_path):
+    socket_path = tmp_path / "worker.sock"
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            TASK_PATH.as_posix(),
+            "--worker-socket",
+            socket_path.as_posix(),
+            "--worker-max-jobs",
+            "2",
+        ],
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+    )
+    try:
+        for _ in range(100):
+            if socket_path.exists():
+                break
+            time.sleep(0.1)
+
+        replies = []
+        for ind in range(2):
+            _write_args(tmp_path / f"args{ind}.json")
+            job = dict(
+                args_json=(tmp_path / f"args{ind}.json").as_posix(),
+                out_json=(tmp_path / f"out{ind}.json").as_posix(),
+            )
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(socket_path.as_posix())
+                with client.makefile("rw") as f:
+                    f.write(json.dumps(job) + "\n")
+                    f.flush()
+                    replies.append(json.loads(f.readline()))
+        _, stderr = proc.communicate(timeout=10)
+    finally:
+        proc.kill()
+    assert proc.returncode == 0
+    assert [reply["exit_status"] for reply in replies] == [0, 0]
+    assert not socket_path.exists()
+    assert "Worker END (2 jobs)" in stderr